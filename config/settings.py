@@ -7,7 +7,20 @@ BROKER = {
     'account': os.getenv('MT5_ACCOUNT'),
     'password': os.getenv('MT5_PASSWORD'),
     'server': os.getenv('MT5_SERVER'),
-    'terminal_path': 'C:\\Program Files\\MetaTrader 5\\terminal64.exe'
+    'terminal_path': 'C:\\Program Files\\MetaTrader 5\\terminal64.exe',
+    'backend': os.getenv('BROKER_BACKEND', 'mt5')  # 'mt5' or 'replay'
+}
+
+# Offline replay of recorded candles (BROKER['backend'] == 'replay')
+REPLAY = {
+    'data_dir': 'data/raw_data',
+    'timeframe': 'M15',
+    'start_bar': 100,
+    'latency': 0.0,  # seconds between order_send and the fill
+    'slippage_points': 0.0,
+    'requote_rate': 0.0,
+    'spread_points': 2.0,
+    'balance': 10000.0,
 }
 
 TRADING = {
@@ -16,11 +29,120 @@ TRADING = {
     'magic_number': 123456,
     'stop_loss_pips': 50,
     'take_profit_pips': 100,
-    'timeframe': 'M15'
+    'timeframe': 'M15',
+    'base_timeframe': None,  # e.g. 'M1': fetch only this timeframe live and build the others from it
 }
 
 STRATEGIES = {
     'moving_average': {'short_period': 9, 'long_period': 21},
-    'ml_strategy': {'short_period': 9, 'long_period': 21, 'rsi_period': 14},
+    'ml_strategy': {'short_period': 9, 'long_period': 21, 'rsi_period': 14,
+                    'train_window': 2000, 'retrain_interval': 500, 'threshold': 0.55},
     'ACTIVE_STRATEGY': 'rule_based'
-}
\ No newline at end of file
+}
+
+# Flat aliases for the values the rest of the code base imports directly
+SYMBOL = TRADING['symbol']
+LOT_SIZE = TRADING['lot_size']
+MAGIC_NUMBER = TRADING['magic_number']
+STOP_LOSS_PIPS = TRADING['stop_loss_pips']
+TAKE_PROFIT_PIPS = TRADING['take_profit_pips']
+TIMEFRAME = TRADING['timeframe']
+ACTIVE_STRATEGY = STRATEGIES['ACTIVE_STRATEGY']
+
+# Parameter sweep run by main.run_optimization
+OPTIMIZATION = {
+    'strategy': 'rule_based',
+    'method': 'grid',  # 'grid', 'random' or 'bayesian'
+    'grid': {'short_period': range(5, 21), 'long_period': range(25, 101, 5)},
+    'space': {'short_period': (5, 20), 'long_period': (25, 100)},
+    'n_iter': 200,
+    'num_candles': 25000,  # about a year of M15 candles
+    'rank_by': 'total_return',
+    'processes': None,  # defaults to the CPU count
+}
+
+# Vendor history imported by utils.history_importer and backtested by date range
+HISTORY = {
+    'root': 'data/processed_data',
+    'chunk_rows': 1000000,  # CSV rows parsed at once; bounds the import's memory
+    'min_gap': 3600,  # shortest gap in the data reported by an import, in seconds
+    'compression_level': 1,  # zlib level of the partition files: 1 is fast, 9 is smallest
+}
+
+# Monte Carlo robustness check of the trades of main.run_backtest (utils.robustness)
+ROBUSTNESS = {
+    'num_paths': 10000,  # resampled equity curves per method, 0 to skip the check
+    'methods': ('shuffle', 'bootstrap', 'perturb'),
+    'block_size': None,  # trades per bootstrap block, the cube root of the trade count by default
+    'perturbation': 0.1,  # relative noise on each trade's profit for 'perturb'
+    'ruin_threshold': 0.5,  # losing half of the initial balance counts as ruin
+    'confidence': 0.95,
+    'processes': None,  # defaults to the CPU count
+}
+
+# Basket backtested on one shared account by main.run_portfolio_backtest
+PORTFOLIO = {
+    'symbols': ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD', 'USDCHF', 'NZDUSD', 'EURGBP'],
+    'num_candles': 5000,
+    'max_positions': 5,  # open positions across the basket, None for one per symbol
+    'min_balance': 0.0,  # no new positions below this balance
+}
+
+# Pipelines traded concurrently by main.run_live_scheduler
+LIVE = {
+    'pipelines': [
+        {'symbol': 'EURUSD', 'timeframe': 'M15', 'strategy': 'rule_based',
+         'params': {'short_period': 9, 'long_period': 21}},
+    ],
+    'max_workers': 8,  # threads for blocking broker calls
+    'trigger': 'bar',  # 'bar' (wake at bar boundaries) or 'tick' (poll the tick)
+    'time_offset': 0,  # broker server time minus local time, in seconds
+}
+
+# Order sending of the live loop and the scheduler (utils.order_router)
+ORDER_ROUTER = {
+    'max_retries': 3,  # resends after a requote or off-quote rejection, each at a fresh price
+    'retry_delay': 0.0,  # seconds between resends
+    'deviation': 20,  # accepted slippage, in points
+}
+
+# Local book of open positions read by the order router (utils.position_book)
+POSITION_BOOK = {
+    'reconcile_interval': 300.0,  # seconds between position snapshots picking up SL/TP hits and manual trades
+}
+
+# State snapshots (utils.checkpoint) letting the live bot, streaming and loop
+# backtests and optimization sweeps resume where they stopped
+CHECKPOINT = {
+    'dir': 'data/checkpoints',
+    'interval': 60.0,  # seconds between snapshots, None to disable checkpointing
+}
+
+# Logging of a run, applied by main.main through utils.logger.configure_logging
+LOGGING = {
+    'mode': os.getenv('LOG_MODE', 'async'),  # 'async' batches records on a writer thread; 'sync' writes inline
+    'level': os.getenv('LOG_LEVEL', 'INFO'),  # verbosity of this run
+    'console': True,
+    'log_file': 'logs/trading.log',
+    'event_log': 'logs/events.bin',  # trades/signals/orders; '.jsonl' for JSON lines, None to disable
+    'events_recorded': ('trade', 'signal', 'order'),
+}
+
+# Latency histograms, counters and profiling (utils.telemetry)
+TELEMETRY = {
+    'enabled': True,
+    'export_path': 'logs/metrics.prom',  # Prometheus text file, rewritten every live cycle; None to disable
+    'http_port': None,  # serve the metrics at http://127.0.0.1:<port>/metrics
+    'profile': os.getenv('PROFILE'),  # None, 'cprofile' or 'sampling'
+    'profile_path': 'logs/profile',
+}
+
+# Offline benchmark suite (python -m utils.benchmark)
+BENCHMARK = {
+    'sizes': [1000, 10000, 100000, 1000000],  # add 10000000 for the full range
+    'repeats': 3,
+    'baseline_path': 'data/benchmarks/baseline.json',
+    'max_slowdown': 0.25,  # fail when a case is more than 25% slower than its baseline
+    'max_memory_growth': 0.25,
+    'min_seconds': 0.005,  # faster baselines are too noisy to gate on time
+}
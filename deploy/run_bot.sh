@@ -1,3 +1,4 @@
 #!/bin/bash
 source venv/bin/activate
-python main.py
\ No newline at end of file
+# e.g. ./run_bot.sh live, ./run_bot.sh backtest --strategy ml_strategy
+python main.py "$@"
@@ -1,213 +1,393 @@
+import argparse
+import itertools
+import os
 import time
 import pandas as pd
-import MetaTrader5 as mt5
-from config.settings import SYMBOL, LOT_SIZE, MAGIC_NUMBER, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS, STRATEGIES, ACTIVE_STRATEGY
-from utils.data_fetcher import initialize_mt5, get_historical_data, open_position, close_position
-from utils.performance import calculate_metrics, plot_equity_curve
-from strategies.rule_based_strategy import MovingAverageCrossover
-from strategies.advanced_strategy import MLStrategy
-from utils.logger import setup_logger
-from strategies.factor import create_strategy
+from config.settings import SYMBOL, TIMEFRAME, LOT_SIZE, MAGIC_NUMBER, STRATEGIES, ACTIVE_STRATEGY, OPTIMIZATION, ROBUSTNESS, HISTORY, LIVE, BROKER, LOGGING, PORTFOLIO, TELEMETRY, CHECKPOINT
+from utils.data_fetcher import initialize_mt5, get_historical_data, tick_store
+from utils.logger import setup_logger, configure_logging
+from strategies.factor import create_strategy, available_strategies
+from utils.telemetry import telemetry, profiled
+from utils.broker import broker, ReplayFinished
+from utils.checkpoint import Checkpoint
+from utils.market_data import market_session
+from utils.order_router import OrderRouter
+from utils.indicator_graph import indicator_graph
+from utils.scheduler import LiveScheduler, Pipeline, STREAM_CANDLES
 
 # Initialize the logger
 logger = setup_logger()
 
-# Backtesting parameters
-INITIAL_BALANCE = 10000.0
-SIMULATED_COMMISSION = 2.0  # Commission per trade
+def _checkpoint(run, strategy_name):
+    """
+    The snapshot file of a run (settings.CHECKPOINT), or None when
+    checkpointing is disabled.
+    """
+    if CHECKPOINT['interval'] is None:
+        return None
+    path = os.path.join(CHECKPOINT['dir'], f'{run}_{SYMBOL}_{TIMEFRAME}_{strategy_name}.pkl')
+    return Checkpoint(path, CHECKPOINT['interval'])
 
-def get_open_position():
+def _strategy_key(strategy_name):
+    """Identifies a configured strategy, so a checkpoint is not restored into other parameters."""
+    return strategy_name, repr(sorted(STRATEGIES.get(strategy_name, {}).items()))
+
+def run_backtest(mode='vectorized', strategy_name=ACTIVE_STRATEGY, start=None, end=None):
     """
-    Checks if there is an open position for the specified symbol and magic number.
-    Returns the position ticket number if found, otherwise returns None.
+    Runs a backtest on historical data.
+
+    Args:
+        mode (str): 'vectorized' computes every signal in one pass and then walks
+            them through the trade rules. 'streaming' feeds one bar at a time to
+            the strategy's on_bar API, as the live bot does. 'tick' fills the
+            vectorized signals against the stored bid/ask ticks and checks SL/TP
+            intrabar. 'loop' is the reference mode that calls generate_signal on
+            the growing history at every bar. 'streaming' and 'loop' save
+            checkpoints (settings.CHECKPOINT), and an interrupted run on the
+            same bars resumes from the last one.
+        strategy_name (str): Registered name of the strategy to test.
+        start, end: Date range to test on, read from the dataset imported by
+            utils.history_importer (settings.HISTORY). The newest 5000
+            candles from the broker when both are None.
     """
-    positions = mt5.positions_get(symbol=SYMBOL)
-    if positions:
-        for position in positions:
-            if position.magic == MAGIC_NUMBER:
-                return position.ticket
-    return None
-
-class SimulatedTradeManager:
-    """Manages simulated trades for backtesting."""
-    def __init__(self, initial_balance):
-        self.balance = initial_balance
-        self.position = None
-        self.entry_price = 0.0
-        self.entry_time = None
-        self.sl_price = 0.0
-        self.tp_price = 0.0
-        self.trades = []
-
-    def open_position(self, signal, price, time, spread=2.0):
-        if self.position is None:
-            self.position = signal
-            point = mt5.symbol_info(SYMBOL).point
-            if signal == 'BUY':
-                self.entry_price = price + spread * point # pay the ask price
-                self.sl_price = self.entry_price - STOP_LOSS_PIPS * point
-                self.tp_price = self.entry_price + TAKE_PROFIT_PIPS * point
-            elif signal == 'SELL':
-                self.entry_price = price # Sell at bid price
-                self.sl_price = self.entry_price + STOP_LOSS_PIPS * point
-                self.tp_price = self.entry_price - TAKE_PROFIT_PIPS * point
-            self.entry_time = time
-            logger.info(f'SIMULATED TRADE OPENED - {signal} at {self.entry_price:.5f}')
-        
-    def close_position(self, price, time):
-        if self.position is not None:
-            profit_per_lot = 0.0
-            if self.position == "BUY":
-                profit_per_lot = (price - self.entry_price) / mt5.symbol_info(SYMBOL).point
-            elif self.position == "SELL":
-                profit_per_lot = (self.entry_price - price) / mt5.symbol_info(SYMBOL).point
-            
-            trade_profit = profit_per_lot * LOT_SIZE - SIMULATED_COMMISSION
-            self.balance += trade_profit
-
-            trade_log = {
-                "signal": self.position,
-                "entry_time": self.entry_time,
-                "entry_price": self.entry_price,
-                "exit_time": time,
-                "exit_price": price,
-                "profit": trade_profit,
-                "balance": self.balance
-            }
-            self.trades.append(trade_log)
-            logger.info(f"SIMULATED TRADE CLOSED - Profit: {trade_profit:.2f}, New Balance: {self.balance:.2f}")
-
-            self.position = None
-
-def run_backtest():
-    """Runs a backtest on historical data."""
-    logger.info("Starting backtest...")
-
-    # Fetch a large amount of historical data
-    # MT5 connection must be initialized before calling get_historical_data
-    rates = get_historical_data(symbol=SYMBOL, num_candles=5000)
-    if rates is None:
-        logger.error("Failed to fetch historical data for backtesting.")
-        return
+    # Backtest-only modules are imported per mode to keep live startup light
+    from utils.backtester import INITIAL_BALANCE, SimulatedTradeManager, simulate_signals
+    from utils.performance import bars_per_year, plot_equity_curve
+    from utils.tick_backtester import run_tick_backtest
+    from utils.data_store import timeframe_seconds
+    from utils.history_importer import HistoryDataset
+
+    logger.info(f"Starting backtest ({mode} mode)...")
+
+    if start is not None or end is not None:
+        rates = HistoryDataset(HISTORY['root'], SYMBOL, TIMEFRAME).range(start, end)
+        if len(rates) == 0:
+            logger.error(f"No imported {SYMBOL} {TIMEFRAME} history between {start} and {end}.")
+            return
+    else:
+        # Fetch a large amount of historical data
+        # MT5 connection must be initialized before calling get_historical_data
+        rates = get_historical_data(symbol=SYMBOL, num_candles=5000, use_store=True)
+        if rates is None:
+            logger.error("Failed to fetch historical data for backtesting.")
+            return
     
     rates_df = pd.DataFrame(rates)
     rates_df['time'] = pd.to_datetime(rates_df['time'], unit='s')
 
-    strategy = MovingAverageCrossover()
-    trade_manager = SimulatedTradeManager(INITIAL_BALANCE)
-
-    # Loop through the historical data simulating a live feed
-    for i in range(strategy.long_period, len(rates_df)):
-        current_data = rates_df.iloc[:i]
-
-        signal = strategy.generate_signal(current_data)
-        current_price = rates_df.iloc[i]['close']
-        current_time = rates_df.iloc[i]['time']
-
-        # --- New Backtest Close Logic ---
-        # 1. Check for SL/TP hit
-        if trade_manager.position is not None:
-            if (trade_manager.position == "BUY" and current_price <= trade_manager.sl_price) or \
-               (trade_manager.position == "SELL" and current_price >= trade_manager.sl_price):
-                trade_manager.close_position(trade_manager.sl_price, current_time)
-                continue  # Skip to next candle to avoid multiple closures
-            
-            if (trade_manager.position == "BUY" and current_price >= trade_manager.tp_price) or \
-               (trade_manager.position == "SELL" and current_price <= trade_manager.tp_price):
-                trade_manager.close_position(trade_manager.tp_price, current_time)
-                continue
-
-        # 2. Check for counter-signal
-        if trade_manager.position == "BUY" and signal == "SELL":
-            trade_manager.close_position(current_price, current_time)
-        elif trade_manager.position == "SELL" and signal == "BUY":
-            trade_manager.close_position(current_price, current_time)
-
-        # Check for open conditions
-        if trade_manager.position is None:
-            if signal == "BUY":
-                trade_manager.open_position("BUY", current_price, current_time)
-            elif signal == "SELL":
-                trade_manager.open_position("SELL", current_price, current_time)
+    strategy = create_strategy(strategy_name, **STRATEGIES.get(strategy_name, {}))
+    trade_manager = SimulatedTradeManager(INITIAL_BALANCE, periods_per_year=bars_per_year(TIMEFRAME))
+
+    first_bar, signal = 0, 'HOLD'
+    checkpoint = _checkpoint(f'backtest_{mode}', strategy_name) if mode in ('streaming', 'loop') else None
+    checkpoint_key = (mode, *_strategy_key(strategy_name), len(rates), int(rates['time'][0]), int(rates['time'][-1]))
+    state = checkpoint.load(checkpoint_key) if checkpoint is not None else None
+    if state is not None:
+        first_bar, signal = state['bar'], state['signal']
+        strategy, trade_manager = state['strategy'], state['trade_manager']
+        logger.info(f"Resuming the backtest at bar {first_bar} of {len(rates)}.")
+
+    def save_checkpoint(i):
+        if checkpoint is not None and checkpoint.due():
+            checkpoint.save(checkpoint_key, {'bar': i, 'signal': signal, 'strategy': strategy,
+                                             'trade_manager': trade_manager})
+
+    started = time.perf_counter()
+    if mode == 'loop':
+        # Loop through the historical data simulating a live feed
+        for i in range(max(first_bar, strategy.long_period), len(rates_df)):
+            save_checkpoint(i)
+            current_data = rates_df.iloc[:i]
 
+            signal = strategy.generate_signal(current_data)
+            current_price = rates_df.iloc[i]['close']
+            current_time = rates_df.iloc[i]['time']
+
+            trade_manager.process_bar(signal, current_price, current_time)
+    elif mode == 'streaming':
+        closes = rates_df['close'].to_numpy()
+        times = rates_df['time'].array
+        for i in range(first_bar, len(rates)):
+            save_checkpoint(i)
+            if i >= strategy.long_period:
+                trade_manager.process_bar(signal, closes[i], times[i])
+            # the signal acted upon at bar i + 1 is computed from bars up to i
+            signal = strategy.on_bar(rates[i])
+    elif mode == 'tick':
+        signals = strategy.generate_signals(rates_df)
+        imported = HistoryDataset(HISTORY['root'], SYMBOL, 'ticks')
+        if len(imported):
+            # One partition (a day of ticks) in memory at a time
+            ticks = imported.iter_range(int(rates['time'][0]), int(rates['time'][-1]) + timeframe_seconds(TIMEFRAME))
+            first = next(ticks, None)
+            if first is not None:
+                ticks = itertools.chain([first], ticks)
+        else:
+            # A memory-mapped view, paged in as the backtest reads it
+            ticks = tick_store.range(SYMBOL, int(rates['time'][0]) * 1000)
+            first = ticks if len(ticks) else None
+        if first is None:
+            logger.error("No stored ticks cover the backtest period.")
+            return
+        run_tick_backtest(trade_manager, signals, rates, ticks, start=strategy.long_period)
+    elif mode == 'vectorized':
+        signals = strategy.generate_signals(rates_df)
+        simulate_signals(trade_manager, signals, rates_df['close'].to_numpy(),
+                         rates_df['time'].array, start=strategy.long_period)
+    else:
+        raise ValueError(f'Unknown backtest mode: {mode}')
+    elapsed = time.perf_counter() - started
+    if checkpoint is not None:
+        checkpoint.clear()
+
+    num_bars = len(rates_df) - strategy.long_period
+    telemetry.gauge('backtest_bars_per_second', num_bars / max(elapsed, 1e-9), mode=mode)
+    logger.info(f"Simulated {num_bars} bars in {elapsed:.3f}s ({num_bars / max(elapsed, 1e-9):.0f} bars/sec)")
     logger.info(f"Backtest finished. Final Balance: {trade_manager.balance:.2f}")
-    metrics = calculate_metrics(trade_manager.trades, INITIAL_BALANCE)
+    metrics = trade_manager.metrics.result()
+    logger.info(f"Performance Metrics: Total Return: {metrics['total_return']:.2f}%, "
+                f"Win Rate: {metrics['win_rate']:.2f}%, Max Drawdown: {metrics['max_drawdown']:.2f}%, "
+                f"Sharpe: {metrics['sharpe']:.2f}, Sortino: {metrics['sortino']:.2f}, "
+                f"Profit Factor: {metrics['profit_factor']:.2f}, Exposure: {metrics['exposure']:.1f}%, "
+                f"Trades: {metrics['num_trades']}, Avg Duration: {metrics['avg_trade_duration'] / 3600:.1f}h")
+    plot_equity_curve(trade_manager.metrics if trade_manager.metrics.bars else trade_manager.trades)
+    if ROBUSTNESS['num_paths'] and len(trade_manager.trades):
+        run_robustness(trade_manager.trades, INITIAL_BALANCE)
+
+def run_robustness(trades, initial_balance):
+    """Logs the Monte Carlo confidence intervals of a backtest's trades (settings.ROBUSTNESS)."""
+    from utils.robustness import monte_carlo
+
+    config = ROBUSTNESS
+    started = time.perf_counter()
+    report = monte_carlo(trades, initial_balance, num_paths=config['num_paths'], methods=config['methods'],
+                         block_size=config['block_size'], perturbation=config['perturbation'],
+                         ruin_threshold=config['ruin_threshold'], confidence=config['confidence'],
+                         processes=config['processes'])
+    elapsed = time.perf_counter() - started
+    logger.info(f"Monte Carlo robustness ({config['num_paths']} paths per method, "
+                f"{config['confidence']:.0%} intervals, {elapsed:.2f}s):\n{report.to_string(float_format='{:.2f}'.format)}")
+    return report
+
+def run_portfolio_backtest(strategy_name=ACTIVE_STRATEGY):
+    """Backtests a strategy on the basket configured in settings.PORTFOLIO."""
+    from utils.backtester import INITIAL_BALANCE
+    from utils.performance import bars_per_year, plot_equity_curve
+    from utils.portfolio_backtester import PortfolioBacktester, align_bars
+
+    config = PORTFOLIO
+    logger.info(f"Starting portfolio backtest of {len(config['symbols'])} symbols...")
+
+    bars = {}
+    for symbol in config['symbols']:
+        rates = get_historical_data(symbol=symbol, num_candles=config['num_candles'], use_store=True)
+        if rates is None or len(rates) == 0:
+            logger.warning(f"No historical data for {symbol}, leaving it out of the portfolio.")
+            continue
+        bars[symbol] = rates
+    if not bars:
+        logger.error("Failed to fetch historical data for the portfolio backtest.")
+        return
+
+    symbols, times, closes = align_bars(bars)
+    strategy = create_strategy(strategy_name, **STRATEGIES.get(strategy_name, {}))
+    backtester = PortfolioBacktester(symbols, {symbol: market_session.symbol_info(symbol).point for symbol in symbols},
+                                     INITIAL_BALANCE, max_positions=config['max_positions'],
+                                     min_balance=config['min_balance'], periods_per_year=bars_per_year(TIMEFRAME))
+
+    started = time.perf_counter()
+    signals = strategy.generate_signal_matrix(closes)
+    metrics = backtester.run(signals, closes, times, start=strategy.long_period)
+    elapsed = time.perf_counter() - started
+
+    telemetry.gauge('backtest_bars_per_second', len(times) * len(symbols) / max(elapsed, 1e-9), mode='portfolio')
+    logger.info(f"Simulated {len(times)} bars x {len(symbols)} symbols in {elapsed:.3f}s")
+    logger.info(f"Portfolio backtest finished. Final Balance: {backtester.balance:.2f}, "
+                f"Rejected entries: {backtester.rejected}")
     logger.info(f"Performance Metrics: Total Return: {metrics['total_return']:.2f}%, "
-                f"Win Rate: {metrics['win_rate']:.2f}%, Max Drawdown: {metrics['max_drawdown']:.2f}%")
-    plot_equity_curve(trade_manager.trades)    
+                f"Win Rate: {metrics['win_rate']:.2f}%, Max Drawdown: {metrics['max_drawdown']:.2f}%, "
+                f"Sharpe: {metrics['sharpe']:.2f}, Sortino: {metrics['sortino']:.2f}, "
+                f"Profit Factor: {metrics['profit_factor']:.2f}, Exposure: {metrics['exposure']:.1f}%, "
+                f"Trades: {metrics['num_trades']}")
+    logger.info(f"Per-symbol results:\n{backtester.summary().to_string(index=False)}")
+    plot_equity_curve(backtester.metrics, save_path='logs/portfolio_equity_curve.png')
+    return backtester
 
-def run_live_bot():
-    """Main function to run the trading bot in live mode."""
+def run_optimization(save_path='logs/optimization_results.csv', strategy_name=None):
+    """
+    Runs the parameter sweep configured in settings.OPTIMIZATION.
+
+    Args:
+        save_path (str): CSV file receiving every evaluated parameter set.
+        strategy_name (str): Strategy to optimize instead of the configured one.
+    """
+    from utils.optimizer import optimize
+
+    config = OPTIMIZATION
+    strategy_name = strategy_name or config['strategy']
+    logger.info(f"Starting {config['method']} optimization of {strategy_name}...")
+
+    rates = get_historical_data(symbol=SYMBOL, num_candles=config['num_candles'], use_store=True)
+    if rates is None:
+        logger.error("Failed to fetch historical data for optimization.")
+        return
+
+    started = time.perf_counter()
+    results = optimize(strategy_name, rates, market_session.symbol_info(SYMBOL).point,
+                       grid=config['grid'], space=config['space'], method=config['method'],
+                       n_iter=config['n_iter'], processes=config['processes'],
+                       rank_by=config['rank_by'], checkpoint=_checkpoint('optimize', strategy_name))
+    elapsed = time.perf_counter() - started
+
+    logger.info(f"Evaluated {len(results)} parameter sets in {elapsed:.1f}s")
+    logger.info(f"Best parameter sets:\n{results.head(10).to_string()}")
+    results.to_csv(save_path, index=False)
+    return results
+
+def run_live_bot(strategy_name=ACTIVE_STRATEGY):
+    """
+    Main function to run the trading bot in live mode.
+
+    The strategy's streaming state is checkpointed (settings.CHECKPOINT)
+    while the bot runs and when it stops. A restarted bot resumes from the
+    checkpoint and only fetches the candles it has not seen, so it acts on
+    the very next bar instead of re-warming from a full window.
+    """
 
     # Initialize strategy
-    strategy = MovingAverageCrossover()
+    strategy = create_strategy(strategy_name, **STRATEGIES.get(strategy_name, {}))
+    last_bar_time = None
+    checkpoint = _checkpoint('live', strategy_name)
+    checkpoint_key = ('live', *_strategy_key(strategy_name))
+    state = checkpoint.load(checkpoint_key) if checkpoint is not None else None
+    if state is not None:
+        strategy, last_bar_time = state['strategy'], state['last_bar_time']
 
     logger.info("Starting trading bot in live mode...")
 
+    router = OrderRouter()
+    cycles = 0
+    started = time.perf_counter()
+
     try:
         while True:
-            # Step 1: Fetch historical data
-            rates = get_historical_data(symbol=SYMBOL, num_candles=strategy.long_period + 5)
+            cycles += 1
+            cycle_started = time.perf_counter()
+            market_session.new_cycle()
+            # Step 1: Fetch the candles not seen yet (a full window on the first cycle)
+            num_candles = strategy.warm_up_bars if last_bar_time is None else STREAM_CANDLES
+            rates = get_historical_data(symbol=SYMBOL, num_candles=num_candles, use_store=True)
 
-            if rates is not None:
-                # Convert data to a pandas DataFrame for easier manipulation
-                rates_df = pd.DataFrame(rates)
-                rates_df['time'] = pd.to_datetime(rates_df['time'], unit='s')
+            if rates is not None and len(rates) > 0:
+                if last_bar_time is not None and rates[0]['time'] > last_bar_time:
+                    # Candles were missed between cycles, rebuild from a full window
+                    logger.warning("Gap in streamed candles, re-warming the strategy.")
+                    telemetry.count('candle_gaps', symbol=SYMBOL)
+                    strategy.reset()
+                    last_bar_time = None
+                    continue
 
                 # Step 2: Generate signal
-                signal = strategy.generate_signal(rates_df)
-
-                # Step 3: Manage trades based on the signal
-                current_position = get_open_position()
-
-                # Close logic: Check if a counter-signal is received
-                if current_position is not None:
-                    # Get position details to check its type (BUY or SELL)
-                    position_details = mt5.positions_get(ticket=current_position)[0]
-
-                    if position_details.type == mt5.POSITION_TYPE_BUY and signal == 'SELL':
-                        logger.info("SELL signal received. Closing existing BUY position.")
-                        close_position(current_position)
-                    elif position_details.type == mt5.POSITION_TYPE_SELL and signal == 'BUY':
-                        logger.info("BUY signal received. Closing existing SELL position.")
-                        close_position(current_position)
-
-                # Open logic: Check for signals to open a new position
-                if current_position is None:
-                    if signal == 'BUY':
-                        logger.info("BUY signal received. Opening a new long position.")
-                        open_position(SYMBOL, LOT_SIZE, mt5.ORDER_TYPE_BUY, MAGIC_NUMBER, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS)
-                    elif signal == 'SELL':
-                        logger.info("SELL signal received. Opening a new short position.")
-                        open_position(SYMBOL, LOT_SIZE, mt5.ORDER_TYPE_SELL, MAGIC_NUMBER, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS)
-            
+                with telemetry.timer('generate_signal'):
+                    signal, last_bar_time = strategy.stream(rates, last_bar_time)
+                signal_time = time.perf_counter()
+
+                # Step 3: Manage trades based on the signal; the router sends
+                # the order on its own thread
+                if signal in ('BUY', 'SELL'):
+                    pending = router.submit_signal(SYMBOL, signal, LOT_SIZE, MAGIC_NUMBER, signal_time)
+                    if BROKER['backend'] == 'replay':
+                        # The replay broker is not thread-safe, so let the fill
+                        # land before the clock moves on
+                        pending.result()
+
+                if checkpoint is not None and checkpoint.due():
+                    checkpoint.save(checkpoint_key, {'strategy': strategy, 'last_bar_time': last_bar_time})
+
+            telemetry.observe('cycle', time.perf_counter() - cycle_started)
+            if TELEMETRY['export_path']:
+                telemetry.write(TELEMETRY['export_path'])
+
             # Pause for a specified interval before the next iteration
-            time.sleep(60) # Pause for 60 seconds (adjust as needed)
+            broker.sleep(60) # Pause for 60 seconds (adjust as needed)
     except KeyboardInterrupt:
         logger.info("Bot stopped by user.")
+    except ReplayFinished as e:
+        logger.info(str(e))
+    finally:
+        router.shutdown()
+        if checkpoint is not None:
+            checkpoint.save(checkpoint_key, {'strategy': strategy, 'last_bar_time': last_bar_time})
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Ran {cycles} cycles in {elapsed:.3f}s ({cycles / max(elapsed, 1e-9):.0f} cycles/sec)")
+    telemetry.log_summary()
 
-def main():
+def run_live_scheduler():
+    """Runs every pipeline configured in settings.LIVE concurrently."""
+    # Pipelines of the same symbol and timeframe update their indicators once per bar
+    pipelines = [Pipeline(p['symbol'], p['timeframe'],
+                          create_strategy(p['strategy'], indicators=indicator_graph.stream(p['symbol'], p['timeframe']),
+                                          **p.get('params', {})))
+                 for p in LIVE['pipelines']]
+    scheduler = LiveScheduler(pipelines, max_workers=LIVE['max_workers'], trigger=LIVE['trigger'],
+                              time_offset=LIVE['time_offset'], replay=BROKER['backend'] == 'replay')
+
+    logger.info(f"Starting live scheduler with {len(pipelines)} pipelines...")
+    try:
+        scheduler.start()
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user.")
+
+# Command-line mode -> function running it
+MODES = {
+    'live': run_live_bot,
+    'scheduler': run_live_scheduler,
+    'backtest': run_backtest,
+    'portfolio': run_portfolio_backtest,
+    'optimize': run_optimization,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the trading bot.')
+    parser.add_argument('mode', nargs='?', default='backtest', choices=list(MODES),
+                        help='live: one symbol; scheduler: the settings.LIVE pipelines; backtest: one symbol '
+                             'on history; portfolio: the settings.PORTFOLIO basket; optimize: settings.OPTIMIZATION')
+    parser.add_argument('--strategy', help='registered strategy name (default: settings.ACTIVE_STRATEGY, '
+                                           'or the optimization strategy)')
+    parser.add_argument('--backtest-mode', default='vectorized', choices=['vectorized', 'streaming', 'tick', 'loop'])
+    parser.add_argument('--start', help="backtest from this date (e.g. 2021-01-01) on the imported history")
+    parser.add_argument('--end', help='backtest until this date (exclusive) on the imported history')
+    parser.add_argument('--list-strategies', action='store_true', help='print the available strategies and exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to run the trading bot."""
+    args = parse_args(argv)
+    if args.list_strategies:
+        print('\n'.join(available_strategies()))
+        return
+
+    configure_logging(**LOGGING)
+    telemetry.enabled = TELEMETRY['enabled']
+    if TELEMETRY['http_port'] is not None:
+        telemetry.serve(TELEMETRY['http_port'])
     if not initialize_mt5():
         logger.error("Failed to initialize and connect to MetaTrader 5.")
         return
-    
-    strategy_config = STRATEGIES.get(ACTIVE_STRATEGY, {})
-    strategy = create_strategy(ACTIVE_STRATEGY, **strategy_config)
-
-    # # Dynamically select strategy
-    # if ACTIVE_STRATEGY == 'rule_based':
-    #     strategy = MovingAverageCrossover()
-    # elif ACTIVE_STRATEGY == 'ml_strategy':
-    #     strategy = MLStrategy()
-    # else:
-    #     logger.error('Invalid strategy selected.')
-    #     return
-    
-    # run_live_bot() # For live, continuous trading
-    run_backtest() # For backtesting
 
-    mt5.shutdown()
+    kwargs = {}
+    if args.strategy and args.mode != 'scheduler':  # scheduler pipelines name their own strategies
+        kwargs['strategy_name'] = args.strategy
+    if args.mode == 'backtest':
+        kwargs.update(mode=args.backtest_mode, start=args.start, end=args.end)
+
+    with profiled(TELEMETRY['profile'], TELEMETRY['profile_path']):
+        MODES[args.mode](**kwargs)
+
+    if TELEMETRY['export_path']:
+        telemetry.write(TELEMETRY['export_path'])
+    broker.shutdown()
     logger.info("MetaTrader 5 connection shut down.")
 
 if __name__ == '__main__':
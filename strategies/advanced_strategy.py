@@ -1,16 +1,302 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
 from .base_strategy import BaseStrategy
-from utils.data_preprocessor import preprocess_data
+from utils.features import FeatureEngine
+from utils.model_trainer import BackgroundTrainer, ModelStore, load_or_fit, DEFAULT_MODEL_PARAMS
+
+
+def _field_names(data):
+    """Column names of a DataFrame or structured array, or the keys of a bar."""
+    names = getattr(getattr(data, 'dtype', None), 'names', None)
+    if names:
+        return names
+    return data.keys() if hasattr(data, 'keys') else ()
+
+
+def _to_seconds(times):
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[s]').astype(np.int64)
+    return times.astype(np.int64)
+
+
+def _times(data):
+    """Bar open times in epoch seconds, or bar numbers if the data has none."""
+    if 'time' in _field_names(data):
+        return _to_seconds(data['time'])
+    return np.arange(len(data), dtype=np.int64)
+
+
+def _bar_time(bar, default):
+    if 'time' not in _field_names(bar):
+        return default
+    value = bar['time']
+    if isinstance(value, pd.Timestamp):
+        value = value.to_datetime64()
+    return int(_to_seconds(value))
+
+
+def _up_probability(model, X):
+    """Probability of the 'up' class, also for models that only saw one class."""
+    classes = list(model.classes_)
+    if 1 not in classes:
+        return np.zeros(len(X))
+    return model.predict_proba(X)[:, classes.index(1)]
 
 
 class MLStrategy(BaseStrategy):
-    def __init__(self, short_period=9, long_period=21, rsi_period=14, min_train_samples=100):
+    """
+    Walk-forward machine learning strategy.
+
+    A classifier predicts whether the next bar closes higher from the
+    `FeatureEngine` features of the bars so far. It is refitted every
+    `retrain_interval` bars on the last `train_window` bars, on a background
+    worker: the signal path keeps using
+    the previous model until the new one is ready and then swaps it in, so
+    inference never waits for training. Fitted models are persisted in a
+    `ModelStore` keyed by the training window and the parameters, so folds
+    already fitted are reloaded instead of refitted.
+
+    - Generates BUY when the up probability exceeds `threshold`.
+    - Generates SELL when it falls below ``1 - threshold``.
+    """
+
+    def __init__(self, short_period=9, long_period=21, rsi_period=14, atr_period=14, norm_window=50,
+                 min_train_samples=100,
+                 train_window=2000, retrain_interval=500, threshold=0.55, model_dir='data/models',
+                 model_params=None, background=True, executor='thread', indicators=None):
         super().__init__()
         self.short_period = short_period
         self.long_period = long_period
         self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.norm_window = norm_window
         self.min_train_samples = min_train_samples
+        self.train_window = train_window
+        self.retrain_interval = retrain_interval
+        self.threshold = threshold
+        self.model_params = model_params or DEFAULT_MODEL_PARAMS
+        self.background = background
+        self.store = ModelStore(model_dir) if model_dir else None
+        self.trainer = BackgroundTrainer(self.store, executor) if background else None
         self.model = None
+        self.model_key = None
+
+        # `indicators` shares the streaming indicators of a symbol and timeframe
+        self.features = FeatureEngine(short_period, long_period, rsi_period, atr_period, norm_window,
+                                      indicators=indicators)
+        self.reset()
+
+    @property
+    def warm_up_bars(self):
+        """Enough candles for the features and a full training window, so a model is fitted at once."""
+        return self.features.min_bars + max(self.train_window, self.min_train_samples) + 1
+
+    def _training_params(self):
+        params = self.features.params()
+        params['model_params'] = repr(sorted(self.model_params.items()))
+        return params
+
+    # --- Training -----------------------------------------------------------
+
+    def _training_due(self, num_bars):
+        labelled = num_bars - self.features.min_bars
+        if labelled < self.min_train_samples:
+            return False
+        return self._trained_at is None or num_bars - self._trained_at >= self.retrain_interval
+
+    def _training_window(self, X, closes, times, first_bar, num_bars):
+        """
+        Training rows of the bars seen so far.
+
+        `X`, `closes` and `times` hold the bars ``first_bar .. num_bars - 1``.
+        The last bar has no label yet, and rows before ``min_bars - 1`` are
+        still warming up.
+        """
+        lo = max(self.features.min_bars - 1, num_bars - 1 - self.train_window) - first_bar
+        hi = num_bars - 1 - first_bar
+        y = (closes[lo + 1:hi + 1] > closes[lo:hi]).astype(np.int8)
+        key = self.store.key(self._training_params(), times[lo:hi + 1], closes[lo:hi + 1]) \
+            if self.store is not None else None
+        return key, X[lo:hi], y
+
+    def _train(self, key, X, y, num_bars):
+        if self.background:
+            # Collect a finished job first so its model is not lost
+            self._swap_model()
+            if self.trainer.submit(key, X, y, self.model_params):
+                self._trained_at = num_bars
+        else:
+            self.model = load_or_fit(self.store, key, X, y, self.model_params)
+            self.model_key = key
+            self._trained_at = num_bars
+
+    def _swap_model(self):
+        """Installs a model the background trainer has finished, if any."""
+        if self.trainer is not None:
+            finished = self.trainer.poll()
+            if finished is not None:
+                self.model_key, self.model = finished
+
+    # --- Signals ------------------------------------------------------------
+
+    def _direction(self, probability):
+        if probability > self.threshold:
+            return 1
+        if probability < 1 - self.threshold:
+            return -1
+        return 0
+
+    def _signal(self, row):
+        self._swap_model()
+        if self.model is None or np.isnan(row).any():
+            return 'HOLD'
+        direction = self._direction(_up_probability(self.model, row.reshape(1, -1))[0])
+        signal = {1: 'BUY', -1: 'SELL'}.get(direction)
+        if signal is None or signal == self.last_signal:
+            return 'HOLD'
+        self.last_signal = signal
+        return signal
 
     def generate_signal(self, data):
-        df = preprocess_data(data)
-        return
\ No newline at end of file
+        """
+        Generates a trading signal (BUY, SELL, or HOLD) for the latest bar.
+
+        Starts a retraining when one is due; until a model is ready the
+        strategy holds.
+
+        Args:
+            data (pd.DataFrame): A DataFrame containing 'close' prices.
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        num_bars = len(data)
+        if num_bars < self.features.min_bars:
+            return 'HOLD'
+        X = self.features.transform(data)
+        if self._training_due(num_bars):
+            closes = np.asarray(data['close'], dtype=np.float64)
+            key, X_train, y = self._training_window(X, closes, _times(data), 0, num_bars)
+            self._train(key, X_train, y, num_bars)
+        return self._signal(X[-1])
+
+    def generate_signals(self, data):
+        """
+        Walk-forward backtest of the strategy in one call.
+
+        The history is cut into folds of `retrain_interval` bars. The model of
+        each fold is fitted on the `train_window` bars before it (or loaded
+        from the model store if that fold was fitted before) and predicts the
+        whole fold in one batch. Retraining is treated as instantaneous, which
+        matches the streaming path with ``background=False``.
+
+        Args:
+            data (pd.DataFrame or np.ndarray): Historical data with a 'close'
+                column.
+
+        Returns:
+            np.ndarray: An object array where element ``i`` is the signal for
+            ``data[:i]``.
+        """
+        n = len(data)
+        signals = np.full(n, 'HOLD', dtype=object)
+        first_fold = self.features.min_bars + self.min_train_samples
+        if n <= first_fold:
+            return signals
+
+        X = self.features.transform(data)
+        closes = np.asarray(data['close'], dtype=np.float64)
+        times = _times(data)
+        directions = np.zeros(n, dtype=np.int8)
+        for start in range(first_fold, n, self.retrain_interval):
+            end = min(start + self.retrain_interval, n)
+            key, X_train, y = self._training_window(X, closes, times, 0, start)
+            self.model = load_or_fit(self.store, key, X_train, y, self.model_params)
+            self.model_key = key
+            # signals[i] acts on the prediction for the row of bar i - 1
+            probability = _up_probability(self.model, X[start - 1:end - 1])
+            directions[start:end] = np.where(probability > self.threshold, 1,
+                                             np.where(probability < 1 - self.threshold, -1, 0))
+
+        # De-duplicate like last_signal does: a direction is only emitted when
+        # it differs from the previously emitted one
+        event_idx = np.flatnonzero(directions)
+        if len(event_idx) == 0:
+            return signals
+        event_dir = directions[event_idx]
+        previous_dir = np.empty_like(event_dir)
+        previous_dir[0] = {'BUY': 1, 'SELL': -1}.get(self.last_signal, 0)
+        previous_dir[1:] = event_dir[:-1]
+        emitted = event_dir != previous_dir
+
+        signals[event_idx[emitted & (event_dir == 1)]] = 'BUY'
+        signals[event_idx[emitted & (event_dir == -1)]] = 'SELL'
+        self.last_signal = 'BUY' if event_dir[-1] == 1 else 'SELL'
+        return signals
+
+    # --- Streaming ----------------------------------------------------------
+
+    def on_bar(self, bar):
+        """
+        Streams one new bar: appends its feature row in O(1), starts a
+        retraining when one is due, and predicts with the current model.
+
+        Args:
+            bar: A mapping with a 'close' field (MT5 rate row, dict or Series).
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        row = self.features.on_bar(bar)
+        self._rows.append(row)
+        self._closes.append(float(bar['close']))
+        self._bar_times.append(_bar_time(bar, self._num_bars))
+        self._num_bars += 1
+
+        if self._training_due(self._num_bars):
+            first_bar = self._num_bars - len(self._rows)
+            key, X, y = self._training_window(np.array(self._rows), np.array(self._closes),
+                                              np.array(self._bar_times, dtype=np.int64),
+                                              first_bar, self._num_bars)
+            self._train(key, X, y, self._num_bars)
+        return self._signal(row)
+
+    def update(self, bar):
+        """
+        Revises the most recent bar (the still-forming candle) in O(1).
+
+        Args:
+            bar: A mapping with a 'close' field.
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        if self._num_bars == 0:
+            return self.on_bar(bar)
+        row = self.features.update(bar)
+        self._rows[-1] = row
+        self._closes[-1] = float(bar['close'])
+        return self._signal(row)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.trainer is not None and self.trainer._future is not None:
+            # The job is not pickled with the trainer, so retrain on the next
+            # bar; a fit that did finish is reloaded from the model store
+            state['_trained_at'] = None
+        return state
+
+    def reset(self):
+        """Clears the streaming state; the current model and last_signal are kept."""
+        self.features.reset()
+        # The training window plus the unlabelled newest bar
+        self._rows = deque(maxlen=self.train_window + 1)
+        self._closes = deque(maxlen=self.train_window + 1)
+        self._bar_times = deque(maxlen=self.train_window + 1)
+        self._num_bars = 0
+        self._trained_at = None
+
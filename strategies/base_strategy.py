@@ -1,10 +1,142 @@
+import numpy as np
+import pandas as pd
+
+# Signal codes of `generate_signal_matrix`
+SIGNAL_CODES = {'BUY': 1, 'SELL': -1, 'HOLD': 0}
+
+
 class BaseStrategy:
     def __init__(self):
         self.last_signal = None
-    
+
     def generate_signal(self, data):
         """
         Generate a trading signal based on input data.
         Must be implemented by subclasses.
         """
         raise NotImplementedError('Subclasses must implement generate_signal.')
+
+    def generate_signals(self, data):
+        """
+        Generate the signal for every bar of a backtest in one call.
+
+        Element ``i`` of the result is the signal `generate_signal` would
+        return when called with ``data.iloc[:i]``, i.e. the signal that is
+        acted upon at bar ``i``. This default replays `generate_signal` on
+        every prefix; subclasses should override it with a vectorized version.
+
+        Args:
+            data (pd.DataFrame): The full historical data.
+
+        Returns:
+            np.ndarray: An object array of 'BUY', 'SELL' or 'HOLD'.
+        """
+        signals = np.full(len(data), 'HOLD', dtype=object)
+        for i in range(len(data)):
+            signals[i] = self.generate_signal(data.iloc[:i])
+        return signals
+
+    def generate_signal_matrix(self, closes):
+        """
+        Generate the backtest signals of several symbols at once.
+
+        Each column is an independent symbol: the signals match calling
+        `generate_signals` on that symbol's own bars, starting without a
+        last_signal. This default does exactly that column by column;
+        subclasses can override it with a 2D vectorized version.
+
+        Args:
+            closes (np.ndarray): Close prices, one row per aligned bar time
+                and one column per symbol, NaN where a symbol has no bar.
+
+        Returns:
+            np.ndarray: int8 matrix of the same shape, 1 for BUY, -1 for
+            SELL and 0 for HOLD (or no bar).
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        codes = np.zeros(closes.shape, dtype=np.int8)
+        last_signal = self.last_signal
+        for j in range(closes.shape[1]):
+            rows = np.flatnonzero(~np.isnan(closes[:, j]))
+            self.last_signal = None
+            signals = self.generate_signals(pd.DataFrame({'close': closes[rows, j]}))
+            codes[rows, j] = [SIGNAL_CODES[signal] for signal in signals]
+        self.last_signal = last_signal
+        return codes
+
+    def on_bar(self, bar):
+        """
+        Feed the next bar to the strategy's streaming state and return the
+        signal for the history ending with it. Streaming strategies keep
+        running state so this costs O(1) per bar.
+
+        Args:
+            bar: A mapping with the bar's fields (MT5 rate row, dict or Series).
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support streaming.')
+
+    def update(self, bar):
+        """
+        Revise the most recent bar (e.g. the still-forming candle) and return
+        the signal for the revised history.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support streaming.')
+
+    def reset(self):
+        """Clear the streaming state. last_signal is kept."""
+        raise NotImplementedError(f'{type(self).__name__} does not support streaming.')
+
+    @property
+    def warm_up_bars(self):
+        """Candles the live loop fetches to warm the streaming state up from scratch."""
+        return self.long_period + 5
+
+    def warm_up(self, data):
+        """
+        Load historical bars into the streaming state without emitting
+        signals, so last_signal is left untouched.
+
+        Args:
+            data (pd.DataFrame or np.ndarray): Bars in chronological order.
+        """
+        last_signal = self.last_signal
+        bars = data.to_dict('records') if hasattr(data, 'to_dict') else data
+        for bar in bars:
+            self.on_bar(bar)
+        self.last_signal = last_signal
+
+    def stream(self, rates, last_bar_time=None):
+        """
+        Feed freshly fetched candles to the streaming state.
+
+        Candles newer than `last_bar_time` are appended with `on_bar`, the
+        candle at `last_bar_time` (which was still forming when last fed) is
+        revised with `update`, and older ones are ignored. Only the newest
+        candle may emit a signal, just like `generate_signal` on the whole
+        window.
+
+        Args:
+            rates (np.ndarray): MT5 rates in chronological order.
+            last_bar_time (int): Open time of the newest candle already fed,
+                or None on the first call.
+
+        Returns:
+            tuple: (signal, open time of the newest candle)
+        """
+        last_signal = self.last_signal
+        for bar in rates[:-1]:
+            if last_bar_time is None or bar['time'] > last_bar_time:
+                self.on_bar(bar)
+            elif bar['time'] == last_bar_time:
+                self.update(bar)
+        self.last_signal = last_signal
+
+        latest = rates[-1]
+        if last_bar_time is not None and latest['time'] == last_bar_time:
+            signal = self.update(latest)
+        else:
+            signal = self.on_bar(latest)
+        return signal, latest['time']
@@ -1,11 +1,78 @@
-from .rule_based_strategy import MovingAverageCrossover
-from .advanced_strategy import MLStrategy
+import importlib
+from importlib.metadata import entry_points
 
+# Entry-point group through which installed packages add strategies
+ENTRY_POINT_GROUP = 'trading_bot.strategies'
 
-def create_strategy(strategy_name, **kwargs):
-    if strategy_name == 'rule_based':
-        return MovingAverageCrossover(**kwargs)
-    elif strategy_name == 'ml_strategy':
-        return MLStrategy(**kwargs)
+# Strategy name -> 'module:Class'. Modules are only imported when their
+# strategy is first created, so the rule-based bot never loads scikit-learn.
+STRATEGY_REGISTRY = {
+    'rule_based': 'strategies.rule_based_strategy:MovingAverageCrossover',
+    'ml_strategy': 'strategies.advanced_strategy:MLStrategy',
+}
+
+_classes = {}
+_entry_points_loaded = False
+
+
+def register_strategy(name, target):
+    """
+    Registers a strategy under a name.
+
+    Args:
+        name (str): Name passed to `create_strategy`.
+        target (str or type): The strategy class, or its 'module:Class'
+            path to import on first use.
+    """
+    if isinstance(target, str):
+        STRATEGY_REGISTRY[name] = target
+        _classes.pop(name, None)
     else:
+        STRATEGY_REGISTRY[name] = f'{target.__module__}:{target.__qualname__}'
+        _classes[name] = target
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    found = entry_points()
+    # Python 3.9 returns a dict of groups, later versions a selectable collection
+    found = found.select(group=ENTRY_POINT_GROUP) if hasattr(found, 'select') else found.get(ENTRY_POINT_GROUP, ())
+    for entry_point in found:
+        # Built-in names win over plugins
+        STRATEGY_REGISTRY.setdefault(entry_point.name, entry_point.value)
+
+
+def available_strategies():
+    """Returns the sorted names of the built-in and installed strategies."""
+    _load_entry_points()
+    return sorted(STRATEGY_REGISTRY)
+
+
+def get_strategy_class(strategy_name):
+    """
+    Imports (once) and returns the class registered under a name.
+
+    Raises:
+        ValueError: If no strategy has that name.
+    """
+    cls = _classes.get(strategy_name)
+    if cls is not None:
+        return cls
+    if strategy_name not in STRATEGY_REGISTRY:
+        _load_entry_points()
+    target = STRATEGY_REGISTRY.get(strategy_name)
+    if target is None:
         raise ValueError(f'Unknown strategy: {strategy_name}')
+    module_name, _, class_name = target.partition(':')
+    cls = importlib.import_module(module_name)
+    for attribute in class_name.split('.'):
+        cls = getattr(cls, attribute)
+    _classes[strategy_name] = cls
+    return cls
+
+
+def create_strategy(strategy_name, **kwargs):
+    return get_strategy_class(strategy_name)(**kwargs)
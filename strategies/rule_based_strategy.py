@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 
 from .base_strategy import BaseStrategy
+from utils.indicator_graph import IndicatorStream, indicator_graph
 
 
 class MovingAverageCrossover(BaseStrategy):
@@ -10,12 +11,26 @@ class MovingAverageCrossover(BaseStrategy):
 
     - Generates a BUY signal when the short-term MA crosses above the long-term MA.
     - Generates a SELL signal when the short-term MA crosses below the long-term MA.
+
+    The moving averages come from the shared indicator graph: backtests of
+    several variants on the same bars compute each one once, and strategies
+    given the same `indicators` stream (one per symbol and timeframe) update
+    it once per bar.
+
+    Args:
+        short_period (int): Short moving average window.
+        long_period (int): Long moving average window.
+        indicators (IndicatorStream): Streaming indicators to share, e.g.
+            ``indicator_graph.stream(symbol, timeframe)``; private by default.
     """
 
-    def __init__(self, short_period=9, long_period=21):
+    def __init__(self, short_period=9, long_period=21, indicators=None):
         super().__init__()
         self.short_period = short_period
         self.long_period = long_period
+        self.indicators = indicators if indicators is not None else IndicatorStream()
+        self._short_ma = self.indicators.node('sma', window=short_period)
+        self._long_ma = self.indicators.node('sma', window=long_period)
 
     def generate_signal(self, data):
         """
@@ -43,17 +58,157 @@ class MovingAverageCrossover(BaseStrategy):
         previous_short_ma = df['short_ma'].iloc[-2]
         previous_long_ma = df['long_ma'].iloc[-2]
 
+        return self._crossover_signal(previous_short_ma, previous_long_ma,
+                                      latest_short_ma, latest_long_ma)
+
+    def _crossover_signal(self, previous_short_ma, previous_long_ma, latest_short_ma, latest_long_ma):
+        """Turns the last two MA values into a de-duplicated signal."""
         if not pd.isna(previous_short_ma) and not pd.isna(previous_long_ma):
             # Check for BUY signal: short MA crosses above long MA
             if previous_short_ma < previous_long_ma and latest_short_ma > latest_long_ma:
                 if self.last_signal != 'BUY':
                     self.last_signal = 'BUY'
                     return 'BUY'
-            
+
             # Check for SELL signal: short MA crosses below long MA
             elif previous_short_ma > previous_long_ma and latest_short_ma < latest_long_ma:
                 if self.last_signal != 'SELL':
                     self.last_signal = 'SELL'
                     return 'SELL'
-        
+
         return 'HOLD'
+
+    def generate_signals(self, data):
+        """
+        Vectorized version of `generate_signal` for backtesting.
+
+        Both moving averages are computed once over the whole close series
+        instead of once per bar. Pandas' rolling mean only looks backwards, so
+        its value at a bar is bit-identical to the one computed on the prefix
+        ending there, and the signals match the per-bar loop exactly.
+
+        Args:
+            data (pd.DataFrame or np.ndarray): Historical data with a 'close'
+                column (a DataFrame or an MT5 rates structured array).
+
+        Returns:
+            np.ndarray: An object array where element ``i`` is the signal for
+            ``data[:i]``.
+        """
+        close = np.asarray(data['close'], dtype=np.float64)
+        n = len(close)
+        signals = np.full(n, 'HOLD', dtype=object)
+        if n < 2:
+            return signals
+
+        batch = indicator_graph.batch(data)
+        short_ma = batch.get('sma', window=self.short_period)
+        long_ma = batch.get('sma', window=self.long_period)
+
+        # signals[i] compares the MAs at bars i - 2 (previous) and i - 1 (latest);
+        # comparisons against NaN are False, which covers the warm-up period
+        previous_short, previous_long = short_ma[:-2], long_ma[:-2]
+        latest_short, latest_long = short_ma[1:-1], long_ma[1:-1]
+        events = np.zeros(n, dtype=np.int8)
+        events[2:][(previous_short < previous_long) & (latest_short > latest_long)] = 1
+        events[2:][(previous_short > previous_long) & (latest_short < latest_long)] = -1
+
+        # De-duplicate like last_signal does: a crossover is only emitted when
+        # it differs from the previous crossover (or the carried-in last_signal)
+        event_idx = np.flatnonzero(events)
+        if len(event_idx) == 0:
+            return signals
+        event_dir = events[event_idx]
+        previous_dir = np.empty_like(event_dir)
+        previous_dir[0] = {'BUY': 1, 'SELL': -1}.get(self.last_signal, 0)
+        previous_dir[1:] = event_dir[:-1]
+        emitted = event_dir != previous_dir
+
+        signals[event_idx[emitted & (event_dir == 1)]] = 'BUY'
+        signals[event_idx[emitted & (event_dir == -1)]] = 'SELL'
+        self.last_signal = 'BUY' if event_dir[-1] == 1 else 'SELL'
+        return signals
+
+    def generate_signal_matrix(self, closes):
+        """
+        2D version of `generate_signals` for portfolio backtests.
+
+        The moving averages of every symbol are computed in one rolling pass
+        over the whole matrix and the crossovers are de-duplicated per
+        column, so the cost grows with the number of cells rather than with
+        Python calls per symbol. Columns with missing bars in the middle
+        (rather than only before their first bar) fall back to the per-symbol
+        default, since their rolling windows must skip the gaps.
+
+        Args:
+            closes (np.ndarray): Close prices, one column per symbol.
+
+        Returns:
+            np.ndarray: int8 matrix, 1 for BUY, -1 for SELL and 0 for HOLD.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        missing = np.isnan(closes)
+        started = np.maximum.accumulate(~missing, axis=0)
+        if (missing & started).any():
+            return super().generate_signal_matrix(closes)
+
+        n = len(closes)
+        codes = np.zeros(closes.shape, dtype=np.int8)
+        if n < 2:
+            return codes
+        frame = pd.DataFrame(closes)
+        short_ma = frame.rolling(window=self.short_period).mean().to_numpy()
+        long_ma = frame.rolling(window=self.long_period).mean().to_numpy()
+
+        previous_short, previous_long = short_ma[:-2], long_ma[:-2]
+        latest_short, latest_long = short_ma[1:-1], long_ma[1:-1]
+        events = np.zeros(closes.shape, dtype=np.int8)
+        events[2:][(previous_short < previous_long) & (latest_short > latest_long)] = 1
+        events[2:][(previous_short > previous_long) & (latest_short < latest_long)] = -1
+
+        # De-duplicate within each column, walking the events column by column
+        column, row = np.nonzero(events.T)
+        if len(row) == 0:
+            return codes
+        event_dir = events[row, column]
+        previous_dir = np.empty_like(event_dir)
+        previous_dir[0] = 0
+        previous_dir[1:] = np.where(column[1:] == column[:-1], event_dir[:-1], 0)
+        emitted = event_dir != previous_dir
+        codes[row[emitted], column[emitted]] = event_dir[emitted]
+        return codes
+
+    def on_bar(self, bar):
+        """
+        Streams one new bar into the running moving averages in O(1).
+
+        Feeding every bar of a history through `on_bar` yields, after bar ``i``,
+        the same signal as ``generate_signal(data[:i + 1])``.
+
+        Args:
+            bar: A mapping with a 'close' field (MT5 rate row, dict or Series).
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        self.indicators.on_bar(bar)
+        return self._crossover_signal(self._short_ma.previous, self._long_ma.previous,
+                                      self._short_ma.value, self._long_ma.value)
+
+    def update(self, bar):
+        """
+        Revises the most recent bar (the still-forming candle) in O(1).
+
+        Args:
+            bar: A mapping with a 'close' field.
+
+        Returns:
+            str: 'BUY', 'SELL', or 'HOLD'.
+        """
+        self.indicators.update(bar)
+        return self._crossover_signal(self._short_ma.previous, self._long_ma.previous,
+                                      self._short_ma.value, self._long_ma.value)
+
+    def reset(self):
+        """Clears the streaming state (of the whole stream if shared); last_signal is kept."""
+        self.indicators.reset()
@@ -0,0 +1,33 @@
+import numpy as np
+
+from utils.benchmark import CASES, compare, run_suite, save_baseline, load_baseline
+from utils.synthetic import synthetic_rates, synthetic_ticks
+
+
+def test_synthetic_series_are_deterministic_and_consistent():
+    rates = synthetic_rates(5000, seed=3)
+    np.testing.assert_array_equal(rates, synthetic_rates(5000, seed=3))
+    assert not np.array_equal(rates['close'], synthetic_rates(5000, seed=4)['close'])
+    assert (np.diff(rates['time']) == 900).all()
+    assert (rates['high'] >= np.maximum(rates['open'], rates['close'])).all()
+    assert (rates['low'] <= np.minimum(rates['open'], rates['close'])).all()
+
+    ticks = synthetic_ticks(5000, seed=3)
+    np.testing.assert_array_equal(ticks, synthetic_ticks(5000, seed=3))
+    assert (np.diff(ticks['time_msc']) >= 1).all() and (ticks['ask'] > ticks['bid']).all()
+
+
+def test_suite_runs_offline_and_gates_regressions(tmp_path):
+    results = run_suite(sizes=[2000], repeats=1, log=None)
+    assert set(results) == {f'{name}@2000' for name in CASES}
+    assert all(result['seconds'] > 0 and result['peak_mb'] >= 0 for result in results.values())
+
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(results, path)
+    baseline = load_baseline(path)
+    assert compare(results, baseline, min_seconds=0) == []
+
+    slower = {key: dict(result, seconds=result['seconds'] * 2) for key, result in results.items()}
+    regressions = compare(slower, baseline, max_slowdown=0.25, min_seconds=0)
+    assert len(regressions) == len(CASES)
+    assert compare(slower, baseline, max_slowdown=1.5, min_seconds=0) == []
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from utils.broker import ReplayBroker, ReplayFinished
+from utils.data_store import OHLCVStore, RATES_DTYPE
+
+
+@pytest.fixture
+def replay(tmp_path):
+    rates = np.zeros(200, dtype=RATES_DTYPE)
+    rates['time'] = 900 * np.arange(200)
+    rates['close'] = 1.1 + 1e-4 * np.arange(200)  # steady uptrend
+    rates['open'] = rates['close'] - 1e-4
+    rates['high'] = rates['close'] + 5e-5
+    rates['low'] = rates['open'] - 5e-5
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, rates)
+    return ReplayBroker(store=store, symbol='EURUSD', timeframe=15, start_bar=50)
+
+
+def test_rates_follow_the_replay_clock(replay):
+    rates = replay.copy_rates_from_pos('EURUSD', 15, 0, 10)
+    assert len(rates) == 10 and rates['time'][-1] == 900 * 50
+    assert replay.symbol_info_tick('EURUSD').bid == pytest.approx(rates['open'][-1])
+
+    replay.sleep(900)
+    assert replay.copy_rates_from_pos('EURUSD', 15, 0, 1)['time'][-1] == 900 * 51
+
+
+def test_forming_candle_is_served_at_its_open(replay):
+    forming = replay.copy_rates_from_pos('EURUSD', 15, 0, 1)[0]
+    recorded = replay.store.load('EURUSD', 15)[50]
+    assert forming['open'] == recorded['open'] and forming['close'] == recorded['open'] != recorded['close']
+    assert forming['high'] == forming['low'] == recorded['open']
+    assert replay.symbol_info_tick('EURUSD').bid == recorded['open']
+    # Closed candles are served whole
+    assert np.array_equal(replay.copy_rates_from_pos('EURUSD', 15, 1, 1), replay.store.load('EURUSD', 15)[49:50])
+
+
+def test_order_send_fills_and_closes(replay):
+    request = {'symbol': 'EURUSD', 'type': replay.ORDER_TYPE_BUY, 'volume': 1.0, 'magic': 7}
+    result = replay.order_send(request)
+    assert result.retcode == replay.TRADE_RETCODE_DONE
+    assert replay.positions_get(symbol='EURUSD')[0].magic == 7
+
+    replay.sleep(900 * 10)
+    close = dict(request, type=replay.ORDER_TYPE_SELL, position=result.order)
+    assert replay.order_send(close).retcode == replay.TRADE_RETCODE_DONE
+    assert replay.positions_get() == ()
+    assert replay.account_info().balance > 10000.0
+
+
+def test_take_profit_is_hit_while_sleeping(replay):
+    ask = replay.symbol_info_tick('EURUSD').ask
+    replay.order_send({'symbol': 'EURUSD', 'type': replay.ORDER_TYPE_BUY, 'volume': 1.0,
+                       'sl': ask - 0.01, 'tp': ask + 5e-4})
+    replay.sleep(900 * 10)
+    assert replay.positions_get() == ()
+    assert replay.account_info().balance == pytest.approx(10000.0 + 50.0)
+
+
+def test_replay_finishes_at_end_of_data(replay):
+    with pytest.raises(ReplayFinished):
+        replay.sleep(900 * 1000)
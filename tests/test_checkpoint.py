@@ -0,0 +1,70 @@
+import os
+import pickle
+
+from strategies.advanced_strategy import MLStrategy
+from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.backtester import SimulatedTradeManager
+from utils.checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+from utils.optimizer import optimize, run_single_backtest
+from utils.synthetic import synthetic_rates
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'run' / 'state.pkl')
+    save_checkpoint(path, ('live', 'rule_based'), {'last_bar_time': 900})
+    assert load_checkpoint(path, ('live', 'rule_based')) == {'last_bar_time': 900}
+    # Taken for another run, or unreadable
+    assert load_checkpoint(path, ('live', 'ml_strategy')) is None
+    assert os.listdir(tmp_path / 'run') == ['state.pkl']
+    with open(path, 'wb') as f:
+        f.write(b'truncated')
+    assert load_checkpoint(path, ('live', 'rule_based')) is None
+
+    checkpoint = Checkpoint(path, interval=3600)
+    assert not checkpoint.due()
+    checkpoint.clear()
+    assert not os.path.exists(path)
+
+
+def _stream(strategy, trade_manager, rates, start, stop, signal='HOLD'):
+    for i in range(start, stop):
+        trade_manager.process_bar(signal, rates['close'][i], rates['time'][i])
+        signal = strategy.on_bar(rates[i])
+    return signal
+
+
+def test_streaming_resumes_from_a_snapshot(tmp_path):
+    rates = synthetic_rates(3000)
+    for make in (MovingAverageCrossover,
+                 lambda: MLStrategy(train_window=300, retrain_interval=150, model_dir=str(tmp_path),
+                                    background=False, model_params={'n_estimators': 5, 'random_state': 0})):
+        strategy, trade_manager = make(), SimulatedTradeManager(10000.0, point=1e-5)
+        _stream(strategy, trade_manager, rates, 0, len(rates))
+
+        resumed, resumed_manager = make(), SimulatedTradeManager(10000.0, point=1e-5)
+        signal = _stream(resumed, resumed_manager, rates, 0, 1700)
+        resumed, resumed_manager = pickle.loads(pickle.dumps((resumed, resumed_manager)))
+        assert resumed.last_signal is not None and resumed_manager.trades
+        _stream(resumed, resumed_manager, rates, 1700, len(rates), signal)
+
+        assert resumed_manager.balance == trade_manager.balance
+        assert len(resumed_manager.trades) == len(trade_manager.trades)
+
+
+def test_optimize_skips_finished_parameter_sets(tmp_path):
+    rates = synthetic_rates(3000)
+    grid = {'short_period': [5, 9], 'long_period': [21, 40]}
+    checkpoint = Checkpoint(str(tmp_path / 'optimize.pkl'), interval=0)
+    # A sweep stopped after one parameter set, with a marker to see it is not rerun
+    finished = run_single_backtest('rule_based', {'short_period': 5, 'long_period': 21}, rates, 1e-5)
+    finished['total_return'] = 1e6
+    key = ('optimize', 'rule_based', 1e-5, len(rates), *rates[[0, -1]][['time', 'close']].tolist())
+    save_checkpoint(checkpoint.path, key, {(('short_period', 5), ('long_period', 21)): finished})
+
+    results = optimize('rule_based', rates, 1e-5, grid=grid, processes=2, checkpoint=checkpoint)
+    assert len(results) == 4 and results.iloc[0]['total_return'] == 1e6
+    expected = run_single_backtest('rule_based', {'short_period': 9, 'long_period': 40}, rates, 1e-5)
+    row = results[(results['short_period'] == 9) & (results['long_period'] == 40)].iloc[0]
+    assert row['total_return'] == expected['total_return']
+    # Cleared once the sweep completed
+    assert not os.path.exists(checkpoint.path)
@@ -1,6 +1,14 @@
+import threading
+import time
+
+import numpy as np
 import pytest
 import pandas as pd
+import utils.data_fetcher as data_fetcher
 from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.broker import ReplayBroker, set_broker
+from utils.data_store import OHLCVStore
+from utils.synthetic import synthetic_rates
 
 
 def test_moving_average_crossover():
@@ -10,3 +18,35 @@ def test_moving_average_crossover():
     strategy = MovingAverageCrossover(short_period=3, long_period=5)
     signal = strategy.generate_signal(data)
     assert signal in ['BUY', 'SELL', 'HOLD']
+
+
+def test_concurrent_pipelines_store_each_candle_once(tmp_path, monkeypatch):
+    source = OHLCVStore(str(tmp_path / 'source'))
+    source.append('EURUSD', 15, synthetic_rates(500))
+    backend = ReplayBroker(store=source, symbol='EURUSD', timeframe=15, start_bar=100)
+    fetch = backend.copy_rates_from_pos
+    # A slow terminal widens the window between reading the store and writing it
+    monkeypatch.setattr(backend, 'copy_rates_from_pos', lambda *args: time.sleep(0.002) or fetch(*args))
+    local = OHLCVStore(str(tmp_path / 'local'))
+    monkeypatch.setattr(data_fetcher, 'data_store', local)
+    monkeypatch.setitem(data_fetcher.settings.TRADING, 'base_timeframe', None)
+    set_broker(backend)
+    try:
+        for _ in range(10):
+            barrier = threading.Barrier(4)
+
+            def pipeline():
+                barrier.wait()
+                data_fetcher.get_historical_data('EURUSD', 15, 50, use_store=True)
+
+            threads = [threading.Thread(target=pipeline) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            backend.sleep(900)
+    finally:
+        set_broker(None)
+
+    stored = local.load('EURUSD', 15)['time']
+    assert len(stored) >= 50 and np.all(np.diff(stored) == 900)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+from utils.data_store import OHLCVStore, RATES_DTYPE
+
+
+def _rates(start, count, step=900):
+    rates = np.zeros(count, dtype=RATES_DTYPE)
+    rates['time'] = start + step * np.arange(count)
+    rates['close'] = np.linspace(1.1, 1.2, count)
+    return rates
+
+
+def test_append_only_keeps_newer_candles(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    assert store.last_time('EURUSD', 15) is None
+
+    assert store.append('EURUSD', 15, _rates(0, 10)) == 10
+    # overlapping download: only the two new candles are written
+    assert store.append('EURUSD', 15, _rates(900 * 8, 4)) == 2
+    stored = store.load('EURUSD', 15)
+    assert len(stored) == 12
+    assert np.all(np.diff(stored['time']) == 900)
+
+    reopened = OHLCVStore(str(tmp_path))
+    assert reopened.last_time('EURUSD', 'M15') == 900 * 11
+
+
+def test_range_and_tail_are_views(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, _rates(0, 100))
+
+    window = store.range('EURUSD', 15, start=900 * 10, end=900 * 20)
+    assert window['time'][0] == 900 * 10 and len(window) == 10
+    assert np.shares_memory(window, store.load('EURUSD', 15))
+    assert len(store.tail('EURUSD', 15, 5)) == 5
+
+
+def test_merge_backfills_older_history(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, _rates(900 * 50, 10))
+    assert store.merge('EURUSD', 15, _rates(0, 55)) == 60
+    assert store.load('EURUSD', 15)['time'][0] == 0
+
+
+def test_merge_never_replaces_the_mapped_file(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, _rates(900 * 50, 10))
+    view = store.tail('EURUSD', 15, 10)
+    mapped = os.stat(store.path('EURUSD', 15)).st_ino
+
+    assert store.merge('EURUSD', 15, _rates(900 * 20, 42)) == 42
+    assert store.merge('EURUSD', 15, _rates(0, 30)) == 62
+    assert os.stat(store.path('EURUSD', 15)).st_ino == mapped
+    assert view['time'][0] == 900 * 50  # earlier views are left untouched
+
+    stored = store.load('EURUSD', 15)
+    assert len(stored) == 62 and np.all(np.diff(stored['time']) == 900)
+    assert store.count('EURUSD', 15) == 62 and store.last_time('EURUSD', 15) == 900 * 61
+    np.testing.assert_array_equal(store.range('EURUSD', 15, 900 * 45, 900 * 55), stored[45:55])
+    np.testing.assert_array_equal(store.tail('EURUSD', 15, 15), stored[-15:])
+    np.testing.assert_array_equal(OHLCVStore(str(tmp_path)).load('EURUSD', 15), stored)
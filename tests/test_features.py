@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from utils.features import FeatureEngine
+from utils.data_preprocessor import preprocess_data
+
+
+def _bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-3, n))
+    close[300:340] = close[300]  # flat run
+    return pd.DataFrame({'close': close,
+                         'high': close + rng.uniform(0, 1e-3, n),
+                         'low': close - rng.uniform(0, 1e-3, n)})
+
+
+def test_batch_matches_streaming():
+    data = _bars(2000)
+    batch = FeatureEngine().transform(data)
+
+    engine = FeatureEngine()
+    streamed = np.array([engine.on_bar(bar) for bar in data.to_dict('records')])
+
+    assert batch.dtype == np.float32 and batch.shape == (2000, len(engine.names))
+    np.testing.assert_array_equal(np.isnan(batch), np.isnan(streamed))
+    assert not np.isnan(batch[engine.min_bars - 1:]).any()
+    np.testing.assert_allclose(streamed, batch, rtol=1e-5, atol=1e-6)
+
+
+def test_features_do_not_look_ahead():
+    data = _bars(1000, seed=1)
+    full = FeatureEngine().transform(data)
+    prefix = FeatureEngine().transform(data.iloc[:600])
+    np.testing.assert_array_equal(full[:600], prefix)
+
+    # the old preprocessing z-scored every bar with the whole history
+    assert 'zscore' in preprocess_data(data.iloc[:600]).columns
+    np.testing.assert_array_equal(preprocess_data(data)['zscore'].to_numpy()[:600],
+                                  preprocess_data(data.iloc[:600])['zscore'].to_numpy())
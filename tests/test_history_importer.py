@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import utils.history_importer as history_importer
+from utils.history_importer import HistoryDataset, import_csv
+from utils.synthetic import synthetic_rates, synthetic_ticks
+
+# A Monday, so the sample spans a weekend on day 5
+MONDAY = 1704067200 + 86400  # 2024-01-02
+
+
+def _mt5_export(rates, path):
+    times = pd.to_datetime(rates['time'], unit='s')
+    pd.DataFrame({
+        '<DATE>': times.strftime('%Y.%m.%d'), '<TIME>': times.strftime('%H:%M:%S'),
+        '<OPEN>': rates['open'], '<HIGH>': rates['high'], '<LOW>': rates['low'], '<CLOSE>': rates['close'],
+        '<TICKVOL>': rates['tick_volume'], '<VOL>': rates['real_volume'], '<SPREAD>': rates['spread'],
+    }).to_csv(path, sep='\t', index=False)
+
+
+@pytest.fixture
+def m1_rates():
+    rates = synthetic_rates(60 * 24 * 40, timeframe='M1', start=MONDAY)
+    for field in ('open', 'high', 'low', 'close'):
+        rates[field] = np.round(rates[field], 5)
+    # Forex weekends and an outage of two hours on the second Tuesday
+    weekday = (rates['time'] // 86400 + 3) % 7
+    outage = (rates['time'] >= MONDAY + 8 * 86400) & (rates['time'] < MONDAY + 8 * 86400 + 7200)
+    return rates[(weekday < 5) & ~outage]
+
+
+def test_import_round_trips_and_reports_gaps(tmp_path, m1_rates):
+    # Duplicated and out-of-order rows, spread over several chunks
+    shuffled = np.concatenate([m1_rates[5000:], m1_rates[:5000], m1_rates[100:300]])
+    _mt5_export(shuffled, tmp_path / 'EURUSD_M1.csv')
+    report = import_csv(str(tmp_path / 'EURUSD_M1.csv'), 'EURUSD', 'M1', root=str(tmp_path / 'processed'),
+                        chunk_rows=7000, min_gap=3600)
+
+    assert report['rows_read'] == len(shuffled) and report['rows_dropped'] == 0
+    assert report['duplicates'] == 200 and report['rows_stored'] == len(m1_rates)
+    # The outage is reported, the weekends are not
+    assert report['gaps'] == [(MONDAY + 8 * 86400 - 60, MONDAY + 8 * 86400 + 7200)]
+
+    dataset = HistoryDataset(str(tmp_path / 'processed'), 'EURUSD', 'M1')
+    assert list(dataset.partitions) == ['2024-01', '2024-02']
+    np.testing.assert_array_equal(dataset.range(), m1_rates)
+    window = dataset.range('2024-01-31', '2024-02-02')
+    assert window['time'][0] == pd.Timestamp('2024-01-31').timestamp() and len(window) == 2 * 1440
+    with np.load(os.path.join(dataset.path, 'part-2024-01.npz')) as columns:
+        assert columns['close'].dtype == np.float32 and columns['time'].dtype == np.int32
+
+
+def test_tick_import_fills_blank_quotes_and_skips_known_rows(tmp_path):
+    ticks = synthetic_ticks(30000, mean_interval_ms=4000)
+    ticks['bid'], ticks['ask'] = np.round(ticks['bid'], 5), np.round(ticks['ask'], 5)
+    frame = pd.DataFrame({'Timestamp': ticks['time_msc'], 'Bid': ticks['bid'], 'Ask': ticks['ask']})
+    frame.loc[10, 'Bid'] = np.nan  # only the ask changed
+    frame.to_csv(tmp_path / 'ticks.csv', index=False)
+
+    root = str(tmp_path / 'processed')
+    import_csv(str(tmp_path / 'ticks.csv'), 'EURUSD', 'ticks', root=root, chunk_rows=4000)
+    again = import_csv(str(tmp_path / 'ticks.csv'), 'EURUSD', 'ticks', root=root, chunk_rows=4000)
+    assert again['duplicates'] == len(ticks) and again['rows_stored'] == len(ticks)
+
+    expected = ticks.copy()
+    expected['bid'][10] = expected['bid'][9]
+    dataset = HistoryDataset(root, 'EURUSD', 'ticks')
+    np.testing.assert_array_equal(dataset.range(), expected)
+    start = int(ticks['time_msc'][1000]) // 1000
+    window = dataset.range(start, start + 600)
+    assert window['time_msc'][0] >= start * 1000 and window['time_msc'][-1] < (start + 600) * 1000
+
+
+def test_newest_first_file_is_written_as_it_is_read(tmp_path, m1_rates, monkeypatch):
+    _mt5_export(m1_rates[::-1], tmp_path / 'EURUSD_M1.csv')
+    events = []
+    parse_chunk, store = history_importer._parse_chunk, history_importer._store
+    monkeypatch.setattr(history_importer, '_parse_chunk', lambda *args: events.append('chunk') or parse_chunk(*args))
+    monkeypatch.setattr(history_importer, '_store', lambda *args: events.append('store') or store(*args))
+    report = import_csv(str(tmp_path / 'EURUSD_M1.csv'), 'EURUSD', 'M1', root=str(tmp_path / 'processed'),
+                        chunk_rows=5000, period='D')
+
+    # Each day is written once the input has moved past it: only the days of
+    # the last chunk (5000 minutes) are left for the end of the file
+    last_chunk = len(events) - events[::-1].index('chunk')
+    assert events[last_chunk:].count('store') <= 5000 // 1440 + 2
+    assert report['partitions'] > 25
+    assert report['duplicates'] == 0 and report['rows_stored'] == len(m1_rates)
+    np.testing.assert_array_equal(HistoryDataset(str(tmp_path / 'processed'), 'EURUSD', 'M1').range(), m1_rates)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.indicator_graph import IndicatorBatch, IndicatorGraph, IndicatorStream
+from utils.synthetic import synthetic_rates
+
+SPECS = [
+    ('return', {}),
+    ('sma', {'window': 20}),
+    ('std', {'window': 20}),
+    ('ema', {'span': 12}),
+    ('rsi', {'period': 14}),
+    ('atr', {'period': 14}),
+    ('bollinger', {'window': 20, 'k': 2.0, 'band': 'upper'}),
+    ('macd', {'fast_span': 12, 'slow_span': 26}),
+]
+
+
+def _bars(n=800):
+    return pd.DataFrame(synthetic_rates(n, timeframe='M15'))
+
+
+def test_streaming_nodes_match_batch_values():
+    data = _bars()
+    stream = IndicatorStream()
+    nodes = [stream.node(name, **params) for name, params in SPECS]
+    streamed = {i: [] for i in range(len(SPECS))}
+    for bar in data.to_dict('records'):
+        stream.on_bar(bar)
+        for i, node in enumerate(nodes):
+            streamed[i].append(node.value)
+
+    batch = IndicatorBatch(data)
+    for i, (name, params) in enumerate(SPECS):
+        np.testing.assert_allclose(streamed[i], batch.get(name, **params), rtol=1e-7, atol=1e-12,
+                                   equal_nan=True, err_msg=name)
+
+
+def test_strategies_share_one_update_per_bar():
+    data = _bars(300)
+    graph = IndicatorGraph()
+    stream = graph.stream('EURUSD', 'M15')
+    first = MovingAverageCrossover(9, 21, indicators=stream)
+    second = MovingAverageCrossover(5, 21, indicators=graph.stream('EURUSD', 15))
+    assert second._long_ma is first._long_ma
+
+    reference = MovingAverageCrossover(9, 21)
+    for bar in data.to_dict('records'):
+        assert first.on_bar(bar) == reference.on_bar(bar)
+        second.on_bar(bar)
+    assert first._long_ma.value == pytest.approx(data['close'].iloc[-21:].mean())
+
+
+def test_batch_values_are_cached_per_dataset():
+    data = _bars(500)
+    graph = IndicatorGraph(max_datasets=1)
+    sma = graph.batch(data).get('sma', window=10)
+    assert graph.batch(data).get('sma', window=10) is sma
+
+    other = data.copy()
+    assert graph.batch(other).get('sma', window=10) is not sma
+    # A dataset changed in place is computed again
+    other.loc[other.index[-1], 'close'] += 1.0
+    assert graph.batch(other).get('sma', window=10)[-1] == pytest.approx(other['close'].iloc[-10:].mean())
+
+
+def test_late_node_is_warmed_from_history():
+    data = _bars(200)
+    stream = IndicatorStream(history=100)
+    stream.node('sma', window=5)
+    for bar in data.to_dict('records'):
+        stream.on_bar(bar)
+    # Feeding the same bar again does not push it twice
+    stream.on_bar(data.iloc[-1].to_dict())
+
+    late = stream.node('ema', span=10)
+    expected = IndicatorBatch(data.iloc[-100:]).get('ema', span=10)
+    assert late.value == pytest.approx(expected[-1])
+    assert late.previous == pytest.approx(expected[-2])
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from utils.indicators import RollingMean, RollingStats, EWM, RSI, ATR
+
+
+def test_rolling_mean_is_bit_identical_to_pandas():
+    rng = np.random.default_rng(0)
+    values = 1.1 + np.cumsum(rng.normal(0, 1e-3, 5000))
+    values[100:130] = 1.2  # flat run
+
+    rolling = RollingMean(21)
+    streamed = np.array([rolling.push(float(v)) for v in values])
+
+    expected = pd.Series(values).rolling(window=21).mean().to_numpy()
+    np.testing.assert_array_equal(streamed, expected)
+
+
+def test_online_estimators_match_pandas():
+    rng = np.random.default_rng(1)
+    values = 1.1 + np.cumsum(rng.normal(0, 1e-3, 2000))
+    series = pd.Series(values)
+
+    stats = RollingStats(50)
+    streamed = np.array([stats.push(float(v)) for v in values])
+    rolling = series.rolling(window=50)
+    np.testing.assert_allclose(streamed[:, 0], rolling.mean(), rtol=1e-12)
+    np.testing.assert_allclose(streamed[:, 1], rolling.std(), rtol=1e-8)
+
+    ewm = EWM(0.2, min_periods=5)
+    streamed = np.array([ewm.push(float(v)) for v in values])
+    np.testing.assert_allclose(streamed, series.ewm(alpha=0.2, adjust=False, min_periods=5).mean(), rtol=1e-12)
+
+
+def test_replace_last_revises_the_forming_value():
+    values = [1.0, 1.5, 1.2, 1.7, 1.3, 1.6, 1.4]
+    estimators = [
+        (lambda: RollingStats(3), lambda e, v: e.push(v), lambda e, v: e.replace_last(v)),
+        (lambda: EWM(0.3), lambda e, v: e.push(v), lambda e, v: e.replace_last(v)),
+        (lambda: RSI(3), lambda e, v: e.push(v), lambda e, v: e.replace_last(v)),
+        (lambda: ATR(3), lambda e, v: e.push(v + 0.1, v - 0.1, v), lambda e, v: e.replace_last(v + 0.1, v - 0.1, v)),
+    ]
+    for make, push, replace_last in estimators:
+        revised, direct = make(), make()
+        for v in values[:-1]:
+            push(revised, v)
+            push(direct, v)
+        push(revised, 9.9)
+        np.testing.assert_allclose(replace_last(revised, values[-1]), push(direct, values[-1]), rtol=1e-12)
@@ -0,0 +1,61 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logger import BackgroundWriter, EventLog, read_events, configure_logging, shutdown_logging
+
+
+@pytest.fixture
+def root_handlers():
+    root = logging.getLogger()
+    saved, level = list(root.handlers), root.level
+    yield
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_background_writer_writes_everything_in_order(tmp_path):
+    path = tmp_path / 'out.log'
+    writer = BackgroundWriter(str(path), batch_size=100, flush_interval=0.01)
+    for i in range(1000):
+        writer.put(i)
+    writer.close()
+    assert path.read_text().splitlines() == [str(i) for i in range(1000)]
+
+
+def test_async_logging_is_written_on_shutdown(tmp_path, root_handlers):
+    path = tmp_path / 'trading.log'
+    logger = configure_logging('async', console=False, log_file=str(path))
+    for i in range(50):
+        logger.info("bar %d", i)
+    logger.debug("not recorded")
+    shutdown_logging()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 50
+    assert lines[-1].endswith('trading_bot - INFO - bar 49')
+
+
+@pytest.mark.parametrize('name', ['events.bin', 'events.jsonl'])
+def test_event_log_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    log = EventLog()
+    log.open(path, kinds=('trade', 'signal'))
+    entry = pd.Timestamp('2024-01-01 10:00')
+    log.record('signal', side='BUY', price=1.1, time=entry)
+    log.record('order', side='BUY', price=1.1)  # not recorded
+    log.record('trade', side='BUY', entry_time=entry, time=entry + pd.Timedelta('15min'),
+               entry_price=1.1, price=1.2, profit=100.0, balance=10100.0)
+    log.close()
+
+    df = read_events(path)
+    assert list(df['event']) == ['signal', 'trade']
+    assert list(df['side']) == ['BUY', 'BUY']
+    assert df['profit'].iloc[1] == 100.0
+    assert pd.Timestamp(df['time'].iloc[1]) == entry + pd.Timedelta('15min')
+    assert np.all(np.diff(df['logged_at'].astype(float)) >= 0)
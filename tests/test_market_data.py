@@ -0,0 +1,61 @@
+import collections
+import numpy as np
+import pytest
+from utils import data_fetcher
+from utils.broker import ReplayBroker, set_broker
+from utils.data_store import OHLCVStore, RATES_DTYPE
+from utils.market_data import MarketSession
+
+
+class CountingBroker:
+    """Wraps a backend and counts the calls made to it."""
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = collections.Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if callable(attr) and not name.isupper() and name not in ('time', 'sleep'):
+            def counted(*args, **kwargs):
+                self.calls[name] += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+@pytest.fixture
+def counting_broker(tmp_path):
+    rates = np.zeros(200, dtype=RATES_DTYPE)
+    rates['time'] = 900 * np.arange(200)
+    rates['close'] = rates['high'] = rates['low'] = 1.1
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, rates)
+    counting = CountingBroker(ReplayBroker(store=store, symbol='EURUSD', timeframe=15, start_bar=50))
+    set_broker(counting)
+    yield counting
+    set_broker(None)
+
+
+def test_open_and_close_use_cached_metadata_and_one_tick(counting_broker):
+    session = MarketSession()
+    assert data_fetcher.open_position('EURUSD', 0.01, counting_broker.ORDER_TYPE_BUY, 1, session=session)
+    assert counting_broker.calls['symbol_info'] == 1
+    assert counting_broker.calls['symbol_info_tick'] == 1
+    assert counting_broker.calls['account_info'] == 1
+
+    session.new_cycle()
+    ticket = counting_broker.positions_get()[0].ticket
+    assert data_fetcher.close_position(ticket, session=session)
+    assert counting_broker.calls['symbol_info'] == 1  # still cached
+    assert counting_broker.calls['symbol_info_tick'] == 2
+
+
+def test_symbol_info_expires_after_ttl(counting_broker):
+    session = MarketSession(info_ttl=600)
+    session.symbol_info('EURUSD')
+    counting_broker.sleep(300)
+    session.symbol_info('EURUSD')
+    assert counting_broker.calls['symbol_info'] == 1
+    counting_broker.sleep(300)
+    session.symbol_info('EURUSD')
+    assert counting_broker.calls['symbol_info'] == 2
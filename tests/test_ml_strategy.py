@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+import utils.model_trainer as model_trainer
+from strategies.advanced_strategy import MLStrategy
+
+PARAMS = {'n_estimators': 10, 'max_depth': 3, 'random_state': 0, 'n_jobs': 1}
+
+
+def _bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-3, n))
+    return pd.DataFrame({'time': np.arange(n) * 900, 'close': close,
+                         'high': close + 5e-4, 'low': close - 5e-4})
+
+
+def _strategy(tmp_path, **kwargs):
+    return MLStrategy(train_window=300, retrain_interval=150, model_dir=str(tmp_path),
+                      model_params=PARAMS, **kwargs)
+
+
+def test_streaming_matches_walk_forward(tmp_path):
+    data = _bars(900)
+    signals = _strategy(tmp_path, background=False).generate_signals(data)
+
+    strategy = _strategy(tmp_path, background=False)
+    streamed = [strategy.on_bar(bar) for bar in data.to_dict('records')]
+
+    assert streamed[:-1] == list(signals[1:])
+    assert 'BUY' in streamed and 'SELL' in streamed
+
+
+def test_walk_forward_reuses_fitted_folds(tmp_path, monkeypatch):
+    data = _bars(900, seed=1)
+    first = _strategy(tmp_path, background=False).generate_signals(data)
+
+    fits = []
+    fit = model_trainer.fit_classifier
+    monkeypatch.setattr(model_trainer, 'fit_classifier', lambda *args: fits.append(1) or fit(*args))
+    second = _strategy(tmp_path, background=False).generate_signals(data)
+
+    assert fits == []
+    assert list(first) == list(second)
+
+
+def test_background_training_swaps_model_in(tmp_path):
+    data = _bars(400, seed=2).to_dict('records')
+    strategy = _strategy(tmp_path)
+    for bar in data[:300]:
+        strategy.on_bar(bar)
+
+    strategy.trainer.wait()
+    strategy.on_bar(data[300])
+    assert strategy.model is not None and strategy.model_key is not None
+
+
+def test_first_live_window_is_enough_to_trade(tmp_path):
+    strategy = _strategy(tmp_path, background=False)
+    assert strategy.warm_up_bars > strategy.features.min_bars + strategy.train_window
+    rates = _bars(strategy.warm_up_bars).to_records(index=False)
+    strategy.stream(rates)
+    assert strategy.model is not None
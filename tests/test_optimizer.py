@@ -0,0 +1,56 @@
+import numpy as np
+from utils.data_store import RATES_DTYPE
+import utils.optimizer as optimizer
+from utils.logger import events
+from utils.optimizer import optimize, parameter_grid, random_search, run_single_backtest
+
+
+def _rates(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    rates = np.zeros(n, dtype=RATES_DTYPE)
+    rates['time'] = 900 * np.arange(n)
+    rates['close'] = 1.1 + np.cumsum(rng.normal(0, 3e-4, n))
+    return rates
+
+
+def test_parameter_grid_and_random_search():
+    grid = parameter_grid({'short_period': [5, 9], 'long_period': [21, 30, 50]})
+    assert len(grid) == 6 and {'short_period': 9, 'long_period': 50} in grid
+
+    draws = random_search({'short_period': (5, 20), 'long_period': [30, 40]}, 50)
+    assert all(5 <= d['short_period'] <= 20 and d['long_period'] in (30, 40) for d in draws)
+
+
+def test_optimize_matches_single_backtests():
+    rates = _rates()
+    grid = {'short_period': [5, 9], 'long_period': [21, 40]}
+    results = optimize('rule_based', rates, 1e-5, grid=grid, processes=2)
+
+    assert len(results) == 4
+    assert results['total_return'].is_monotonic_decreasing
+    best = results.iloc[0]
+    expected = run_single_backtest('rule_based', {'short_period': int(best['short_period']),
+                                                  'long_period': int(best['long_period'])}, rates, 1e-5)
+    assert best['total_return'] == expected['total_return']
+    assert best['num_trades'] == expected['num_trades']
+
+
+_evaluate = optimizer._evaluate
+
+
+def _evaluate_counting_events(task):
+    """Runs in the pool workers: the result also carries the worker's queued events."""
+    result = _evaluate(task)
+    result['queued_events'] = events._writer._queue.qsize() if events._writer is not None else 0
+    return result
+
+
+def test_workers_do_not_queue_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimizer, '_evaluate', _evaluate_counting_events)
+    events.open(str(tmp_path / 'events.jsonl'))
+    try:
+        results = optimize('rule_based', _rates(), 1e-5, grid={'short_period': [5, 9], 'long_period': [21]},
+                           processes=2)
+    finally:
+        events.close()
+    assert len(results) == 2 and (results['queued_events'] == 0).all()
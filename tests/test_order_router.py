@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from utils.broker import ReplayBroker, set_broker
+from utils.data_store import OHLCVStore, RATES_DTYPE
+from utils.market_data import MarketSession
+from utils.order_router import OrderRouter, OrderTemplate
+from utils.position_book import PositionBook
+from utils.telemetry import telemetry
+
+
+@pytest.fixture
+def replay(tmp_path):
+    rates = np.zeros(200, dtype=RATES_DTYPE)
+    rates['time'] = 900 * np.arange(200)
+    rates['close'] = 1.1 + 1e-4 * np.arange(200)
+    rates['open'] = rates['close'] - 1e-4
+    rates['high'] = rates['close'] + 5e-5
+    rates['low'] = rates['open'] - 5e-5
+    store = OHLCVStore(str(tmp_path))
+    store.append('EURUSD', 15, rates)
+    backend = ReplayBroker(store=store, symbol='EURUSD', timeframe=15, start_bar=50)
+    set_broker(backend)
+    yield backend
+    set_broker(None)
+
+
+@pytest.fixture
+def router():
+    router = OrderRouter(session=MarketSession(), max_retries=20)
+    yield router
+    router.shutdown()
+
+
+def test_signals_open_and_close_through_futures(replay, router):
+    opened = router.submit_signal('EURUSD', 'BUY', 0.1, 7).result()
+    assert opened.ok and opened.attempts == 1
+    position = replay.positions_get(symbol='EURUSD')[0]
+    assert position.ticket == opened.ticket and position.magic == 7
+    assert position.sl < position.price_open < position.tp
+
+    # Same-side signals need no order; a counter-signal closes the position
+    assert router.submit_signal('EURUSD', 'BUY', 0.1, 7).result() is None
+    closed = router.submit_signal('EURUSD', 'SELL', 0.1, 7).result()
+    assert closed.ok and closed.ticket == opened.ticket
+    assert replay.positions_get() == ()
+
+
+def test_requotes_are_resent_at_a_fresh_price(replay, router):
+    replay.requote_rate = 0.7
+    router.retry_delay = 900  # a bar, so each resend sees a new price
+    telemetry.reset()
+    results = [router.submit_open('EURUSD', replay.ORDER_TYPE_BUY, 7, lot_size=0.1).result() for _ in range(5)]
+
+    assert all(result.ok for result in results)
+    assert any(result.attempts > 1 for result in results)
+    # Every logical order opened exactly one position, at the price after its last requote
+    assert len(replay.positions_get()) == 5
+    assert len({p.price_open for p in replay.positions_get()}) > 1
+    counts = {row['stage']: row['count'] for row in telemetry.summary()}
+    assert counts['signal_to_send'] == 5 and counts['signal_to_fill'] == 5
+
+
+def test_rejections_are_not_retried(replay, router):
+    result = router.submit_close(12345).result()
+    assert not result.ok and result.attempts == 0
+
+
+def test_signals_read_the_local_position_book(replay, router, monkeypatch):
+    calls = []
+    positions_get = replay.positions_get
+    monkeypatch.setattr(replay, 'positions_get', lambda **kwargs: calls.append(kwargs) or positions_get(**kwargs))
+
+    opened = router.submit_signal('EURUSD', 'BUY', 0.1, 7).result()
+    assert calls == [{}]  # the first signal loads the book from one snapshot
+    assert router.submit_signal('EURUSD', 'BUY', 0.1, 7).result() is None
+    assert router.book.position('EURUSD', 7).ticket == opened.ticket
+    assert calls == [{}]
+
+    # The position is closed outside the bot (say by its stop loss): the
+    # failed close reconciles the book and the signal opens a new position
+    replay._close(opened.ticket, replay.symbol_info_tick('EURUSD').bid)
+    reopened = router.submit_signal('EURUSD', 'SELL', 0.1, 7).result()
+    assert reopened.ok and reopened.ticket != opened.ticket
+    assert [p.ticket for p in router.book.positions()] == [p.ticket for p in positions_get()] == [reopened.ticket]
+
+
+def test_reconcile_picks_up_outside_changes(replay):
+    book = PositionBook(reconcile_interval=600)
+    assert book.reconcile() == ([], []) and not book.due()
+    template = OrderTemplate('EURUSD', 99, session=MarketSession())
+    manual = replay.order_send(template.build(replay.ORDER_TYPE_SELL, 0.1, replay.symbol_info_tick('EURUSD').bid))
+    assert book.position('EURUSD', 99) is None
+
+    assert book.reconcile() == ([manual.order], [])
+    assert book.position('EURUSD', 99).type == replay.POSITION_TYPE_SELL
+    replay._close(manual.order, replay.symbol_info_tick('EURUSD').ask)
+    replay.sleep(600)
+    assert book.due() and book.reconcile() == ([], [manual.order]) and len(book) == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.backtester import SimulatedTradeManager, simulate_signals
+from utils.performance import MetricsAccumulator, EquityRecorder, lttb
+
+
+def test_accumulator_matches_batch_metrics():
+    rng = np.random.default_rng(0)
+    equity = 10000 + np.cumsum(rng.normal(0, 10, 5000))
+    metrics = MetricsAccumulator(10000.0, periods_per_year=252)
+    for value in equity:
+        metrics.on_bar(value, True)
+    result = metrics.result()
+
+    returns = pd.Series(equity).pct_change().dropna()
+    peak = np.maximum.accumulate(np.concatenate([[10000.0], equity]))
+    assert result['sharpe'] == pytest.approx(returns.mean() / returns.std() * np.sqrt(252))
+    downside = np.sqrt((np.minimum(returns, 0) ** 2).mean())
+    assert result['sortino'] == pytest.approx(returns.mean() / downside * np.sqrt(252))
+    assert result['max_drawdown'] == pytest.approx(((peak[1:] - equity) / peak[1:]).max() * 100)
+    assert result['exposure'] == 100.0
+
+
+def test_idle_bars_are_counted_without_feeding_them():
+    rng = np.random.default_rng(1)
+    close = pd.Series(1.1 + np.cumsum(rng.normal(0, 1e-3, 3000)))
+    times = pd.date_range('2024-01-01', periods=len(close), freq='15min')
+    signals = MovingAverageCrossover().generate_signals(pd.DataFrame({'close': close}))
+
+    skipping = SimulatedTradeManager(10000.0, point=1e-5, keep_trades=False)
+    simulate_signals(skipping, signals, close.to_numpy(), times, start=21)
+    every_bar = SimulatedTradeManager(10000.0, point=1e-5)
+    for i in range(21, len(close)):
+        every_bar.process_bar(signals[i], close[i], times[i])
+
+    assert len(skipping.trades) == 0 and len(every_bar.trades) > 10
+    expected = every_bar.metrics.result()
+    for name, value in skipping.metrics.result().items():
+        assert value == pytest.approx(expected[name]), name
+
+
+def test_durations_of_epoch_second_bar_times():
+    rng = np.random.default_rng(2)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-3, 3000))
+    times = pd.date_range('2024-01-01', periods=len(close), freq='15min')
+    signals = MovingAverageCrossover().generate_signals(pd.DataFrame({'close': close}))
+
+    results = []
+    for bar_times in (times, 1704067200 + 900 * np.arange(len(close))):
+        trade_manager = SimulatedTradeManager(10000.0, point=1e-5)
+        simulate_signals(trade_manager, signals, close, bar_times, start=21)
+        results.append(trade_manager.metrics.result())
+    assert results[0]['avg_trade_duration'] >= 900
+    assert results[1]['avg_trade_duration'] == results[0]['avg_trade_duration']
+    assert results[1]['max_trade_duration'] == results[0]['max_trade_duration']
+
+
+def test_equity_recorder_is_bounded():
+    recorder = EquityRecorder(max_points=100)
+    for i in range(100000):
+        recorder.add(i, float(i))
+    times, values = recorder.curve()
+    assert len(values) < 200 and times[-1] == 99999
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    y = np.zeros(10000)
+    y[4321] = 50.0
+    kept = lttb(np.arange(len(y)), y, 100)
+    assert len(kept) == 100 and kept[0] == 0 and kept[-1] == len(y) - 1
+    assert 4321 in kept
+    assert np.all(np.diff(kept) > 0)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from strategies.rule_based_strategy import MovingAverageCrossover
+from strategies.base_strategy import BaseStrategy, SIGNAL_CODES
+from utils.backtester import SimulatedTradeManager, simulate_signals
+from utils.portfolio_backtester import PortfolioBacktester, align_bars
+
+POINT = 0.00001
+
+
+def _basket(num_symbols, num_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    times = 1700000000 + np.arange(num_bars) * 900
+    return {f'SYM{k}': pd.DataFrame({'time': times, 'close': 1.1 + np.cumsum(rng.normal(0, 2e-4, num_bars))})
+            for k in range(num_symbols)}
+
+
+def _codes(signals):
+    return np.array([SIGNAL_CODES[signal] for signal in signals], dtype=np.int8)
+
+
+def test_align_bars_leaves_missing_bars_empty():
+    bars = {'A': {'time': np.array([0, 60, 120]), 'close': np.array([1.0, 2.0, 3.0])},
+            'B': {'time': np.array([60, 180]), 'close': np.array([5.0, 6.0])}}
+    symbols, times, closes = align_bars(bars)
+    assert symbols == ['A', 'B']
+    assert list(times.astype('datetime64[s]').astype(np.int64)) == [0, 60, 120, 180]
+    np.testing.assert_array_equal(closes, [[1.0, np.nan], [2.0, 5.0], [3.0, np.nan], [np.nan, 6.0]])
+
+
+def test_signal_matrix_matches_per_symbol_signals():
+    bars = _basket(4, 3000)
+    # Give one symbol a late start and another a gap, which takes the fallback path
+    bars['SYM1'] = bars['SYM1'].iloc[500:]
+    symbols, _, closes = align_bars(bars)
+    matrix = MovingAverageCrossover().generate_signal_matrix(closes)
+    gapped = closes.copy()
+    gapped[1000:1010, 2] = np.nan
+    fallback = MovingAverageCrossover().generate_signal_matrix(gapped)
+    np.testing.assert_array_equal(BaseStrategy.generate_signal_matrix(MovingAverageCrossover(), closes), matrix)
+
+    for j, symbol in enumerate(symbols):
+        expected = _codes(MovingAverageCrossover().generate_signals(bars[symbol]))
+        np.testing.assert_array_equal(matrix[~np.isnan(closes[:, j]), j], expected)
+    rows = ~np.isnan(gapped[:, 2])
+    expected = _codes(MovingAverageCrossover().generate_signals(pd.DataFrame({'close': gapped[rows, 2]})))
+    np.testing.assert_array_equal(fallback[rows, 2], expected)
+
+
+def test_unconstrained_portfolio_matches_single_symbol_backtests():
+    bars = _basket(5, 4000, seed=1)
+    symbols, times, closes = align_bars(bars)
+    signals = MovingAverageCrossover().generate_signal_matrix(closes)
+    portfolio = PortfolioBacktester(symbols, [POINT] * len(symbols), 10000.0, min_balance=-np.inf)
+    result = portfolio.run(signals, closes, times, start=21)
+
+    total_profit = 0.0
+    for symbol in symbols:
+        strategy_signals = MovingAverageCrossover().generate_signals(bars[symbol])
+        manager = SimulatedTradeManager(10000.0, point=POINT)
+        simulate_signals(manager, strategy_signals, bars[symbol]['close'].to_numpy(), times, start=21)
+        expected, actual = manager.trades.view(), portfolio.trades[symbol].view()
+        assert len(expected) > 10
+        np.testing.assert_array_equal(actual['exit_time'], expected['exit_time'])
+        np.testing.assert_allclose(actual['profit'], expected['profit'])
+        total_profit += expected['profit'].sum()
+
+    assert abs(portfolio.balance - 10000.0 - total_profit) < 1e-6
+    assert result['num_trades'] == sum(len(portfolio.trades[symbol]) for symbol in symbols)
+    assert portfolio.correlation().shape == (5, 5)
+
+
+def test_position_limit_is_shared_across_symbols():
+    bars = _basket(6, 3000, seed=2)
+    symbols, times, closes = align_bars(bars)
+    signals = MovingAverageCrossover().generate_signal_matrix(closes)
+    portfolio = PortfolioBacktester(symbols, [POINT] * len(symbols), 10000.0, max_positions=2, min_balance=-np.inf)
+    portfolio.run(signals, closes, times, start=21)
+
+    assert portfolio.rejected > 0
+    # Count the positions open at every bar from the booked trades
+    opened = np.zeros(len(times) + 1, dtype=np.int64)
+    for symbol in symbols:
+        trades = portfolio.trades[symbol].view()
+        opened += np.bincount(np.searchsorted(times, trades['entry_time']), minlength=len(times) + 1)
+        opened -= np.bincount(np.searchsorted(times, trades['exit_time']), minlength=len(times) + 1)
+    assert np.cumsum(opened).max() <= 2
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import utils.data_fetcher as data_fetcher
+from utils.broker import ReplayBroker, set_broker
+from utils.data_store import OHLCVStore
+from utils.resampler import Resampler, resample, ticks_to_bars
+from utils.synthetic import synthetic_rates, synthetic_ticks
+
+
+def test_incremental_bars_match_batch_resampling():
+    base = synthetic_rates(3000, timeframe='M1')
+    resampler = Resampler('M1')
+    for timeframe in ('M5', 'M15', 'H1'):
+        resampler.subscribe('EURUSD', timeframe)
+
+    rng = np.random.default_rng(0)
+    end = 1
+    while end <= len(base):
+        forming = base[end - 1].copy()
+        # The forming base bar is fetched again with a different close before it closes
+        partial = forming.copy()
+        partial['close'] = partial['open']
+        resampler.update('EURUSD', np.r_[base[max(end - 5, 0):end - 1], partial])
+        resampler.update('EURUSD', base[max(end - 5, 0):end])
+        for timeframe in ('M5', 'M15', 'H1'):
+            expected = resample(base[:end], timeframe)
+            assert np.array_equal(resampler.bars('EURUSD', timeframe), expected)
+        end += int(rng.integers(1, 4))
+
+
+def test_late_subscription_and_callbacks():
+    base = synthetic_rates(600, timeframe='M1')
+    resampler = Resampler('M1')
+    resampler.update('EURUSD', base[:300])
+
+    received = []
+    resampler.subscribe('EURUSD', 'M15', callback=lambda symbol, timeframe, bars: received.append(bars))
+    assert np.array_equal(resampler.bars('EURUSD', 'M15'), resample(base[:300], 'M15'))
+
+    resampler.update('EURUSD', base[290:600])
+    assert np.array_equal(resampler.bars('EURUSD', 'M15'), resample(base, 'M15'))
+    # The callback gets the bars that closed in the update, then the open bar
+    assert received[-1]['time'][0] == resample(base[:300], 'M15')['time'][-1]
+    with pytest.raises(ValueError):
+        Resampler('M15').subscribe('EURUSD', 'M1')
+
+
+def test_ticks_are_folded_into_bars():
+    ticks = synthetic_ticks(20000, mean_interval_ms=500)
+    resampler = Resampler('M1')
+    resampler.subscribe('EURUSD', 'M5')
+    for chunk in np.array_split(ticks, 37):
+        resampler.update_ticks('EURUSD', chunk, point=1e-5)
+
+    expected = resample(ticks_to_bars(ticks, 'M1', point=1e-5), 'M5')
+    assert np.array_equal(resampler.bars('EURUSD', 'M5'), expected)
+
+
+@pytest.fixture
+def replay_m1(tmp_path, monkeypatch):
+    base = synthetic_rates(2000, timeframe='M1', start=0)
+    source = OHLCVStore(str(tmp_path / 'source'))
+    source.append('EURUSD', 'M1', base)
+    backend = ReplayBroker(store=source, symbol='EURUSD', timeframe=1, start_bar=1000)
+    calls = []
+    fetch = backend.copy_rates_from_pos
+    monkeypatch.setattr(backend, 'copy_rates_from_pos',
+                        lambda *args: calls.append(args[1]) or fetch(*args))
+    monkeypatch.setattr(data_fetcher, 'data_store', OHLCVStore(str(tmp_path / 'local')))
+    monkeypatch.setattr(data_fetcher, 'resampler', Resampler('M1'))
+    monkeypatch.setitem(data_fetcher.settings.TRADING, 'base_timeframe', 'M1')
+    set_broker(backend)
+    yield backend, base, calls
+    set_broker(None)
+
+
+def test_live_fetches_only_the_base_timeframe(replay_m1):
+    backend, base, calls = replay_m1
+    for timeframe in (5, 15):
+        data_fetcher.get_historical_data('EURUSD', timeframe, 10, use_store=True)
+    for _ in range(20):
+        backend.sleep(60)
+        calls.clear()
+        m5 = data_fetcher.get_historical_data('EURUSD', 5, 10, use_store=True)
+        fetched = len(calls)
+        m15 = data_fetcher.get_historical_data('EURUSD', 15, 10, use_store=True)
+        # Both timeframes come from the one M1 sync of the cycle
+        assert fetched and len(calls) == fetched and set(calls) == {1}
+
+        seen = base[base['time'] <= backend.now].copy()
+        # The forming M1 candle is only seen at its open
+        for field in ('high', 'low', 'close'):
+            seen[field][-1] = seen['open'][-1]
+        seen['tick_volume'][-1] = seen['real_volume'][-1] = 0
+        assert np.array_equal(m5, resample(seen, 'M5')[-10:])
+        assert np.array_equal(m15, resample(seen, 'M15')[-10:])
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from utils.performance import calculate_metrics
+from utils.robustness import monte_carlo
+from utils.trade_ledger import TradeLedger
+
+
+def _ledger(profits, initial_balance=10000.0):
+    n = len(profits)
+    times = np.datetime64('2024-01-01', 'ns') + np.arange(n) * np.timedelta64(15, 'm')
+    ledger = TradeLedger(n)
+    ledger.extend(np.ones(n, dtype=np.int8), times, np.full(n, 1.1), times, np.full(n, 1.1),
+                  profits, initial_balance + np.cumsum(profits))
+    return ledger
+
+
+def test_intervals_bracket_the_backtest():
+    ledger = _ledger(np.random.default_rng(0).normal(2.0, 40.0, 2000))
+    observed = calculate_metrics(ledger, 10000.0)
+    report = monte_carlo(ledger, 10000.0, num_paths=3000, processes=1, chunk_size=100000)
+
+    assert list(report.index) == ['shuffle', 'bootstrap', 'perturb']
+    # Reordering the trades never changes where they end up
+    shuffle = report.loc['shuffle']
+    assert shuffle['return_low'] == pytest.approx(observed['total_return'], abs=1e-3)
+    assert shuffle['return_high'] == pytest.approx(observed['total_return'], abs=1e-3)
+    for method in report.index:
+        row = report.loc[method]
+        assert row['return_low'] <= observed['total_return'] + 1e-3 <= row['return_high'] + 2e-3
+        assert row['drawdown_low'] <= row['drawdown_median'] <= row['drawdown_high']
+    assert report.loc['bootstrap', 'return_high'] - report.loc['bootstrap', 'return_low'] > 1.0
+
+
+def test_results_do_not_depend_on_the_pool():
+    ledger = _ledger(np.random.default_rng(1).normal(0.0, 30.0, 500))
+    serial = monte_carlo(ledger, 10000.0, num_paths=4000, methods=('bootstrap',), processes=1, chunk_size=50000)
+    pooled = monte_carlo(ledger, 10000.0, num_paths=4000, methods=('bootstrap',), processes=2, chunk_size=50000)
+    assert serial.equals(pooled)
+
+
+def test_risk_of_ruin():
+    losing = _ledger(np.full(100, -100.0))
+    assert monte_carlo(losing, 10000.0, num_paths=200, processes=1).loc['perturb', 'risk_of_ruin'] == 1.0
+    winning = _ledger(np.full(100, 10.0))
+    report = monte_carlo(winning, 10000.0, num_paths=200, processes=1)
+    assert (report['risk_of_ruin'] == 0).all() and (report['loss_probability'] == 0).all()
+    with pytest.raises(ValueError):
+        monte_carlo(winning, 10000.0, num_paths=10, methods=('jackknife',), processes=1)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import utils.data_fetcher as data_fetcher
+from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.broker import ReplayBroker, set_broker
+from utils.data_store import OHLCVStore, RATES_DTYPE
+from utils.scheduler import LiveScheduler, Pipeline
+
+SYMBOLS = ['EURUSD', 'GBPUSD', 'USDCHF']
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    store = OHLCVStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    for symbol in SYMBOLS:
+        rates = np.zeros(400, dtype=RATES_DTYPE)
+        rates['time'] = 900 * np.arange(400)
+        rates['close'] = 1.1 + np.cumsum(rng.normal(0, 5e-4, 400))
+        rates['open'] = np.r_[rates['close'][0], rates['close'][:-1]]
+        rates['high'] = np.maximum(rates['open'], rates['close'])
+        rates['low'] = np.minimum(rates['open'], rates['close'])
+        store.append(symbol, 'M15', rates)
+    backend = ReplayBroker(store=store, symbol='EURUSD', timeframe=15, start_bar=50)
+    monkeypatch.setattr(data_fetcher, 'data_store', store)
+    set_broker(backend)
+    yield backend
+    set_broker(None)
+
+
+@pytest.mark.parametrize('trigger', ['bar', 'tick'])
+def test_scheduler_runs_every_pipeline_to_the_end_of_the_replay(replay, trigger):
+    pipelines = [Pipeline(symbol, 'M15', MovingAverageCrossover()) for symbol in SYMBOLS]
+    LiveScheduler(pipelines, trigger=trigger, poll_interval=60, replay=True).start()
+
+    # Every pipeline saw every bar up to the last recorded one and traded
+    assert all(p.last_bar_time == 900 * 399 for p in pipelines)
+    assert all(p.last_latency is not None for p in pipelines)
+    assert replay.now == 900 * 399
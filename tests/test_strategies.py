@@ -0,0 +1,70 @@
+import subprocess
+import sys
+
+import pytest
+import numpy as np
+import pandas as pd
+from strategies.factor import available_strategies, create_strategy, get_strategy_class, register_strategy
+from strategies.rule_based_strategy import MovingAverageCrossover
+
+
+def _random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'close': 1.1 + np.cumsum(rng.normal(0, 1e-3, n))})
+
+
+def test_generate_signals_matches_per_bar_loop():
+    data = _random_walk(1500)
+    reference = MovingAverageCrossover()
+    expected = [reference.generate_signal(data.iloc[:i]) for i in range(len(data))]
+
+    strategy = MovingAverageCrossover()
+    signals = strategy.generate_signals(data)
+
+    assert list(signals) == expected
+    assert strategy.last_signal == reference.last_signal
+    assert 'BUY' in expected and 'SELL' in expected
+
+
+def test_on_bar_matches_generate_signal():
+    data = _random_walk(1500, seed=1)
+    reference = MovingAverageCrossover()
+    expected = [reference.generate_signal(data.iloc[:i + 1]) for i in range(len(data))]
+
+    strategy = MovingAverageCrossover()
+    streamed = [strategy.on_bar(bar) for bar in data.to_dict('records')]
+
+    assert streamed == expected
+
+
+def test_update_revises_forming_bar():
+    data = _random_walk(300, seed=2)
+    strategy = MovingAverageCrossover()
+    strategy.warm_up(data.iloc[:-1])
+    assert strategy.last_signal is None
+
+    # feed a stale close for the forming bar first, then its final value
+    strategy.on_bar({'close': data['close'].iloc[-2]})
+    signal = strategy.update({'close': data['close'].iloc[-1]})
+
+    reference = MovingAverageCrossover()
+    assert signal == reference.generate_signal(data)
+    assert strategy._long_ma.value == pytest.approx(data['close'].iloc[-21:].mean())
+
+
+def test_registry_creates_strategies_by_name():
+    strategy = create_strategy('rule_based', short_period=5, long_period=10)
+    assert isinstance(strategy, MovingAverageCrossover) and strategy.long_period == 10
+    assert {'rule_based', 'ml_strategy'} <= set(available_strategies())
+
+    register_strategy('ma_alias', 'strategies.rule_based_strategy:MovingAverageCrossover')
+    assert get_strategy_class('ma_alias') is MovingAverageCrossover
+    with pytest.raises(ValueError):
+        create_strategy('no_such_strategy')
+
+
+def test_live_startup_does_not_load_the_ml_or_plotting_stack():
+    code = ("import sys, main; main.create_strategy('rule_based'); "
+            "print(sorted(m for m in ('sklearn', 'matplotlib', 'joblib') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]'
@@ -0,0 +1,74 @@
+import urllib.request
+
+import numpy as np
+import pytest
+
+from utils.telemetry import LatencyHistogram, Telemetry, StackSampler, profiled
+
+
+def test_histogram_percentiles_within_bucket_precision():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=-6, sigma=1.0, size=20000)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    assert histogram.count == len(values)
+    assert histogram.sum == pytest.approx(values.sum())
+    for q in (50, 90, 99, 99.9):
+        assert histogram.percentile(q) == pytest.approx(np.percentile(values, q), rel=0.02)
+    assert histogram.percentile(100) == values.max()
+
+
+def test_prometheus_export(tmp_path):
+    telemetry = Telemetry(prefix='bot')
+    for seconds in (0.0002, 0.003, 0.003, 0.2):
+        telemetry.observe('order_send', seconds)
+    with telemetry.timer('positions_get'):
+        pass
+    telemetry.count('orders', action='open', retcode=10009)
+    telemetry.count('orders', action='open', retcode=10009)
+    telemetry.gauge('backtest_bars_per_second', 1500.0, mode='vectorized')
+
+    text = telemetry.to_prometheus()
+    assert '# TYPE bot_order_send_seconds histogram' in text
+    assert 'bot_order_send_seconds_bucket{le="0.005"} 3' in text
+    assert 'bot_order_send_seconds_bucket{le="+Inf"} 4' in text
+    assert 'bot_order_send_seconds_count 4' in text
+    assert 'bot_orders_total{action="open",retcode="10009"} 2.0' in text
+    assert 'bot_backtest_bars_per_second{mode="vectorized"} 1500.0' in text
+
+    path = tmp_path / 'metrics.prom'
+    telemetry.write(str(path))
+    assert path.read_text() == text
+
+    port = telemetry.serve(0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert response.read().decode() == telemetry.to_prometheus()
+    finally:
+        telemetry.stop_serving()
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry()
+    telemetry.enabled = False
+    with telemetry.timer('cycle'):
+        pass
+    telemetry.count('orders')
+    assert telemetry.summary() == [] and telemetry.to_prometheus() == '\n'
+
+
+def test_profilers_write_their_output(tmp_path):
+    def busy():
+        return sum(i * i for i in range(200000))
+
+    with profiled('cprofile', str(tmp_path / 'run')):
+        busy()
+    assert (tmp_path / 'run.prof').stat().st_size > 0
+
+    sampler = StackSampler(interval=0.001).start()
+    for _ in range(20):
+        busy()
+    sampler.stop()
+    sampler.write(str(tmp_path / 'run.folded'))
+    assert any('busy' in stack for stack in sampler.samples)
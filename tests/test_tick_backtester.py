@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from config.settings import STOP_LOSS_PIPS
+from utils.backtester import SimulatedTradeManager
+from utils.data_store import RATES_DTYPE, TICKS_DTYPE, TickStore
+from utils.tick_backtester import first_touch, run_tick_backtest
+
+POINT = 0.00001
+
+
+def _market(num_bars, ticks_per_bar, seed=0):
+    rng = np.random.default_rng(seed)
+    num_ticks = num_bars * ticks_per_bar
+    ticks = np.zeros(num_ticks, dtype=TICKS_DTYPE)
+    ticks['time_msc'] = np.arange(num_ticks) * (60000 // ticks_per_bar)
+    ticks['bid'] = 1.1 + np.cumsum(rng.normal(0, 5 * POINT, num_ticks))
+    ticks['ask'] = ticks['bid'] + 2 * POINT
+    rates = np.zeros(num_bars, dtype=RATES_DTYPE)
+    rates['time'] = np.arange(num_bars) * 60
+    return rates, ticks
+
+
+def _reference(signals, rates, ticks):
+    """
+    Per-tick loop: the behaviour run_tick_backtest must reproduce. Equity is
+    marked at the last tick of each bar.
+    """
+    manager = SimulatedTradeManager(10000.0, point=POINT)
+    bar_of_tick = np.searchsorted(rates['time'] * 1000, ticks['time_msc'], side='right') - 1
+    traded_bar = -1
+    for t in range(len(ticks)):
+        bar = bar_of_tick[t]
+        traded_bar = _reference_tick(manager, signals, ticks, t, bar, traded_bar)
+        if t == len(ticks) - 1 or bar_of_tick[t + 1] != bar:
+            price = ticks['ask'][t] if manager.position == 'SELL' else ticks['bid'][t]
+            manager.mark(float(price), np.datetime64(int(rates['time'][bar]), 's'))
+    return manager
+
+
+def _reference_tick(manager, signals, ticks, t, bar, traded_bar):
+    when = np.datetime64(int(ticks['time_msc'][t]), 'ms')
+    if manager.position is not None:
+        price = ticks['bid'][t] if manager.position == 'BUY' else ticks['ask'][t]
+        sign = 1 if manager.position == 'BUY' else -1
+        if sign * (price - manager.sl_price) <= 0 or sign * (price - manager.tp_price) >= 0:
+            manager.close_position(float(price), when)
+            return bar
+    if bar == traded_bar:
+        return traded_bar
+    signal = signals[bar]
+    if signal == 'HOLD' or signal == manager.position:
+        return bar
+    if manager.position is not None:
+        manager.close_position(float(ticks['bid'][t] if manager.position == 'BUY' else ticks['ask'][t]), when)
+    price = ticks['ask'][t] if signal == 'BUY' else ticks['bid'][t]
+    manager.open_position(signal, float(price), when, spread=0.0)
+    return bar
+
+
+def test_first_touch_searches_across_chunks():
+    _, ticks = _market(1, 100)
+    ticks['bid'] = 1.1
+    ticks['bid'][57] = 1.1 - 0.01
+    index, price = first_touch(ticks, 1, 100, 'BUY', 1.095, 1.2, chunk=8)
+    assert index == 57 and price == ticks['bid'][57]
+    assert first_touch(ticks, 58, 100, 'BUY', 1.095, 1.2, chunk=8) == (None, None)
+
+
+def test_intrabar_stop_is_hit_at_the_tick():
+    rates, ticks = _market(3, 10)
+    ticks['bid'] = 1.1
+    ticks['ask'] = 1.1 + 2 * POINT
+    # a spike through the stop inside bar 1, back above it before the close
+    ticks['bid'][14] = 1.1 - (STOP_LOSS_PIPS + 5) * POINT
+    signals = np.array(['BUY', 'HOLD', 'HOLD'], dtype=object)
+
+    manager = SimulatedTradeManager(10000.0, point=POINT)
+    run_tick_backtest(manager, signals, rates, ticks)
+    assert len(manager.trades) == 1
+    trade = manager.trades[0]
+    assert trade['exit_price'] == ticks['bid'][14]
+    assert trade['exit_time'] == np.datetime64(int(ticks['time_msc'][14]), 'ms')
+    assert manager.position is None
+
+
+def test_matches_a_per_tick_reference():
+    rates, ticks = _market(400, 50, seed=3)
+    rng = np.random.default_rng(4)
+    signals = rng.choice(np.array(['BUY', 'SELL', 'HOLD'], dtype=object), size=len(rates), p=[0.05, 0.05, 0.9])
+
+    manager = SimulatedTradeManager(10000.0, point=POINT)
+    run_tick_backtest(manager, signals, rates, ticks)
+    reference = _reference(signals, rates, ticks)
+    expected = reference.trades
+    assert len(manager.trades) > 10
+    assert len(manager.trades) == len(expected)
+    for got, want in zip(manager.trades, expected):
+        assert got == want
+
+    # Equity is marked at every bar close
+    metrics, expected = manager.metrics.result(), reference.metrics.result()
+    assert manager.metrics.bars == len(rates) and metrics['exposure'] > 0
+    for name in ('exposure', 'sharpe', 'sortino', 'max_drawdown'):
+        assert metrics[name] == pytest.approx(expected[name]), name
+
+
+def test_chunked_ticks_match_one_array():
+    rates, ticks = _market(400, 50, seed=5)
+    rng = np.random.default_rng(6)
+    signals = rng.choice(np.array(['BUY', 'SELL', 'HOLD'], dtype=object), size=len(rates), p=[0.05, 0.05, 0.9])
+
+    whole = SimulatedTradeManager(10000.0, point=POINT)
+    run_tick_backtest(whole, signals, rates, ticks, start=3)
+    # Uneven chunks, cutting through bars and open positions, and an empty one
+    bounds = np.concatenate([[0], np.sort(rng.choice(np.arange(1, len(ticks)), 40, replace=False)), [len(ticks)]])
+    chunks = [ticks[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])] + [ticks[:0]]
+    chunked = SimulatedTradeManager(10000.0, point=POINT)
+    run_tick_backtest(chunked, signals, rates, iter(chunks), start=3)
+
+    assert len(whole.trades) > 10
+    np.testing.assert_array_equal(chunked.trades.view(), whole.trades.view())
+    assert chunked.metrics.bars == whole.metrics.bars
+    assert chunked.metrics.result() == pytest.approx(whole.metrics.result())
+
+
+def test_tick_store_round_trip(tmp_path):
+    _, ticks = _market(10, 10)
+    store = TickStore(str(tmp_path))
+    assert store.append('EURUSD', ticks[:60]) == 60
+    assert store.append('EURUSD', ticks[50:]) == 40
+    window = store.range('EURUSD', int(ticks['time_msc'][20]), int(ticks['time_msc'][30]))
+    assert len(window) == 10 and np.shares_memory(window, store.load('EURUSD'))
@@ -0,0 +1,68 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.performance import MetricsAccumulator, calculate_metrics
+from utils.trade_ledger import TradeLedger, BUY, SELL
+
+
+def _trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2024-01-01', periods=2 * n, freq='15min')
+    profits = rng.normal(0, 20, n)
+    balances = 10000 + np.cumsum(profits)
+    return [{'signal': 'BUY' if i % 2 else 'SELL', 'entry_time': times[2 * i], 'entry_price': 1.1,
+             'exit_time': times[2 * i + 1], 'exit_price': 1.1 + profits[i] * 1e-5,
+             'profit': profits[i], 'balance': balances[i]} for i in range(n)]
+
+
+def test_ledger_grows_and_reads_back_trades():
+    trades = _trades(3000)
+    ledger = TradeLedger(capacity=4)
+    for trade in trades:
+        ledger.append(trade['signal'], trade['entry_time'], trade['entry_price'],
+                      trade['exit_time'], trade['exit_price'], trade['profit'], trade['balance'])
+
+    assert len(ledger) == 3000
+    assert ledger[10] == trades[10] and ledger[np.int64(-1)] == trades[-1]
+    # Array-like keys select records of the view
+    np.testing.assert_array_equal(ledger[[0, 1]], ledger.view()[:2])
+    np.testing.assert_array_equal(ledger[np.array([5, 7])]['profit'], [trades[5]['profit'], trades[7]['profit']])
+    assert len(ledger[ledger['profit'] > 0]) == sum(trade['profit'] > 0 for trade in trades)
+    assert list(np.unique(ledger['side'])) == [SELL, BUY]
+    assert np.shares_memory(ledger['profit'], ledger.view())
+    assert ledger.to_dataframe()['side'].iloc[1] == 'BUY'
+
+
+def test_metrics_from_ledger_match_per_trade_updates():
+    trades = _trades(500, seed=1)
+    incremental = MetricsAccumulator(10000.0)
+    for trade in trades:
+        incremental.on_trade(trade['profit'], trade['entry_time'], trade['exit_time'], trade['balance'])
+
+    expected = incremental.result()
+    for name, value in calculate_metrics(TradeLedger.from_trades(trades), 10000.0).items():
+        assert value == pytest.approx(expected[name]), name
+
+
+def test_ledger_uses_far_less_memory_than_dicts():
+    n = 20000
+    times = pd.date_range('2024-01-01', periods=n, freq='15min')
+
+    tracemalloc.start()
+    trades = [{'signal': 'BUY', 'entry_time': times[i], 'entry_price': 1.1 + i, 'exit_time': times[i],
+               'exit_price': 1.2 + i, 'profit': float(i), 'balance': 1e4 + i} for i in range(n)]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    ledger = TradeLedger.from_trades(trades)
+    assert ledger.nbytes * 10 < dict_bytes
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    ledger = TradeLedger.from_trades(_trades(10))
+    ledger.to_parquet(tmp_path / 'trades.parquet')
+    assert pq.read_table(tmp_path / 'trades.parquet').num_rows == 10
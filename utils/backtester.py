@@ -0,0 +1,178 @@
+import numpy as np
+
+from config.settings import SYMBOL, LOT_SIZE, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS
+from utils.market_data import market_session
+from utils.performance import MetricsAccumulator
+from utils.trade_ledger import TradeLedger
+from utils.logger import setup_logger, events
+
+logger = setup_logger()
+
+# Backtesting parameters
+INITIAL_BALANCE = 10000.0
+SIMULATED_COMMISSION = 2.0  # Commission per trade
+
+
+class SimulatedTradeManager:
+    """
+    Manages simulated trades for backtesting.
+
+    Args:
+        initial_balance (float): Starting balance.
+        point (float): The symbol's point size. Looked up once through the
+            market-data session when not given; pass it to run without a
+            broker connection.
+        keep_trades (bool): Keep every closed trade in the `trades` ledger.
+            Without it only the running `metrics` are kept, in constant memory.
+        periods_per_year (float): Bars per year, to annualize Sharpe/Sortino.
+    """
+    def __init__(self, initial_balance, point=None, keep_trades=True, periods_per_year=None):
+        self.point = point
+        self.keep_trades = keep_trades
+        self.metrics = MetricsAccumulator(initial_balance, periods_per_year)
+        self.balance = initial_balance
+        self.position = None
+        self.entry_price = 0.0
+        self.entry_time = None
+        self.sl_price = 0.0
+        self.tp_price = 0.0
+        self.trades = TradeLedger()
+
+    def open_position(self, signal, price, time, spread=2.0):
+        if self.position is None:
+            self.position = signal
+            point = self._point()
+            if signal == 'BUY':
+                self.entry_price = price + spread * point # pay the ask price
+                self.sl_price = self.entry_price - STOP_LOSS_PIPS * point
+                self.tp_price = self.entry_price + TAKE_PROFIT_PIPS * point
+            elif signal == 'SELL':
+                self.entry_price = price # Sell at bid price
+                self.sl_price = self.entry_price + STOP_LOSS_PIPS * point
+                self.tp_price = self.entry_price - TAKE_PROFIT_PIPS * point
+            self.entry_time = time
+            # Lazy %-formatting: the text is only built if (and where) the record is written
+            logger.info('SIMULATED TRADE OPENED - %s at %.5f', signal, self.entry_price)
+
+    def close_position(self, price, time):
+        if self.position is not None:
+            profit_per_lot = 0.0
+            if self.position == "BUY":
+                profit_per_lot = (price - self.entry_price) / self._point()
+            elif self.position == "SELL":
+                profit_per_lot = (self.entry_price - price) / self._point()
+
+            trade_profit = profit_per_lot * LOT_SIZE - SIMULATED_COMMISSION
+            self.balance += trade_profit
+
+            if self.keep_trades:
+                self.trades.append(self.position, self.entry_time, self.entry_price,
+                                   time, price, trade_profit, self.balance)
+            self.metrics.on_trade(trade_profit, self.entry_time, time, self.balance)
+            logger.info('SIMULATED TRADE CLOSED - Profit: %.2f, New Balance: %.2f', trade_profit, self.balance)
+            events.record('trade', side=self.position, entry_time=self.entry_time, entry_price=self.entry_price,
+                          exit_time=time, exit_price=price, profit=trade_profit, balance=self.balance)
+
+            self.position = None
+
+    def _point(self):
+        if self.point is None:
+            self.point = market_session.symbol_info(SYMBOL).point
+        return self.point
+
+    def mark(self, price, time):
+        """Records the bar's equity, marking an open position to `price`."""
+        equity = self.balance
+        if self.position == 'BUY':
+            equity += (price - self.entry_price) / self._point() * LOT_SIZE
+        elif self.position == 'SELL':
+            equity += (self.entry_price - price) / self._point() * LOT_SIZE
+        self.metrics.on_bar(equity, self.position is not None, time)
+
+    def mark_bars(self, prices, times=None):
+        """
+        Records a run of bars during which no trade opens or closes, marking
+        the current position (if any) to each bar's `prices`; equivalent to
+        calling `mark` for each of them.
+        """
+        if len(prices) == 0:
+            return
+        if self.position is None:
+            # The first bar picks up a trade closed since the last mark, the rest are flat
+            self.metrics.on_bar(self.balance, False, None if times is None else times[0])
+            self.metrics.on_idle_bars(len(prices) - 1)
+            return
+        prices = np.asarray(prices, dtype=np.float64)
+        direction = 1.0 if self.position == 'BUY' else -1.0
+        equity = self.balance + direction * (prices - self.entry_price) / self._point() * LOT_SIZE
+        self.metrics.on_bars(equity, np.ones(len(prices), dtype=bool), times)
+
+    def process_bar(self, signal, price, time):
+        """
+        Applies the backtest trading rules for a single bar.
+
+        Args:
+            signal (str): The signal acted upon at this bar ('BUY', 'SELL' or 'HOLD').
+            price (float): The bar's close price.
+            time: The bar's open time.
+        """
+        if signal != 'HOLD':
+            events.record('signal', side=signal, price=price, time=time)
+        self._apply_rules(signal, price, time)
+        self.mark(price, time)
+
+    def _apply_rules(self, signal, price, time):
+        # 1. Check for SL/TP hit
+        if self.position is not None:
+            if (self.position == "BUY" and price <= self.sl_price) or \
+               (self.position == "SELL" and price >= self.sl_price):
+                self.close_position(self.sl_price, time)
+                return  # Skip to next candle to avoid multiple closures
+
+            if (self.position == "BUY" and price >= self.tp_price) or \
+               (self.position == "SELL" and price <= self.tp_price):
+                self.close_position(self.tp_price, time)
+                return
+
+        # 2. Check for counter-signal
+        if self.position == "BUY" and signal == "SELL":
+            self.close_position(price, time)
+        elif self.position == "SELL" and signal == "BUY":
+            self.close_position(price, time)
+
+        # Check for open conditions
+        if self.position is None:
+            if signal == "BUY":
+                self.open_position("BUY", price, time)
+            elif signal == "SELL":
+                self.open_position("SELL", price, time)
+
+
+def simulate_signals(trade_manager, signals, closes, times, start=0):
+    """
+    Walks a precomputed signal array through the trade manager's rules.
+
+    Bars where no position is open and the signal is 'HOLD' cannot change
+    anything, so they are skipped without calling into the trade manager;
+    the metrics only get their count.
+
+    Args:
+        trade_manager (SimulatedTradeManager): The manager to drive.
+        signals (np.ndarray): Output of `BaseStrategy.generate_signals`.
+        closes (np.ndarray): Close price of every bar.
+        times (array-like): Open time of every bar.
+        start (int): Index of the first bar to trade.
+    """
+    # Plain datetime64 scalars are far cheaper to index than boxed Timestamps
+    times = np.asarray(times)
+    idle = 0
+    for i in range(start, len(closes)):
+        signal = signals[i]
+        if trade_manager.position is None and signal == 'HOLD':
+            idle += 1
+            continue
+        if idle:
+            trade_manager.metrics.on_idle_bars(idle)
+            idle = 0
+        trade_manager.process_bar(signal, closes[i], times[i])
+    trade_manager.metrics.on_idle_bars(idle)
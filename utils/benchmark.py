@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite with regression gates.
+
+Times the hot paths of the bot on deterministic synthetic data of growing
+size and compares the results with a stored baseline:
+
+    python -m utils.benchmark                  # run and compare with the baseline
+    python -m utils.benchmark --save-baseline  # run and store a new baseline
+    python -m utils.benchmark --sizes 1000 10000000 --cases backtest
+
+The exit status is 1 when any case is slower or uses more memory than its
+baseline by more than the configured thresholds. No broker is needed.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BENCHMARK
+from strategies.rule_based_strategy import MovingAverageCrossover
+from utils.backtester import INITIAL_BALANCE, SimulatedTradeManager, simulate_signals
+from utils.data_preprocessor import preprocess_data
+from utils.indicator_graph import indicator_graph
+from utils.performance import calculate_metrics
+from utils.robustness import monte_carlo
+from utils.synthetic import synthetic_rates, synthetic_ticks
+from utils.tick_backtester import run_tick_backtest
+from utils.trade_ledger import TradeLedger
+
+POINT = 1e-5
+# Window fed to generate_signal per call, like the live bot's first fetch
+SIGNAL_WINDOW = 500
+# Most generate_signal calls timed per run; the cost per call does not depend on the size
+SIGNAL_CALLS = 500
+# Profits resampled per Monte Carlo method and run (paths x trades)
+MONTE_CARLO_VALUES = 10000000
+
+
+def _rates_frame(num_bars):
+    df = pd.DataFrame(synthetic_rates(num_bars))
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+def _setup_generate_signal(num_bars):
+    df = _rates_frame(max(num_bars, SIGNAL_WINDOW))
+    calls = min(num_bars, SIGNAL_CALLS)
+    ends = np.linspace(SIGNAL_WINDOW, len(df), calls).astype(np.int64)
+
+    def run():
+        strategy = MovingAverageCrossover()
+        for end in ends:
+            strategy.generate_signal(df.iloc[end - SIGNAL_WINDOW:end])
+    return run, calls
+
+
+def _setup_generate_signals(num_bars):
+    df = _rates_frame(num_bars)
+
+    def run():
+        indicator_graph.clear()  # time the computation, not the shared cache
+        MovingAverageCrossover().generate_signals(df)
+    return run, num_bars
+
+
+def _setup_backtest(num_bars):
+    # What run_backtest does in 'vectorized' mode, without the broker
+    df = _rates_frame(num_bars)
+    closes, times = df['close'].to_numpy(), df['time'].array
+
+    def run():
+        indicator_graph.clear()
+        strategy = MovingAverageCrossover()
+        signals = strategy.generate_signals(df)
+        simulate_signals(SimulatedTradeManager(INITIAL_BALANCE, point=POINT), signals, closes, times,
+                         start=strategy.long_period)
+    return run, num_bars
+
+
+def _setup_tick_backtest(num_ticks):
+    ticks = synthetic_ticks(num_ticks, mean_interval_ms=3000)  # about 20 ticks per M1 bar
+    bar_times = np.arange(ticks['time_msc'][0] // 60000, ticks['time_msc'][-1] // 60000 + 1) * 60
+    rates = synthetic_rates(len(bar_times), timeframe='M1', start=int(bar_times[0]))
+    # Bar closes are the last bid of each minute, so signals follow the ticks
+    last_tick = np.searchsorted(ticks['time_msc'], (bar_times + 60) * 1000, side='left') - 1
+    rates['close'] = ticks['bid'][np.maximum(last_tick, 0)]
+
+    def run():
+        indicator_graph.clear()
+        strategy = MovingAverageCrossover()
+        signals = strategy.generate_signals(rates)
+        run_tick_backtest(SimulatedTradeManager(INITIAL_BALANCE, point=POINT), signals, rates, ticks,
+                          start=strategy.long_period)
+    return run, num_ticks
+
+
+def _setup_preprocess_data(num_bars):
+    df = _rates_frame(num_bars)
+
+    def run():
+        indicator_graph.clear()
+        preprocess_data(df)
+    return run, num_bars
+
+
+def _ledger(num_trades):
+    rng = np.random.default_rng(0)
+    ledger = TradeLedger(num_trades)
+    entry = np.datetime64('2024-01-01', 'ns') + np.arange(num_trades) * np.timedelta64(15, 'm')
+    profits = rng.normal(0, 5, num_trades)
+    ledger.extend(np.where(rng.random(num_trades) < 0.5, 1, -1), entry, np.full(num_trades, 1.1),
+                  entry + np.timedelta64(10, 'm'), np.full(num_trades, 1.1), profits,
+                  INITIAL_BALANCE + np.cumsum(profits))
+    return ledger
+
+
+def _setup_calculate_metrics(num_trades):
+    ledger = _ledger(num_trades)
+    return lambda: calculate_metrics(ledger, INITIAL_BALANCE), num_trades
+
+
+def _setup_monte_carlo(num_trades):
+    ledger = _ledger(num_trades)
+    num_paths = max(1, MONTE_CARLO_VALUES // num_trades)
+    # In one process, so the timing does not depend on the core count
+    return (lambda: monte_carlo(ledger, INITIAL_BALANCE, num_paths=num_paths, processes=1),
+            num_paths * num_trades)
+
+
+# Case name -> setup(size) returning (callable, number of items it processes)
+CASES = {
+    'generate_signal': _setup_generate_signal,
+    'generate_signals': _setup_generate_signals,
+    'backtest': _setup_backtest,
+    'tick_backtest': _setup_tick_backtest,
+    'preprocess_data': _setup_preprocess_data,
+    'calculate_metrics': _setup_calculate_metrics,
+    'monte_carlo': _setup_monte_carlo,
+}
+
+
+def measure(fn, repeats=3):
+    """
+    Times `fn` and measures its peak memory.
+
+    The time is the best of `repeats` runs; the peak is measured in a
+    separate run under tracemalloc (which tracks NumPy buffers too), so
+    tracing does not slow the timed runs down.
+
+    Returns:
+        tuple: (seconds, peak memory in MB)
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def run_suite(sizes=None, cases=None, repeats=None, log=print):
+    """
+    Runs the benchmark cases at every size.
+
+    Args:
+        sizes (list): Numbers of bars (ticks/trades for those cases).
+        cases (list): Case names, all of `CASES` by default.
+        repeats (int): Timed runs per measurement.
+        log (callable): Receives a line per result, or None.
+
+    Returns:
+        dict: 'case@size' -> seconds, peak_mb and items_per_sec.
+    """
+    sizes = sizes or BENCHMARK['sizes']
+    repeats = repeats or BENCHMARK['repeats']
+    results = {}
+    for name in cases or CASES:
+        for size in sizes:
+            fn, items = CASES[name](int(size))
+            seconds, peak_mb = measure(fn, repeats)
+            results[f'{name}@{int(size)}'] = {
+                'seconds': seconds,
+                'peak_mb': peak_mb,
+                'items_per_sec': items / max(seconds, 1e-12),
+            }
+            if log:
+                log(f'{name:>18} {int(size):>10}  {seconds * 1000:10.2f} ms  '
+                    f'{items / max(seconds, 1e-12):14,.0f} /s  {peak_mb:9.1f} MB')
+    return results
+
+
+def compare(results, baseline, max_slowdown=None, max_memory_growth=None, min_seconds=None):
+    """
+    Finds the results that regressed against a baseline.
+
+    Args:
+        results (dict): Output of `run_suite`.
+        baseline (dict): A previous `run_suite` output.
+        max_slowdown (float): Allowed relative increase of the time.
+        max_memory_growth (float): Allowed relative increase of the peak memory.
+        min_seconds (float): Baseline times below this are too noisy to gate
+            on and are only checked for memory.
+
+    Returns:
+        list: One message per regression.
+    """
+    max_slowdown = BENCHMARK['max_slowdown'] if max_slowdown is None else max_slowdown
+    max_memory_growth = BENCHMARK['max_memory_growth'] if max_memory_growth is None else max_memory_growth
+    min_seconds = BENCHMARK['min_seconds'] if min_seconds is None else min_seconds
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if reference['seconds'] >= min_seconds and result['seconds'] > reference['seconds'] * (1 + max_slowdown):
+            regressions.append(f"{key}: {result['seconds'] * 1000:.2f} ms vs "
+                               f"{reference['seconds'] * 1000:.2f} ms baseline")
+        if result['peak_mb'] > reference['peak_mb'] * (1 + max_memory_growth) + 0.1:
+            regressions.append(f"{key}: peak {result['peak_mb']:.1f} MB vs "
+                               f"{reference['peak_mb']:.1f} MB baseline")
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def save_baseline(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    document = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite.')
+    parser.add_argument('--sizes', type=float, nargs='+', help='bar counts, e.g. 1e3 1e5 1e7')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES))
+    parser.add_argument('--repeats', type=int)
+    parser.add_argument('--baseline', default=BENCHMARK['baseline_path'])
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--max-slowdown', type=float, help='e.g. 0.25 fails runs 25%% slower than the baseline')
+    parser.add_argument('--log-level', default='WARNING', help="the bot's log level during the runs")
+    args = parser.parse_args(argv)
+    # Per-trade INFO records would otherwise dominate the backtest timings
+    logging.getLogger('trading_bot').setLevel(args.log_level)
+
+    results = run_suite(args.sizes, args.cases, args.repeats)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one.')
+        return 0
+    regressions = compare(results, baseline, max_slowdown=args.max_slowdown)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if not regressions:
+        print('No regressions against the baseline.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+import time
+import itertools
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+
+from config import settings
+from utils.data_store import OHLCVStore, TIMEFRAMES, timeframe_seconds
+
+
+class ReplayFinished(Exception):
+    """Raised by the replay backend once its clock runs past the recorded data."""
+
+
+# MetaTrader 5 constants used by the bot, with the terminal's values
+MT5_CONSTANTS = {
+    'TIMEFRAME_M1': TIMEFRAMES['M1'],
+    'TIMEFRAME_M5': TIMEFRAMES['M5'],
+    'TIMEFRAME_M15': TIMEFRAMES['M15'],
+    'TIMEFRAME_M30': TIMEFRAMES['M30'],
+    'TIMEFRAME_H1': TIMEFRAMES['H1'],
+    'TIMEFRAME_H4': TIMEFRAMES['H4'],
+    'TIMEFRAME_D1': TIMEFRAMES['D1'],
+    'COPY_TICKS_ALL': -1,
+    'ORDER_TYPE_BUY': 0,
+    'ORDER_TYPE_SELL': 1,
+    'POSITION_TYPE_BUY': 0,
+    'POSITION_TYPE_SELL': 1,
+    'TRADE_ACTION_DEAL': 1,
+    'ORDER_TIME_GTC': 0,
+    'ORDER_FILLING_IOC': 1,
+    'TRADE_RETCODE_REQUOTE': 10004,
+    'TRADE_RETCODE_DONE': 10009,
+    'TRADE_RETCODE_INVALID': 10013,
+    'TRADE_RETCODE_NO_MONEY': 10019,
+    'TRADE_RETCODE_PRICE_CHANGED': 10020,
+    'TRADE_RETCODE_PRICE_OFF': 10021,
+}
+
+# Same fields as the TradePosition tuples returned by mt5.positions_get
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'type', 'magic', 'volume', 'price_open', 'sl', 'tp',
+    'price_current', 'profit', 'symbol', 'comment',
+])
+
+
+class MT5Broker:
+    """
+    Live backend: forwards every call to the MetaTrader5 package.
+
+    The package is only imported on first use, so modules that call through
+    the broker can be imported on machines without a terminal.
+    """
+
+    def __init__(self):
+        self._mt5 = None
+
+    def __getattr__(self, name):
+        if self._mt5 is None:
+            import MetaTrader5
+            self._mt5 = MetaTrader5
+        return getattr(self._mt5, name)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def time(self):
+        return time.time()
+
+
+class ReplayBroker:
+    """
+    Offline backend serving the MT5 calls the bot uses from recorded candles.
+
+    Candles come from an `OHLCVStore` (the files the live bot records). The
+    replay keeps its own clock: `sleep` advances it instantly, so `run_live_bot`
+    runs as fast as the bot itself can go. The newest candle at or before the
+    clock is treated as the forming one; until the clock reaches its end it is
+    served as it looks at its open (the open is also its high, low and close,
+    and the current bid), so the replay never sees prices ahead of the clock.
+    Stop losses and take profits are checked on each candle once it has closed.
+
+    Args:
+        store (OHLCVStore): Recorded candles.
+        symbol (str): Symbol whose history positions the clock.
+        timeframe (int): Timeframe of the recorded candles.
+        start_bar (int): Index of the candle the clock starts at, leaving
+            earlier candles available as history.
+        latency (float): Simulated seconds between order_send and the fill.
+        slippage_points (float): Adverse slippage applied to every fill.
+        requote_rate (float): Probability that an order is requoted.
+        spread_points (float): Spread used when a candle has no spread recorded.
+        balance (float): Starting account balance.
+        symbol_specs (dict): Per-symbol overrides of the symbol_info fields.
+        realtime (bool): Also sleep for real, to replay at wall-clock speed.
+        seed (int): Seed of the fill model's random generator.
+    """
+
+    def __init__(self, store=None, symbol=settings.SYMBOL, timeframe=TIMEFRAMES['M15'],
+                 start_bar=100, latency=0.0, slippage_points=0.0, requote_rate=0.0,
+                 spread_points=2.0, balance=10000.0, symbol_specs=None, realtime=False, seed=0):
+        for name, value in MT5_CONSTANTS.items():
+            setattr(self, name, value)
+        self.store = store or OHLCVStore()
+        self.timeframe = timeframe
+        self.latency = latency
+        self.slippage_points = slippage_points
+        self.requote_rate = requote_rate
+        self.spread_points = spread_points
+        self.balance = balance
+        self.symbol_specs = symbol_specs or {}
+        self.realtime = realtime
+        self._rng = np.random.default_rng(seed)
+        self._tickets = itertools.count(1)
+        self._positions = {}
+        self._rates = {}
+
+        rates = self._load(symbol, timeframe)
+        if len(rates) == 0:
+            raise ValueError(f'No recorded candles for {symbol} in {self.store.root}')
+        self.now = int(rates['time'][min(start_bar, len(rates) - 1)])
+        self._end = int(rates['time'][-1])
+
+    # --- Terminal session -------------------------------------------------
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def login(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, 'Success')
+
+    # --- Clock ------------------------------------------------------------
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Advances the replay clock, checking SL/TP on the candles passed."""
+        if self.realtime:
+            time.sleep(seconds)
+        self._advance(self.now + seconds)
+
+    def _advance(self, new_time):
+        if new_time > self._end:
+            raise ReplayFinished(f'Replay reached the end of the recorded data ({self._end}).')
+        for ticket, position in list(self._positions.items()):
+            rates = self._load(position.symbol, self.timeframe)
+            # Candles that closed while the clock moved
+            ends = rates['time'] + timeframe_seconds(self.timeframe)
+            lo = np.searchsorted(ends, self.now, side='right')
+            hi = np.searchsorted(ends, new_time, side='right')
+            for candle in rates[lo:hi]:
+                exit_price = self._stop_hit(position, candle)
+                if exit_price is not None:
+                    self._close(ticket, exit_price)
+                    break
+        self.now = new_time
+
+    @staticmethod
+    def _stop_hit(position, candle):
+        if position.type == MT5_CONSTANTS['POSITION_TYPE_BUY']:
+            if position.sl and candle['low'] <= position.sl:
+                return position.sl
+            if position.tp and candle['high'] >= position.tp:
+                return position.tp
+        else:
+            if position.sl and candle['high'] >= position.sl:
+                return position.sl
+            if position.tp and candle['low'] <= position.tp:
+                return position.tp
+        return None
+
+    # --- Market data ------------------------------------------------------
+
+    def _load(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self._rates:
+            self._rates[key] = self.store.load(symbol, timeframe)
+        return self._rates[key]
+
+    def _current_index(self, symbol, timeframe):
+        rates = self._load(symbol, timeframe)
+        return np.searchsorted(rates['time'], self.now, side='right') - 1
+
+    def _as_of_now(self, candles, timeframe):
+        """Cuts a forming last candle back to its open, in place."""
+        forming = candles[-1:]
+        if len(forming) and self.now < forming['time'][0] + timeframe_seconds(timeframe):
+            for field in ('high', 'low', 'close'):
+                forming[field] = forming['open']
+            forming['tick_volume'] = forming['real_volume'] = 0
+        return candles
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = self._load(symbol, timeframe)
+        end = self._current_index(symbol, timeframe) - start_pos + 1
+        if end <= 0:
+            return None
+        return self._as_of_now(np.array(rates[max(end - count, 0):end]), timeframe)
+
+    def symbol_info(self, symbol):
+        digits = 3 if symbol.endswith('JPY') else 5
+        point = 10.0 ** -digits
+        spec = {
+            'name': symbol,
+            'digits': digits,
+            'point': point,
+            'trade_tick_size': point,
+            'trade_tick_value': 1.0,
+            'trade_contract_size': 100000.0,
+            'margin_initial': 0.0,
+            'volume_min': 0.01,
+            'volume_step': 0.01,
+            'spread': int(self.spread_points),
+        }
+        spec.update(self.symbol_specs.get(symbol, {}))
+        return SimpleNamespace(**spec)
+
+    def symbol_info_tick(self, symbol):
+        rates = self._load(symbol, self.timeframe)
+        index = self._current_index(symbol, self.timeframe)
+        if index < 0:
+            return None
+        candle = self._as_of_now(np.array(rates[index:index + 1]), self.timeframe)[0]
+        point = self.symbol_info(symbol).point
+        spread = candle['spread'] if candle['spread'] > 0 else self.spread_points
+        bid = float(candle['close'])
+        return SimpleNamespace(time=self.now, bid=bid, ask=bid + spread * point, last=bid,
+                               volume=0, time_msc=self.now * 1000)
+
+    # --- Account and trading ----------------------------------------------
+
+    def _profit(self, position, price):
+        info = self.symbol_info(position.symbol)
+        direction = 1 if position.type == MT5_CONSTANTS['POSITION_TYPE_BUY'] else -1
+        ticks = (price - position.price_open) * direction / info.trade_tick_size
+        return ticks * info.trade_tick_value * position.volume
+
+    def _mark(self, position):
+        tick = self.symbol_info_tick(position.symbol)
+        price = tick.bid if position.type == MT5_CONSTANTS['POSITION_TYPE_BUY'] else tick.ask
+        return position._replace(price_current=price, profit=self._profit(position, price))
+
+    def account_info(self):
+        floating = sum(self._mark(p).profit for p in self._positions.values())
+        margin = sum(p.volume * self.symbol_info(p.symbol).margin_initial for p in self._positions.values())
+        equity = self.balance + floating
+        return SimpleNamespace(balance=self.balance, equity=equity, profit=floating,
+                               margin=margin, margin_free=equity - margin)
+
+    def positions_get(self, symbol=None, ticket=None):
+        positions = [self._mark(p) for p in self._positions.values()
+                     if (symbol is None or p.symbol == symbol) and (ticket is None or p.ticket == ticket)]
+        return tuple(positions)
+
+    def order_send(self, request):
+        """Fills a market order after the configured latency, or requotes it."""
+        if self.latency:
+            if self.realtime:
+                time.sleep(self.latency)
+            self._advance(self.now + self.latency)
+
+        symbol = request['symbol']
+        tick = self.symbol_info_tick(symbol)
+        point = self.symbol_info(symbol).point
+        is_buy = request['type'] == self.ORDER_TYPE_BUY
+        market = tick.ask if is_buy else tick.bid
+
+        def result(retcode, price=0.0, order=0):
+            return SimpleNamespace(retcode=retcode, deal=order, order=order, volume=request['volume'],
+                                   price=price, bid=tick.bid, ask=tick.ask, comment='', request=request)
+
+        if self.requote_rate and self._rng.random() < self.requote_rate:
+            return result(self.TRADE_RETCODE_REQUOTE)
+
+        price = market + self.slippage_points * point if is_buy else market - self.slippage_points * point
+        ticket = request.get('position')
+        if ticket:
+            if ticket not in self._positions:
+                return result(self.TRADE_RETCODE_INVALID)
+            self._close(ticket, price)
+            return result(self.TRADE_RETCODE_DONE, price, ticket)
+
+        ticket = next(self._tickets)
+        self._positions[ticket] = TradePosition(
+            ticket=ticket, time=self.now,
+            type=self.POSITION_TYPE_BUY if is_buy else self.POSITION_TYPE_SELL,
+            magic=request.get('magic', 0), volume=request['volume'], price_open=price,
+            sl=request.get('sl', 0.0), tp=request.get('tp', 0.0), price_current=price,
+            profit=0.0, symbol=symbol, comment=request.get('comment', ''))
+        return result(self.TRADE_RETCODE_DONE, price, ticket)
+
+    def _close(self, ticket, price):
+        position = self._positions.pop(ticket)
+        self.balance += self._profit(position, price)
+
+
+class _BrokerProxy:
+    """Forwards attribute access to the active backend, created on first use."""
+
+    def __init__(self):
+        self._backend = None
+
+    def __getattr__(self, name):
+        if self._backend is None:
+            self._backend = create_broker(settings.BROKER.get('backend', 'mt5'))
+        return getattr(self._backend, name)
+
+
+# Every call to the trading terminal goes through this object
+broker = _BrokerProxy()
+
+
+def create_broker(name, **kwargs):
+    """Creates a broker backend by name ('mt5' or 'replay')."""
+    if name == 'mt5':
+        return MT5Broker()
+    elif name == 'replay':
+        options = dict(settings.REPLAY)
+        options.update(kwargs)
+        options['store'] = OHLCVStore(options.pop('data_dir'))
+        options['timeframe'] = TIMEFRAMES.get(options['timeframe'], options['timeframe'])
+        return ReplayBroker(**options)
+    else:
+        raise ValueError(f'Unknown broker backend: {name}')
+
+
+def set_broker(backend):
+    """Makes `backend` the target of every broker call."""
+    broker._backend = backend
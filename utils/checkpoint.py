@@ -0,0 +1,90 @@
+import os
+import pickle
+import time
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+def save_checkpoint(path, key, state):
+    """
+    Pickles a state snapshot atomically, so a reader (or a restart after a
+    crash mid-write) sees either the previous snapshot or the new one.
+
+    Args:
+        path (str): Checkpoint file.
+        key: Identifies the run the state belongs to, see `load_checkpoint`.
+        state: Any picklable object.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'key': key, 'saved_at': time.time(), 'state': state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, key):
+    """
+    Returns the state saved under `key`, or None if there is no checkpoint,
+    it is unreadable, or it was taken for another run (other data, strategy
+    or parameters).
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning(f'Could not load checkpoint {path}: {e}')
+        return None
+    if snapshot.get('key') != key:
+        logger.info(f'Ignoring checkpoint {path}: it belongs to another run.')
+        return None
+    return snapshot['state']
+
+
+class Checkpoint:
+    """
+    Periodic snapshots of a long-running loop.
+
+    The loop asks `due` as often as it likes and calls `save` when it is;
+    snapshots are at most one every `interval` seconds of wall time, so the
+    work lost to a restart is bounded by it.
+
+    Args:
+        path (str): Checkpoint file.
+        interval (float): Seconds between snapshots.
+    """
+
+    def __init__(self, path, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self._last_saved = time.monotonic()
+
+    def load(self, key):
+        state = load_checkpoint(self.path, key)
+        if state is not None:
+            logger.info(f'Resuming from checkpoint {self.path}.')
+        return state
+
+    def due(self):
+        return time.monotonic() - self._last_saved >= self.interval
+
+    def save(self, key, state):
+        started = time.monotonic()
+        try:
+            save_checkpoint(self.path, key, state)
+        except Exception as e:
+            # A failed snapshot must not stop the loop it protects
+            logger.error(f'Could not save checkpoint {self.path}: {e}')
+        self._last_saved = started
+
+    def clear(self):
+        """Removes the checkpoint once its run has finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,22 +1,41 @@
-import MetaTrader5 as mt5
-import pandas as pd
-import os
+import numpy as np
+import threading
 import time
-from datetime import datetime
-from config.settings import MT5_ACCOUNT, MT5_PASSWORD, MT5_SERVER, SYMBOL, TIMEFRAME, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS, LOT
-from utils.logger import setup_logger
+from config.settings import SYMBOL, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS
+from utils.logger import setup_logger, events
+from utils.data_store import OHLCVStore, TickStore, RATES_DTYPE, TIMEFRAMES, timeframe_name, timeframe_seconds
+from utils.broker import broker
+from utils.market_data import market_session
+from utils.resampler import Resampler
+from utils.telemetry import telemetry
 from config import settings
 
 logger = setup_logger()
 
+# Local candle and tick stores shared by the backtester and the live loop
+data_store = OHLCVStore()
+tick_store = TickStore()
+
+# Builds the other timeframes from settings.TRADING['base_timeframe'], when set
+resampler = Resampler(settings.TRADING.get('base_timeframe') or 'M1')
+_resampler_lock = threading.Lock()
+# One lock per stored (symbol, timeframe): concurrent pipelines must not both
+# read the same last candle and write the same new ones
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+_base_fetched_at = {}  # symbol -> broker time of the last base fetch
+# Base fetches of a symbol closer together than this are shared (one per cycle)
+BASE_FETCH_TTL = 1.0
+
 def initialize_mt5(max_retries=3, retry_delay=10):
     for attempt in range(max_retries):
-        if mt5.initialize(path=settings.BROKER['terminal_path']):
-            if mt5.login(int(settings.BROKER['account']), settings.BROKER['password'], settings.BROKER['server']):
+        if broker.initialize(path=settings.BROKER['terminal_path']):
+            if broker.login(int(settings.BROKER['account'] or 0), settings.BROKER['password'], settings.BROKER['server']):
                 logger.info('MT5 initialized and logged in.')
                 return True
-            mt5.shutdown()
+            broker.shutdown()
         logger.warning(f'MT5 initialization failed, attempt {attempt + 1}/{max_retries}')
+        telemetry.count('connect_retries')
         time.sleep(retry_delay)
     logger.error('Failed to initialize MT5 after retries.')
     return False
@@ -25,7 +44,7 @@ def get_latest_price(symbol=SYMBOL):
     """Fetches the latest tick data for a given symbol."""
     try:
         # Request tick data
-        tick = mt5.symbol_info_tick(symbol)
+        tick = broker.symbol_info_tick(symbol)
         if tick is None:
             logger.error(f"Failed to get tick for {symbol}")
             return None
@@ -36,58 +55,197 @@ def get_latest_price(symbol=SYMBOL):
         logger.error(f"An error occurred while fetching price: {e}")
         return None
 
-def get_historical_data(symbol=SYMBOL, timeframe=mt5.TIMEFRAME_M15, num_candles=100):
-    """Fetches historical OHLCV data."""
+def get_historical_data(symbol=SYMBOL, timeframe=None, num_candles=100, use_store=False):
+    """
+    Fetches historical OHLCV data.
+
+    With `use_store`, closed candles are served from the local candle store and
+    only the ones newer than its last candle are requested from the terminal.
+    The newest (still forming) candle always comes from the terminal. When
+    settings.TRADING['base_timeframe'] is set, the stored path builds other
+    timeframes from that one (see `get_resampled_data`).
+    """
+    if timeframe is None:
+        timeframe = TIMEFRAMES[settings.TIMEFRAME]
+    if use_store:
+        with telemetry.timer('get_historical_data'):
+            if settings.TRADING.get('base_timeframe') and timeframe_name(timeframe) != resampler.base_timeframe:
+                return get_resampled_data(symbol, timeframe, num_candles)
+            return _get_stored_data(symbol, timeframe, num_candles)
     try:
         # Get historical data
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, num_candles)
+        with telemetry.timer('get_historical_data'):
+            rates = broker.copy_rates_from_pos(symbol, timeframe, 0, num_candles)
         return rates
     except Exception as e:
         logger.error(f"An error occurred while fetching historical data: {e}")
         return None
-    
+
+def _store_lock(symbol, timeframe):
+    key = (symbol, timeframe_name(timeframe))
+    with _store_locks_guard:
+        return _store_locks.setdefault(key, threading.RLock())
+
+def sync_data_store(symbol=SYMBOL, timeframe=None, num_candles=100, store=None):
+    """
+    Brings the local candle store up to date with the terminal.
+
+    Only candles newer than the last stored one are fetched; the request size
+    doubles until it overlaps the store, so a restart after downtime fills the
+    gap without pulling the whole history again. A full `num_candles` download
+    happens only when the store holds less history than that.
+
+    Safe to call from several threads: syncs of the same symbol and
+    timeframe run one at a time.
+
+    Returns:
+        np.ndarray: The candles received from the terminal, newest (still
+        forming) last, or None on failure.
+    """
+    if timeframe is None:
+        timeframe = TIMEFRAMES[settings.TIMEFRAME]
+    with _store_lock(symbol, timeframe):
+        return _sync_data_store(symbol, timeframe, num_candles, store or data_store)
+
+def _sync_data_store(symbol, timeframe, num_candles, store):
+    last_time = store.last_time(symbol, timeframe)
+    if last_time is None or store.count(symbol, timeframe) < num_candles - 1:
+        rates = get_historical_data(symbol, timeframe, num_candles)
+        if rates is None or len(rates) == 0:
+            return rates
+        # The newest candle is still forming, only closed ones are stored
+        if last_time is None:
+            store.append(symbol, timeframe, rates[:-1])
+        else:
+            store.merge(symbol, timeframe, rates[:-1])
+        return rates
+
+    count = 2
+    while True:
+        rates = get_historical_data(symbol, timeframe, count)
+        if rates is None or len(rates) == 0:
+            return rates
+        if rates[0]['time'] <= last_time or len(rates) < count:
+            break
+        count *= 2
+    store.append(symbol, timeframe, rates[:-1])
+    return rates
+
+def _get_stored_data(symbol, timeframe, num_candles, store=None):
+    store = store or data_store
+    # Read the window under the lock too, so it matches the candles just synced
+    with _store_lock(symbol, timeframe):
+        rates = sync_data_store(symbol, timeframe, num_candles, store=store)
+        if rates is None or len(rates) == 0:
+            return rates
+        forming = rates[-1:]
+        closed = store.range(symbol, timeframe, end=forming['time'][0])
+    closed = closed[max(len(closed) - (num_candles - 1), 0):]
+    return np.concatenate([closed, forming.astype(RATES_DTYPE, copy=False)])
+
+def get_resampled_data(symbol, timeframe, num_candles=100, store=None):
+    """
+    Returns candles of a timeframe built from the symbol's base series.
+
+    Only the base timeframe is fetched from the terminal on each cycle, once
+    per symbol however many timeframes are used. A timeframe's history is
+    built from base candles when it is first requested; only when that would
+    take more than the resampler keeps is the timeframe fetched directly,
+    once, to seed it.
+
+    Returns:
+        np.ndarray: Up to `num_candles` candles, the forming one last, or None
+        if no base candles could be fetched.
+    """
+    base = TIMEFRAMES[resampler.base_timeframe]
+    with _resampler_lock:
+        new = not resampler.subscribed(symbol, timeframe)
+        now = broker.time()
+        last = resampler.last_base_time(symbol)
+        if new or last is None or now - _base_fetched_at.get(symbol, -np.inf) >= BASE_FETCH_TTL:
+            # Every base candle since the last fetch, and for a new timeframe
+            # enough of them to build its history (within what the resampler keeps)
+            count = 2 if last is None else int(now - last) // resampler.base_seconds + 2
+            if new:
+                ratio = timeframe_seconds(timeframe) // resampler.base_seconds
+                count = max(count, min(num_candles * ratio, resampler.max_bars) + 1, ratio + 1)
+            rates = _get_stored_data(symbol, base, count, store=store)
+            if rates is None or len(rates) == 0:
+                return rates
+            _base_fetched_at[symbol] = now
+            resampler.update(symbol, rates)
+        if new:
+            resampler.subscribe(symbol, timeframe)
+            if len(resampler.bars(symbol, timeframe)) < num_candles:
+                # Longer histories are seeded from the timeframe itself, once
+                history = _get_stored_data(symbol, timeframe, num_candles, store=store)
+                if history is not None and len(history):
+                    resampler.warm_up(symbol, timeframe, history[:-1])
+        return resampler.bars(symbol, timeframe, num_candles)
+
 def save_historical_data(symbol, timeframe, num_candles, save_dir='data/raw_data'):
-    rates = get_historical_data(symbol, timeframe, num_candles)
+    """Updates the local candle store for a symbol and timeframe."""
+    store = data_store if save_dir == data_store.root else OHLCVStore(save_dir)
+    rates = sync_data_store(symbol, timeframe, num_candles, store=store)
     if rates is None:
         return None
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], units='s')
-    os.makedirs(save_dir, exist_ok=True)
-    filename = f"{save_dir}/{symbol}_{timeframe}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    df.to_csv(filename, index=False)
-    logger.info(f'Saved historical data to {filename}')
+    logger.info(f'Stored {store.count(symbol, timeframe)} candles in {store.path(symbol, timeframe)}')
     return rates
 
-def calculate_lot_size(symbol, account_equity, risk_percent=1.0, stop_loss_pips=STOP_LOSS_PIPS):
-    symbol_info = mt5.symbol_info(symbol)
+def save_tick_data(symbol, date_from, date_to, store=None):
+    """
+    Downloads the ticks of a period and appends the new ones to the tick store.
+
+    Args:
+        symbol (str): The trading symbol.
+        date_from (datetime): Start of the period.
+        date_to (datetime): End of the period.
+
+    Returns:
+        int: The number of ticks stored, or None on failure.
+    """
+    store = store or tick_store
+    try:
+        ticks = broker.copy_ticks_range(symbol, date_from, date_to, broker.COPY_TICKS_ALL)
+    except Exception as e:
+        logger.error(f"An error occurred while fetching ticks: {e}")
+        return None
+    if ticks is None:
+        return None
+    written = store.append(symbol, ticks)
+    logger.info(f'Stored {written} new ticks in {store.path(symbol)}')
+    return written
+
+def calculate_lot_size(symbol, account_equity, risk_percent=1.0, stop_loss_pips=STOP_LOSS_PIPS, session=None):
+    symbol_info = (session or market_session).symbol_info(symbol)
     if symbol_info is None:
         return settings.TRADING['lot_size'] # fallback
-    point = symbol_info.point
     pip_value = symbol_info.trade_tick_value
     risk_amount = account_equity * (risk_percent / 100)
     lot_size = risk_amount / (stop_loss_pips * pip_value)
     return round(lot_size, 2)
 
-def calculate_sl_tp_prices(symbol, order_type):
+def calculate_sl_tp_prices(symbol, order_type, session=None):
     """
-    Calculates the stop loss and take profit prices.
+    Calculates the stop loss and take profit prices from the cycle's tick snapshot.
     """
-    symbol_info = mt5.symbol_info(symbol)
+    session = session or market_session
+    symbol_info = session.symbol_info(symbol)
     if symbol_info is None:
         return None, None
     
     point = symbol_info.point
 
-    # Fetch the latest tick data to get current bid and ask prices
-    tick = mt5.symbol_info_tick(symbol)
+    # Current bid and ask prices
+    tick = session.tick(symbol)
     if tick is None:
         return None, None
     
-    if order_type == mt5.ORDER_TYPE_BUY:
+    if order_type == broker.ORDER_TYPE_BUY:
         price = tick.ask
         sl_price = price - STOP_LOSS_PIPS * point
         tp_price = price + TAKE_PROFIT_PIPS * point
-    elif order_type == mt5.ORDER_TYPE_SELL:
+    elif order_type == broker.ORDER_TYPE_SELL:
         price = tick.bid
         sl_price = price + STOP_LOSS_PIPS * point
         tp_price = price - TAKE_PROFIT_PIPS * point
@@ -96,87 +254,105 @@ def calculate_sl_tp_prices(symbol, order_type):
     
     return sl_price, tp_price
 
-def open_position(symbol, lot_size, order_type, magic_number):
+def open_position(symbol, lot_size, order_type, magic_number, session=None):
     """
     Sends a market order to open a new position with SL/TP.
+
+    Symbol metadata comes from the session's cache, and the lot size, SL/TP
+    and order price all use the cycle's single tick snapshot.
     
     Args:
         symbol (str): The trading symbol (e.g., "EURUSD").
         lot_size (float): The volume of the trade in lots.
-        order_type (int): mt5.ORDER_TYPE_BUY or mt5.ORDER_TYPE_SELL.
+        order_type (int): broker.ORDER_TYPE_BUY or broker.ORDER_TYPE_SELL.
         magic_number (int): A unique ID for the bot's trades.
+        session (MarketSession): Market-data cache, defaults to the shared one.
 
     Returns:
         bool: True if the order was sent successfully, False otherwise.
     """
-    account_info = mt5.account_info()
+    session = session or market_session
+    account_info = session.account_info()
+    if account_info is None:
+        logger.error('Failed to get account info')
+        return False
 
-    if account_info:
-        lot_size = calculate_lot_size(symbol, account_info.equity)
+    lot_size = calculate_lot_size(symbol, account_info.equity, session=session)
 
-    if account_info.margin_free < lot_size * mt5.symbol_info(symbol).margin_initial:
+    symbol_info = session.symbol_info(symbol)
+    if symbol_info is None or account_info.margin_free < lot_size * symbol_info.margin_initial:
         logger.error('Insufficient margin to open position')
         return False
     
-    sl, tp = calculate_sl_tp_prices(symbol, order_type)
+    sl, tp = calculate_sl_tp_prices(symbol, order_type, session=session)
     if sl is None or tp is None:
         logger.error("Failed to calculate SL/TP prices.")
         return False
     
+    tick = session.tick(symbol)
+
     # Create the trade request
     request = {
-        "action": mt5.TRADE_ACTION_DEAL,
+        "action": broker.TRADE_ACTION_DEAL,
         "symbol": symbol,
         "volume": lot_size,
         "type": order_type,
-        "price": mt5.symbol_info_tick(symbol).ask if order_type == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(symbol).bid,
+        "price": tick.ask if order_type == broker.ORDER_TYPE_BUY else tick.bid,
         "sl": sl,
         "tp": tp,
         "deviation": 20, # Slippage in points
         "magic": magic_number,
         "comment": "python script open",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
+        "type_time": broker.ORDER_TIME_GTC,
+        "type_filling": broker.ORDER_FILLING_IOC,
     }
 
     # Send the request to the trading terminal
-    result = mt5.order_send(request)
+    with telemetry.timer('order_send'):
+        result = broker.order_send(request)
+    telemetry.count('orders', action='open', retcode=result.retcode)
+    events.record('order', symbol=symbol, side='BUY' if order_type == broker.ORDER_TYPE_BUY else 'SELL',
+                  time=np.datetime64(int(broker.time()), 's'), volume=lot_size,
+                  entry_price=request['price'], price=result.price, retcode=result.retcode, ticket=result.order)
 
     # Check the execution result
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
+    if result.retcode != broker.TRADE_RETCODE_DONE:
         logger.error(f"Failed to open position. Error code: {result.retcode}")
         logger.error(f"Request: {request}")
         return False
     else:
-        logger.info(f"Successfully sent a {result.type} order for {symbol}.")
+        logger.info(f"Successfully sent a {order_type} order for {symbol}.")
         logger.info(f"Position opened with ticket #{result.order} at price {result.price}.")
         logger.info(f"SL: {sl}, TP: {tp}")
         return True
 
-def close_position(position_id):
+def close_position(position_id, session=None):
     """
     Sends a request to close an open position.
     
     Args:
         position_id (int): The ticket number of the position to close.
+        session (MarketSession): Market-data cache, defaults to the shared one.
 
     Returns:
         bool: True if the order was sent successfully, False otherwise.
     """
     # Get the position details
-    position = mt5.positions_get(ticket=position_id)[0]
+    position = broker.positions_get(ticket=position_id)[0]
+
+    tick = (session or market_session).tick(position.symbol)
 
     # Check the type of the open position to determine the counter-trade
-    if position.type == mt5.POSITION_TYPE_BUY:
-        close_order_type = mt5.ORDER_TYPE_SELL
-        close_price = mt5.symbol_info_tick(position.symbol).bid
+    if position.type == broker.POSITION_TYPE_BUY:
+        close_order_type = broker.ORDER_TYPE_SELL
+        close_price = tick.bid
     else:
-        close_order_type = mt5.ORDER_TYPE_BUY
-        close_price = mt5.symbol_info_tick(position.symbol).ask
+        close_order_type = broker.ORDER_TYPE_BUY
+        close_price = tick.ask
     
     # Create the trade request to close the position
     close_request = {
-        "action": mt5.TRADE_ACTION_DEAL,
+        "action": broker.TRADE_ACTION_DEAL,
         "symbol": position.symbol,
         "volume": position.volume,
         "type": close_order_type,
@@ -185,15 +361,21 @@ def close_position(position_id):
         "deviation": 20,
         "magic": position.magic,
         "comment": "python script close",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
+        "type_time": broker.ORDER_TIME_GTC,
+        "type_filling": broker.ORDER_FILLING_IOC,
     }
     
     # Send the request
-    result = mt5.order_send(close_request)
+    with telemetry.timer('order_send'):
+        result = broker.order_send(close_request)
+    telemetry.count('orders', action='close', retcode=result.retcode)
+    events.record('order', symbol=position.symbol,
+                  side='BUY' if close_order_type == broker.ORDER_TYPE_BUY else 'SELL',
+                  time=np.datetime64(int(broker.time()), 's'), volume=position.volume,
+                  entry_price=close_price, price=result.price, retcode=result.retcode, ticket=position_id)
 
     # Check the execution result
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
+    if result.retcode != broker.TRADE_RETCODE_DONE:
         logger.error(f"Failed to close position {position_id}. Error code: {result.retcode}")
         return False
     else:
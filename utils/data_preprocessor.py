@@ -1,14 +1,23 @@
-import pandas as pd
-import numpy as np
-
-
-def preprocess_data(df):
-    """Cleans and preprocesses data for ML strategies"""
-    df = df.copy()
-    # Handles missing values
-    df = df.fillna(method='ffill').fillna(method='bfill')
-    # Normalize features (could be optional)
-    for col in ['close', 'open', 'high', 'low']:
-        if col in df:
-            df[f'{col}_norm'] = (df[col] - df[col].mean()) / df[col].std()
+from utils.features import FeatureEngine
+
+
+def preprocess_data(df, engine=None):
+    """
+    Cleans data for ML strategies and adds the feature engine's columns.
+
+    Missing values are only forward-filled, and features are normalized with
+    rolling statistics, so no bar is computed from later ones.
+
+    Args:
+        df (pd.DataFrame): Bars with at least a 'close' column.
+        engine (FeatureEngine): Feature settings; the defaults when omitted.
+
+    Returns:
+        pd.DataFrame: A copy of `df` with one float32 column per feature.
+    """
+    engine = engine or FeatureEngine()
+    df = df.ffill()
+    features = engine.transform(df)
+    for i, name in enumerate(engine.names):
+        df[name] = features[:, i]
     return df
@@ -0,0 +1,296 @@
+import os
+import numpy as np
+
+# Record layout of the arrays returned by mt5.copy_rates_from_pos
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+# Compact tick record: the fields of mt5.copy_ticks_range the backtester needs
+TICKS_DTYPE = np.dtype([
+    ('time_msc', '<i8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+])
+
+# MetaTrader 5 timeframe constants, used to give store files readable names
+TIMEFRAMES = {
+    'M1': 1,
+    'M5': 5,
+    'M15': 15,
+    'M30': 30,
+    'H1': 16385,
+    'H4': 16388,
+    'D1': 16408,
+}
+
+# Length of one candle of each timeframe, in seconds
+TIMEFRAME_SECONDS = {
+    'M1': 60,
+    'M5': 300,
+    'M15': 900,
+    'M30': 1800,
+    'H1': 3600,
+    'H4': 14400,
+    'D1': 86400,
+}
+
+
+def timeframe_name(timeframe):
+    """Returns the 'M15'-style name of an MT5 timeframe constant."""
+    if isinstance(timeframe, str):
+        return timeframe
+    for name, value in TIMEFRAMES.items():
+        if value == timeframe:
+            return name
+    return str(timeframe)
+
+
+def timeframe_seconds(timeframe):
+    """Returns the candle length of an MT5 timeframe constant or name, in seconds."""
+    return TIMEFRAME_SECONDS[timeframe_name(timeframe)]
+
+
+def _map_records(path, dtype, maps):
+    """
+    Memory-maps a file of fixed-size records read-only, reusing the mapping in
+    `maps` while the file size is unchanged.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return np.empty(0, dtype=dtype)
+    # Ignore a partially written trailing record
+    count = size // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+
+    cached = maps.get(path)
+    if cached is not None and cached[0] == size:
+        return cached[1]
+    records = np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+    maps[path] = (size, records)
+    return records
+
+
+def _append_records(path, records):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'ab') as f:
+        f.write(np.ascontiguousarray(records).tobytes())
+
+
+class OHLCVStore:
+    """
+    Append-only on-disk store of closed candles, one file per (symbol, timeframe).
+
+    Each file is a flat sequence of `RATES_DTYPE` records sorted by time, so it
+    can be memory-mapped as a NumPy structured array with the same layout MT5
+    returns. Reads are zero-copy slices of the mapping.
+
+    Candles older than the first stored one (a deeper history download) go to
+    a side file read into memory instead of mapped: the mapped file is never
+    replaced, which Windows refuses while views of it are alive. Reads that
+    span both files are copies.
+    """
+
+    def __init__(self, root='data/raw_data'):
+        self.root = root
+        self._maps = {}  # path -> (file size, memmap)
+        self._older = {}  # side file path -> (file size, records)
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, f'{symbol}_{timeframe_name(timeframe)}.rates')
+
+    def _older_path(self, symbol, timeframe):
+        return self.path(symbol, timeframe)[:-len('.rates')] + '.older.rates'
+
+    def _load_older(self, symbol, timeframe):
+        """The candles merged in before the first appended one, or an empty array."""
+        path = self._older_path(symbol, timeframe)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=RATES_DTYPE)
+        cached = self._older.get(path)
+        if cached is None or cached[0] != size:
+            cached = (size, np.fromfile(path, dtype=RATES_DTYPE, count=size // RATES_DTYPE.itemsize))
+            self._older[path] = cached
+        return cached[1]
+
+    def load(self, symbol, timeframe):
+        """
+        Maps the whole stored series read-only.
+
+        Returns:
+            np.ndarray: A structured array (memmap) of stored candles, empty if
+            nothing has been stored yet. A copy once older history has been
+            merged in.
+        """
+        newer = _map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps)
+        older = self._load_older(symbol, timeframe)
+        return np.concatenate([older, newer]) if len(older) else newer
+
+    def count(self, symbol, timeframe):
+        """Number of stored candles."""
+        return len(self._load_older(symbol, timeframe)) + \
+            len(_map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps))
+
+    def last_time(self, symbol, timeframe):
+        """Open time of the newest stored candle, or None if the store is empty."""
+        for rates in (_map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps),
+                      self._load_older(symbol, timeframe)):
+            if len(rates):
+                return int(rates['time'][-1])
+        return None
+
+    def append(self, symbol, timeframe, rates):
+        """
+        Appends the candles newer than the last stored one.
+
+        Args:
+            rates (np.ndarray): Candles in chronological order.
+
+        Returns:
+            int: The number of candles written.
+        """
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        last_time = self.last_time(symbol, timeframe)
+        if last_time is not None:
+            rates = rates[rates['time'] > last_time]
+        if len(rates) == 0:
+            return 0
+
+        _append_records(self.path(symbol, timeframe), rates)
+        return len(rates)
+
+    def merge(self, symbol, timeframe, rates):
+        """
+        Merges candles that may be older than the stored ones (e.g. a deeper
+        history download). Candles newer than the stored ones are appended;
+        older ones are merged into the side file, which is rewritten
+        atomically. Stored candles are kept as they are.
+
+        Returns:
+            int: The number of candles in the store afterwards.
+        """
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        newer = _map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps)
+        if len(newer) == 0:
+            # Nothing is mapped yet, so everything older goes in the main file
+            older = self._load_older(symbol, timeframe)
+            if len(older) == 0:
+                self.append(symbol, timeframe, rates)
+                return self.count(symbol, timeframe)
+            first_time = older['time'][0]
+        else:
+            first_time = newer['time'][0]
+
+        backfill = rates[rates['time'] < first_time]
+        if len(backfill):
+            older = self._load_older(symbol, timeframe)
+            combined = np.concatenate([older, backfill])
+            # Keep the stored copy of candles present in both
+            _, first = np.unique(combined['time'], return_index=True)
+            combined = combined[first]
+            path = self._older_path(symbol, timeframe)
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = path + '.tmp'
+            combined.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        self.append(symbol, timeframe, rates)
+        return self.count(symbol, timeframe)
+
+    def tail(self, symbol, timeframe, count):
+        """The newest `count` stored candles, as a zero-copy view when they are all in the mapped file."""
+        newer = _map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps)
+        if count <= len(newer):
+            return newer[len(newer) - count:]
+        older = self._load_older(symbol, timeframe)
+        return np.concatenate([older[max(len(older) - (count - len(newer)), 0):], newer])
+
+    def range(self, symbol, timeframe, start=None, end=None):
+        """
+        Stored candles with ``start <= time < end``, as a zero-copy view
+        unless the range reaches into merged older history.
+
+        Args:
+            start (int): Inclusive lower bound in epoch seconds, or None.
+            end (int): Exclusive upper bound in epoch seconds, or None.
+        """
+        parts = []
+        for rates in (self._load_older(symbol, timeframe),
+                      _map_records(self.path(symbol, timeframe), RATES_DTYPE, self._maps)):
+            times = rates['time']
+            lo = 0 if start is None else np.searchsorted(times, start, side='left')
+            hi = len(rates) if end is None else np.searchsorted(times, end, side='left')
+            if hi > lo:
+                parts.append(rates[lo:hi])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RATES_DTYPE)
+
+
+class TickStore:
+    """
+    Append-only on-disk store of bid/ask ticks, one file per symbol.
+
+    Same layout rules as `OHLCVStore`: a flat sequence of `TICKS_DTYPE`
+    records sorted by time, memory-mapped on read, so a backtest over
+    hundreds of millions of ticks only pages in what it touches.
+    """
+
+    def __init__(self, root='data/raw_data'):
+        self.root = root
+        self._maps = {}
+
+    def path(self, symbol):
+        return os.path.join(self.root, f'{symbol}.ticks')
+
+    def load(self, symbol):
+        """Maps all stored ticks of a symbol read-only."""
+        return _map_records(self.path(symbol), TICKS_DTYPE, self._maps)
+
+    def last_time_msc(self, symbol):
+        """Time of the newest stored tick in epoch milliseconds, or None."""
+        ticks = self.load(symbol)
+        if len(ticks) == 0:
+            return None
+        return int(ticks['time_msc'][-1])
+
+    def append(self, symbol, ticks):
+        """
+        Appends the ticks newer than the last stored one.
+
+        Args:
+            ticks (np.ndarray): Ticks in chronological order, with at least
+                'time_msc', 'bid' and 'ask' fields (e.g. from
+                mt5.copy_ticks_range).
+
+        Returns:
+            int: The number of ticks written.
+        """
+        records = np.empty(len(ticks), dtype=TICKS_DTYPE)
+        for name in TICKS_DTYPE.names:
+            records[name] = ticks[name]
+        last_time_msc = self.last_time_msc(symbol)
+        if last_time_msc is not None:
+            records = records[records['time_msc'] > last_time_msc]
+        if len(records) == 0:
+            return 0
+        _append_records(self.path(symbol), records)
+        return len(records)
+
+    def range(self, symbol, start_msc=None, end_msc=None):
+        """Stored ticks with ``start_msc <= time_msc < end_msc``, as a zero-copy view."""
+        ticks = self.load(symbol)
+        times = ticks['time_msc']
+        lo = 0 if start_msc is None else np.searchsorted(times, start_msc, side='left')
+        hi = len(ticks) if end_msc is None else np.searchsorted(times, end_msc, side='left')
+        return ticks[lo:hi]
@@ -0,0 +1,179 @@
+import math
+
+import numpy as np
+
+from utils.indicator_graph import IndicatorStream, indicator_graph
+
+FEATURE_NAMES = [
+    'return',         # close over the previous close, minus one
+    'zscore',         # close standardized by the rolling mean/std of the last norm_window closes
+    'close_short_gap',
+    'close_long_gap',
+    'ma_spread',      # short MA over long MA, minus one
+    'ewm_gap',        # close over its EWM (span short_period), minus one
+    'rsi',            # Wilder RSI scaled to [0, 1]
+    'atr',            # Wilder ATR relative to the close
+    'bar_range',      # high minus low, relative to the close
+    'volatility',     # rolling std of returns over norm_window
+]
+
+
+def _column(data, name, default):
+    names = getattr(getattr(data, 'dtype', None), 'names', None) or getattr(data, 'columns', ())
+    if name in names:
+        return np.asarray(data[name], dtype=np.float64)
+    return default
+
+
+def _field(bar, name, default):
+    names = getattr(getattr(bar, 'dtype', None), 'names', None)
+    if names is None:
+        names = bar.keys() if hasattr(bar, 'keys') else ()
+    return float(bar[name]) if name in names else default
+
+
+class FeatureEngine:
+    """
+    Leakage-free features for the ML strategies.
+
+    Every feature of a bar only depends on that bar and the ones before it:
+    normalization uses rolling statistics instead of the mean/std of the whole
+    history, so a backtest sees exactly what the live bot would have seen.
+
+    The indicators come from the shared indicator graph. Streaming mode
+    (`on_bar` / `update`) reads its online nodes (rolling stats, EWM, Wilder
+    RSI and ATR) and costs O(1) per bar. Batch mode (`transform`) reads the
+    vectorized values of the whole history, for training and backtests,
+    shared with every other strategy backtested on the same bars. Both
+    return float32 rows; they agree to float32 precision.
+
+    Args:
+        short_period (int): Short moving average / EWM span.
+        long_period (int): Long moving average.
+        rsi_period (int): RSI smoothing period.
+        atr_period (int): ATR smoothing period.
+        norm_window (int): Window of the z-score and return volatility.
+        indicators (IndicatorStream): Streaming indicators to share with
+            other strategies of the symbol and timeframe; private by default.
+    """
+
+    def __init__(self, short_period=9, long_period=21, rsi_period=14, atr_period=14, norm_window=50,
+                 indicators=None):
+        self.short_period = short_period
+        self.long_period = long_period
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.norm_window = norm_window
+        self.names = list(FEATURE_NAMES)
+
+        self.indicators = indicators if indicators is not None else IndicatorStream()
+        # (name, params) of every indicator, in the argument order of `_row`
+        self._specs = [
+            ('return', {}),
+            ('sma', {'window': norm_window}),
+            ('std', {'window': norm_window}),
+            ('sma', {'window': short_period}),
+            ('sma', {'window': long_period}),
+            ('ema', {'span': short_period}),
+            ('rsi', {'period': rsi_period}),
+            ('atr', {'period': atr_period}),
+            ('std', {'window': norm_window, 'source': 'return'}),
+        ]
+        self._nodes = [self.indicators.node(name, **params) for name, params in self._specs]
+
+    @property
+    def min_bars(self):
+        """Number of bars before every feature is defined."""
+        return max(self.long_period, self.norm_window + 1, self.rsi_period + 1, self.atr_period)
+
+    def params(self):
+        """Everything that changes the features, e.g. for model store keys."""
+        return {
+            'features': tuple(self.names),
+            'short_period': self.short_period,
+            'long_period': self.long_period,
+            'rsi_period': self.rsi_period,
+            'atr_period': self.atr_period,
+            'norm_window': self.norm_window,
+        }
+
+    def reset(self):
+        """Clears the streaming state (of the whole stream if shared)."""
+        self.indicators.reset()
+
+    # --- Streaming ----------------------------------------------------------
+
+    def on_bar(self, bar):
+        """
+        Feeds a new bar and returns its feature row.
+
+        Args:
+            bar: A mapping with 'close' and optionally 'high'/'low' fields.
+
+        Returns:
+            np.ndarray: float32 row, NaN where a feature is still warming up.
+        """
+        self.indicators.on_bar(bar)
+        return self._stream_row(bar)
+
+    def update(self, bar):
+        """Revises the most recent bar (the still-forming candle) and returns its row."""
+        self.indicators.update(bar)
+        return self._stream_row(bar)
+
+    def _stream_row(self, bar):
+        close = _field(bar, 'close', math.nan)
+        return self._row(close, _field(bar, 'high', close), _field(bar, 'low', close),
+                         *(node.value for node in self._nodes))
+
+    @staticmethod
+    def _row(close, high, low, ret, mean, std, short_ma, long_ma, ewm, rsi, atr, volatility):
+        zscore = (close - mean) / std if std != 0.0 else 0.0
+        return np.array([
+            ret,
+            zscore,
+            close / short_ma - 1,
+            close / long_ma - 1,
+            short_ma / long_ma - 1,
+            close / ewm - 1,
+            rsi / 100.0,
+            atr / close,
+            (high - low) / close,
+            volatility,
+        ], dtype=np.float32)
+
+    # --- Batch ----------------------------------------------------------------
+
+    def transform(self, data):
+        """
+        Computes the feature rows of a whole history at once.
+
+        Args:
+            data (pd.DataFrame or np.ndarray): Bars with a 'close' column and
+                optionally 'high'/'low'.
+
+        Returns:
+            np.ndarray: float32 matrix with one row per bar and one column per
+            name in `names`.
+        """
+        close = np.asarray(data['close'], dtype=np.float64)
+        high = _column(data, 'high', close)
+        low = _column(data, 'low', close)
+        batch = indicator_graph.batch(data)
+        ret, mean, std, short_ma, long_ma, ewm, rsi, atr, volatility = \
+            (batch.get(name, **params) for name, params in self._specs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = np.where(std == 0.0, 0.0, (close - mean) / std)
+
+        return np.column_stack([
+            ret,
+            zscore,
+            close / short_ma - 1,
+            close / long_ma - 1,
+            short_ma / long_ma - 1,
+            close / ewm - 1,
+            rsi / 100.0,
+            atr / close,
+            (high - low) / close,
+            volatility,
+        ]).astype(np.float32)
@@ -0,0 +1,467 @@
+"""
+Bulk import of vendor history files into a compressed columnar dataset.
+
+    python -m utils.history_importer EURUSD_M1_2015_2024.csv --symbol EURUSD --timeframe M1
+    python -m utils.history_importer EURUSD_ticks.csv --symbol EURUSD --timeframe ticks
+
+CSV files of any size are read in fixed-size chunks, so the import needs the
+memory of one chunk and one partition however large the file is.
+"""
+import argparse
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from config.settings import HISTORY
+from utils.data_store import RATES_DTYPE, TICKS_DTYPE, timeframe_name, timeframe_seconds
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Column names vendors use for each field, compared lowercased without '<>', spaces or '_'
+COLUMN_ALIASES = {
+    'time': ('time', 'datetime', 'timestamp', 'gmttime', 'localtime', 'date'),
+    'open': ('open',),
+    'high': ('high',),
+    'low': ('low',),
+    'close': ('close',),
+    'tick_volume': ('tickvol', 'tickvolume', 'volume'),
+    'spread': ('spread',),
+    'real_volume': ('vol', 'realvolume'),
+    'bid': ('bid',),
+    'ask': ('ask',),
+}
+REQUIRED_FIELDS = {
+    'bars': ('time', 'open', 'high', 'low', 'close'),
+    'ticks': ('time', 'bid', 'ask'),
+}
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'bid', 'ask')
+
+
+def _kind(timeframe):
+    return 'ticks' if timeframe_name(timeframe) == 'ticks' else 'bars'
+
+
+def _to_seconds(value):
+    """Epoch seconds of a bound given as epoch seconds or anything `pd.Timestamp` parses."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(pd.Timestamp(value).to_datetime64().astype('datetime64[s]').astype(np.int64))
+
+
+def _price_digits(values, max_digits=8):
+    """Smallest number of decimals that represents every value exactly, or None."""
+    for digits in range(max_digits + 1):
+        if np.abs(np.round(values, digits) - values).max(initial=0.0) < 1e-9:
+            return digits
+    return None
+
+
+def _downcast(values, base=0):
+    """
+    Narrows a column for storage when nothing is lost.
+
+    Integers (times are stored relative to `base`) become int32 when they fit.
+    Prices become float32 when rounding them back to their decimals restores
+    them exactly.
+
+    Returns:
+        tuple: The stored array and the price decimals (None for integers
+        and for prices kept in float64).
+    """
+    if values.dtype.kind in 'iu':
+        values = values.astype(np.int64) - base
+        fits = len(values) == 0 or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+        return values.astype(np.int32 if fits else np.int64), None
+    digits = _price_digits(values)
+    if digits is not None:
+        narrow = values.astype(np.float32)
+        if np.array_equal(np.round(narrow.astype(np.float64), digits), np.round(values, digits)):
+            return narrow, digits
+    return values, None
+
+
+class HistoryDataset:
+    """
+    Compressed, time-partitioned columnar store of one symbol's bars or ticks.
+
+    Each partition (a calendar month of bars or a day of ticks by default)
+    is a compressed ``.npz`` file holding one array per column, sorted by
+    time and free of duplicates. ``index.json`` lists the partitions with
+    their first and last times, so `range` only decompresses the partitions
+    a query overlaps. Columns are downcast when that is lossless; `range`
+    restores the `RATES_DTYPE` / `TICKS_DTYPE` records the stores and the
+    backtester use.
+
+    Args:
+        root (str): Directory of the datasets.
+        symbol (str): The trading symbol.
+        timeframe (str or int): Bar timeframe, or 'ticks'.
+    """
+
+    def __init__(self, root, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe_name(timeframe)
+        self.kind = _kind(timeframe)
+        self.dtype = TICKS_DTYPE if self.kind == 'ticks' else RATES_DTYPE
+        self.time_field = self.dtype.names[0]
+        # Times are stored in the dataset's own unit: milliseconds for ticks, seconds for bars
+        self.time_scale = 1000 if self.kind == 'ticks' else 1
+        self.path = os.path.join(root, f'{symbol}_{self.timeframe}')
+        self.index = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.path, 'index.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'symbol': self.symbol, 'timeframe': self.timeframe, 'partitions': {}}
+
+    def _write_index(self):
+        path = os.path.join(self.path, 'index.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    @property
+    def partitions(self):
+        """Partition key -> entry (file, first, last, rows, digits), in time order."""
+        return dict(sorted(self.index['partitions'].items()))
+
+    def __len__(self):
+        return sum(entry['rows'] for entry in self.index['partitions'].values())
+
+    @property
+    def period(self):
+        """Partition length: 'M' (calendar months) or 'D' (days)."""
+        return self.index.get('period') or ('D' if self.kind == 'ticks' else 'M')
+
+    def set_period(self, period):
+        if period is None or period == self.period:
+            return
+        if self.index['partitions']:
+            raise ValueError(f'{self.path} is partitioned by {self.period!r}, not {period!r}')
+        self.index['period'] = period
+
+    def partition_codes(self, times):
+        """Number of the partition (months or days since 1970) of each time, in the dataset's unit."""
+        seconds = np.asarray(times, dtype=np.int64) // self.time_scale
+        return seconds.astype('datetime64[s]').astype(f'datetime64[{self.period}]').astype(np.int64)
+
+    def partition_key(self, code):
+        """Name of a partition, e.g. '2024-01' or '2024-01-02'."""
+        return str(np.datetime64(int(code), self.period))
+
+    def read_partition(self, key, fields=None):
+        """Decompresses a partition (or some of its columns) into records."""
+        entry = self.index['partitions'][key]
+        fields = fields or self.dtype.names
+        records = np.zeros(entry['rows'], dtype=self.dtype)
+        with np.load(os.path.join(self.path, entry['file'])) as columns:
+            for name in fields:
+                if name not in columns.files:
+                    continue
+                values = columns[name]
+                if name == self.time_field:
+                    records[name] = values.astype(np.int64) + entry['base']
+                elif name in entry['digits']:
+                    records[name] = np.round(values.astype(np.float64), entry['digits'][name])
+                else:
+                    records[name] = values
+        return records
+
+    def write_partition(self, key, records):
+        """Stores the records of a partition, replacing it, and updates the index."""
+        os.makedirs(self.path, exist_ok=True)
+        times = records[self.time_field]
+        base = int(times[0])
+        columns, digits = {}, {}
+        for name in self.dtype.names:
+            stored, decimals = _downcast(records[name], base if name == self.time_field else 0)
+            columns[name] = stored
+            if decimals is not None:
+                digits[name] = decimals
+        file_name = f'part-{key}.npz'
+        tmp_path = os.path.join(self.path, f'part-{key}.npz.tmp')
+        # An .npz archive like np.savez_compressed writes, at a faster compression level
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=HISTORY['compression_level']) as archive:
+            for name, values in columns.items():
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as f:
+                    np.lib.format.write_array(f, values, allow_pickle=False)
+        os.replace(tmp_path, os.path.join(self.path, file_name))
+        self.index['period'] = self.period
+        self.index['partitions'][key] = {
+            'file': file_name, 'rows': len(records), 'base': base,
+            'first': int(times[0]), 'last': int(times[-1]), 'digits': digits,
+        }
+        self._write_index()
+
+    def range(self, start=None, end=None):
+        """
+        Records with ``start <= time < end``.
+
+        Args:
+            start: Inclusive lower bound: epoch seconds, a date string or a
+                Timestamp. None for the beginning of the data.
+            end: Exclusive upper bound, likewise. None for the end.
+
+        Returns:
+            np.ndarray: `RATES_DTYPE` bars or `TICKS_DTYPE` ticks, in time order.
+        """
+        parts = list(self.iter_range(start, end))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=self.dtype)
+
+    def iter_range(self, start=None, end=None):
+        """
+        Like `range`, but yields the records one partition at a time, so only
+        one partition is in memory at once (e.g. for a tick backtest over years).
+        """
+        start, end = _to_seconds(start), _to_seconds(end)
+        lo = None if start is None else start * self.time_scale
+        hi = None if end is None else end * self.time_scale
+        for key, entry in self.partitions.items():
+            if (lo is not None and entry['last'] < lo) or (hi is not None and entry['first'] >= hi):
+                continue
+            records = self.read_partition(key)
+            times = records[self.time_field]
+            first = 0 if lo is None else np.searchsorted(times, lo, side='left')
+            last = len(records) if hi is None else np.searchsorted(times, hi, side='left')
+            if last > first:
+                yield records[first:last]
+
+    def gaps(self, min_gap, skip_weekends=True):
+        """
+        Finds the holes in the data, reading one partition's times at a time.
+
+        Args:
+            min_gap (float): Shortest reported gap, in seconds.
+            skip_weekends (bool): Ignore gaps of at most three days that span
+                a whole Saturday (UTC), the usual forex weekend close.
+
+        Returns:
+            list: (start, end) epoch seconds of each gap: the last time
+            before it and the first time after it.
+        """
+        gaps = []
+        previous = None
+        for key in self.partitions:
+            times = self.read_partition(key, fields=(self.time_field,))[self.time_field] // self.time_scale
+            if previous is not None:
+                times = np.concatenate([[previous], times])
+            if len(times) == 0:
+                continue
+            previous = times[-1]
+            found = np.flatnonzero(np.diff(times) >= min_gap)
+            starts, ends = times[found], times[found + 1]
+            if skip_weekends and len(found):
+                first_day = -(-starts // 86400)
+                # 1970-01-01 was a Thursday, so day d is a Saturday when (d + 3) % 7 == 5
+                saturday = first_day + (5 - (first_day + 3) % 7) % 7
+                weekend = ((saturday + 1) * 86400 <= ends) & (ends - starts <= 3 * 86400)
+                starts, ends = starts[~weekend], ends[~weekend]
+            gaps.extend(zip(starts.tolist(), ends.tolist()))
+        return gaps
+
+
+def _normalize(name):
+    return str(name).strip().strip('<>').lower().replace(' ', '').replace('_', '')
+
+
+def _resolve_columns(header, kind, columns=None):
+    """Maps each dataset field to the CSV column holding it; 'date' is paired with 'time'."""
+    fields = REQUIRED_FIELDS[kind] + (('tick_volume', 'spread', 'real_volume') if kind == 'bars' else ())
+    normalized = {_normalize(column): column for column in header}
+    resolved = dict(columns or {})
+    for field in fields:
+        if field in resolved:
+            continue
+        for alias in COLUMN_ALIASES[field]:
+            if alias in normalized and normalized[alias] not in resolved.values():
+                resolved[field] = normalized[alias]
+                break
+    # MT5 exports split the timestamp into <DATE> and <TIME>
+    if 'date' not in resolved and 'date' in normalized and _normalize(resolved.get('time')) == 'time':
+        resolved['date'] = normalized['date']
+    missing = [field for field in REQUIRED_FIELDS[kind] if field not in resolved]
+    if missing:
+        raise ValueError(f'No column for {missing} among {list(header)}; pass them in `columns`')
+    return resolved
+
+
+def _sniff_separator(path):
+    """The most frequent of ',', ';', tab and '|' in the first line of a file."""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        line = f.readline()
+    return max(',;\t|', key=line.count)
+
+
+def _parse_times(chunk, columns, time_format):
+    values = chunk[columns['time']]
+    if 'date' in columns:
+        values = chunk[columns['date']].astype(str) + ' ' + values.astype(str)
+    elif pd.api.types.is_numeric_dtype(values):
+        # Epoch numbers: milliseconds when they are too large to be seconds
+        values = pd.to_numeric(values, errors='coerce')
+        return pd.to_datetime(values, unit='ms' if values.max() >= 1e11 else 's', errors='coerce')
+    return pd.to_datetime(values, format=time_format, errors='coerce')
+
+
+def _parse_chunk(chunk, dataset, columns, time_format, time_offset, last_quote):
+    """
+    Converts a CSV chunk into dataset records.
+
+    Tick exports leave the bid or the ask blank when only the other side
+    changed; blanks take the side's previous value, carried across chunks in
+    `last_quote`.
+
+    Returns:
+        tuple: The records, and the number of rows dropped because their
+        time or a price could not be parsed.
+    """
+    times = _parse_times(chunk, columns, time_format)
+    unit = 'ms' if dataset.time_scale == 1000 else 's'
+    records = np.zeros(len(chunk), dtype=dataset.dtype)
+    valid = times.notna().to_numpy().copy()
+    records[dataset.time_field] = np.where(valid, times.to_numpy().astype(f'datetime64[{unit}]').astype(np.int64), 0)
+    records[dataset.time_field] += int(time_offset * dataset.time_scale)
+    for field in dataset.dtype.names[1:]:
+        if field not in columns:
+            continue
+        values = pd.to_numeric(chunk[columns[field]], errors='coerce')
+        if dataset.kind == 'ticks':
+            values = values.ffill()
+            if field in last_quote:
+                values = values.fillna(last_quote[field])
+            if values.notna().any():
+                last_quote[field] = values[values.notna()].iloc[-1]
+        if field in PRICE_FIELDS:
+            valid &= values.notna().to_numpy()
+        records[field] = values.fillna(0).to_numpy()
+    if dataset.kind == 'bars' and 'close' in columns:
+        valid &= records['close'] > 0
+    return records[valid], int((~valid).sum())
+
+
+def _store(dataset, key, parts):
+    """Merges new records into a partition: sorted by time, first copy of each time kept."""
+    records = np.concatenate(parts)
+    if key in dataset.index['partitions']:
+        records = np.concatenate([dataset.read_partition(key), records])
+    order = np.argsort(records[dataset.time_field], kind='stable')
+    records = records[order]
+    times = records[dataset.time_field]
+    unique = np.r_[True, times[1:] != times[:-1]]
+    dataset.write_partition(key, records[unique])
+    return int(len(unique) - unique.sum())
+
+
+def import_csv(path, symbol, timeframe, root=None, chunk_rows=None, columns=None, time_format=None,
+               time_offset=0, period=None, min_gap=None, **csv_options):
+    """
+    Imports a vendor CSV of bars or ticks into a `HistoryDataset`.
+
+    The file is parsed `chunk_rows` rows at a time. Rows are grouped into
+    partitions; once the input has moved past a partition it is sorted,
+    de-duplicated (keeping the first copy, including against data imported
+    earlier) and written. Out-of-order rows of a partition already written
+    are merged into it, so unsorted files work too, only slower.
+
+    Args:
+        path (str): The CSV file.
+        symbol (str): The trading symbol.
+        timeframe (str): Bar timeframe ('M1', ...) or 'ticks'.
+        root (str): Dataset directory, settings.HISTORY['root'] by default.
+        chunk_rows (int): Rows parsed at once.
+        columns (dict): Field -> CSV column for columns the vendor names
+            differently; e.g. ``{'time': 'Gmt time'}``. A 'date' entry is
+            joined with 'time' before parsing.
+        time_format (str): strptime format of the time column, inferred when
+            None. Numeric times are read as epoch seconds or milliseconds.
+        time_offset (float): Seconds added to every time, e.g. to convert a
+            vendor's time zone to the broker's.
+        period (str): Partition length: 'M' (month) or 'D' (day); months for
+            bars and days for ticks by default.
+        min_gap (float): Shortest gap reported, in seconds.
+        **csv_options: Passed to `pd.read_csv` (sep, header, names, ...).
+
+    Returns:
+        dict: rows_read, rows_dropped (unparseable), duplicates,
+        partitions (written), rows_stored (the dataset's size afterwards)
+        and gaps ((start, end) epoch seconds).
+    """
+    root = root or HISTORY['root']
+    chunk_rows = chunk_rows or HISTORY['chunk_rows']
+    min_gap = HISTORY['min_gap'] if min_gap is None else min_gap
+    dataset = HistoryDataset(root, symbol, timeframe)
+    dataset.set_period(period)
+    if csv_options.get('sep') is None:
+        csv_options['sep'] = _sniff_separator(path)
+
+    report = {'rows_read': 0, 'rows_dropped': 0, 'duplicates': 0, 'partitions': 0}
+    pending = {}  # partition code -> record arrays not written yet
+    written = set()
+    resolved = None
+    last_quote = {}
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, **csv_options):
+        if resolved is None:
+            resolved = _resolve_columns(chunk.columns, dataset.kind, columns)
+        records, dropped = _parse_chunk(chunk, dataset, resolved, time_format, time_offset, last_quote)
+        report['rows_read'] += len(chunk)
+        report['rows_dropped'] += dropped
+        if len(records) == 0:
+            continue
+        codes = dataset.partition_codes(records[dataset.time_field])
+        unique, inverse = np.unique(codes, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+        for i, code in enumerate(unique):
+            pending.setdefault(int(code), []).append(records[order[bounds[i]:bounds[i + 1]]])
+        # Write every partition this chunk did not touch, so memory stays
+        # bounded in either time order; rows arriving later are merged in
+        touched = set(unique.tolist())
+        for code in sorted(pending):
+            if code not in touched:
+                written.add(code)
+                report['duplicates'] += _store(dataset, dataset.partition_key(code), pending.pop(code))
+    for code in sorted(pending):
+        written.add(code)
+        report['duplicates'] += _store(dataset, dataset.partition_key(code), pending.pop(code))
+
+    report['partitions'] = len(written)
+    report['rows_stored'] = len(dataset)
+    report['gaps'] = dataset.gaps(min_gap)
+    logger.info(f"Imported {path} into {dataset.path}: {report['rows_read']} rows read, "
+                f"{report['rows_dropped']} dropped, {report['duplicates']} duplicates, "
+                f"{report['partitions']} partitions written, {report['rows_stored']} rows stored")
+    if report['gaps']:
+        longest = sorted(report['gaps'], key=lambda gap: gap[0] - gap[1])[:5]
+        logger.warning(f"{len(report['gaps'])} gaps of {min_gap:.0f}s or more; longest: " + ', '.join(
+            f"{pd.Timestamp(start, unit='s')} -> {pd.Timestamp(end, unit='s')}" for start, end in longest))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import vendor bar or tick CSVs into data/processed_data.')
+    parser.add_argument('paths', nargs='+', help='CSV files, imported in order')
+    parser.add_argument('--symbol', required=True)
+    parser.add_argument('--timeframe', required=True, help="bar timeframe (e.g. M1) or 'ticks'")
+    parser.add_argument('--root', default=HISTORY['root'])
+    parser.add_argument('--chunk-rows', type=int, default=HISTORY['chunk_rows'])
+    parser.add_argument('--time-format', help="strptime format of the time column, e.g. '%%Y.%%m.%%d %%H:%%M'")
+    parser.add_argument('--time-offset', type=float, default=0, help='seconds added to every time')
+    parser.add_argument('--sep', help='column separator, sniffed by default')
+    args = parser.parse_args(argv)
+    if args.timeframe != 'ticks':
+        timeframe_seconds(args.timeframe)  # rejects unknown timeframes before reading anything
+    for path in args.paths:
+        import_csv(path, args.symbol, args.timeframe, root=args.root, chunk_rows=args.chunk_rows,
+                   time_format=args.time_format, time_offset=args.time_offset, sep=args.sep)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
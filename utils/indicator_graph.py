@@ -0,0 +1,406 @@
+import math
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import timeframe_name
+from utils.indicators import RollingMean, RollingStats, EWM, RSI, ATR
+
+# Bar fields indicators can read; 'high' and 'low' default to the close
+FIELDS = ('open', 'high', 'low', 'close', 'tick_volume')
+
+
+def _key(name, params):
+    return name, tuple(sorted(params.items()))
+
+
+def _field_names(data):
+    names = getattr(getattr(data, 'dtype', None), 'names', None)
+    if names:
+        return names
+    if hasattr(data, 'columns'):
+        return tuple(data.columns)
+    return tuple(data.keys()) if hasattr(data, 'keys') else ()
+
+
+def _bar_time(bar, names):
+    if 'time' not in names:
+        return None
+    value = bar['time']
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return int(pd.Timestamp(value).value)
+    return int(value)
+
+
+# --- Indicator definitions ---------------------------------------------------
+#
+# Each indicator has a vectorized `batch(*inputs, **params)` over whole
+# arrays, a `stream(**params)` factory of an online estimator with
+# `push(*inputs)` / `replace_last(*inputs)`, and `inputs(**params)`: the keys
+# of the bar fields or other indicators it reads. The streaming estimators
+# reproduce the batch values (bit for bit for the SMA).
+
+
+class _Stateless:
+    """Streaming form of an indicator that only combines its inputs."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def push(self, *values):
+        return self.fn(*values)
+
+    replace_last = push
+
+    def reset(self):
+        pass
+
+
+class _Return:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._close = math.nan
+        self._previous = math.nan
+
+    def push(self, close):
+        self._previous, self._close = self._close, close
+        return close / self._previous - 1
+
+    def replace_last(self, close):
+        self._close = close
+        return close / self._previous - 1
+
+
+class _RollingStd:
+    """`RollingStats` standard deviation; NaN inputs (warm-up) are skipped."""
+
+    def __init__(self, window):
+        self._stats = RollingStats(window)
+
+    def reset(self):
+        self._stats.reset()
+
+    def push(self, value):
+        return self._stats.push(value)[1] if value == value else math.nan
+
+    def replace_last(self, value):
+        return self._stats.replace_last(value)[1] if value == value else math.nan
+
+
+class _Estimator:
+    """Adapts an estimator of `utils.indicators` whose push returns the value."""
+
+    def __init__(self, estimator):
+        self._estimator = estimator
+        self.push = estimator.push
+        self.replace_last = estimator.replace_last
+        self.reset = estimator.reset
+
+
+def _rsi_batch(close, period=14):
+    change = pd.Series(close).diff().iloc[1:]
+    wilder = {'alpha': 1.0 / period, 'adjust': False, 'min_periods': period}
+    gain = np.concatenate([[np.nan], change.clip(lower=0.0).ewm(**wilder).mean().to_numpy()])
+    loss = np.concatenate([[np.nan], (-change).clip(lower=0.0).ewm(**wilder).mean().to_numpy()])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(loss == 0.0, np.where(gain > 0.0, 100.0, 50.0), 100.0 - 100.0 / (1.0 + gain / loss))
+    rsi[np.isnan(gain)] = np.nan
+    return rsi
+
+
+def _atr_batch(high, low, close, period=14):
+    previous = np.r_[np.nan, close[:-1]]
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+    if len(true_range):
+        true_range[0] = high[0] - low[0]
+    return pd.Series(true_range).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean().to_numpy()
+
+
+def _return_batch(close):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return close / np.r_[np.nan, close[:-1]] - 1
+
+
+def _band(middle, std, k, band):
+    return middle + {'upper': k, 'middle': 0.0, 'lower': -k}[band] * std
+
+
+class _Indicator:
+    def __init__(self, batch, stream, inputs):
+        self.batch = batch
+        self.stream = stream
+        self.inputs = inputs
+
+
+INDICATORS = {
+    'return': _Indicator(
+        _return_batch, _Return, lambda: [('close', ())]),
+    'sma': _Indicator(
+        lambda x, window, source='close': pd.Series(x).rolling(window=window).mean().to_numpy(),
+        lambda window, source='close': _Estimator(RollingMean(window)),
+        lambda window, source='close': [(source, ())]),
+    'std': _Indicator(
+        lambda x, window, source='close': pd.Series(x).rolling(window=window).std().to_numpy(),
+        lambda window, source='close': _RollingStd(window),
+        lambda window, source='close': [(source, ())]),
+    'ema': _Indicator(
+        lambda x, span, source='close', min_periods=1:
+            pd.Series(x).ewm(alpha=2.0 / (span + 1), adjust=False, min_periods=min_periods).mean().to_numpy(),
+        lambda span, source='close', min_periods=1: _Estimator(EWM(2.0 / (span + 1), min_periods)),
+        lambda span, source='close', min_periods=1: [(source, ())]),
+    'rsi': _Indicator(
+        _rsi_batch,
+        lambda period=14: _Estimator(RSI(period)),
+        lambda period=14: [('close', ())]),
+    'atr': _Indicator(
+        _atr_batch,
+        lambda period=14: _Estimator(ATR(period)),
+        lambda period=14: [('high', ()), ('low', ()), ('close', ())]),
+    'bollinger': _Indicator(
+        lambda middle, std, window=20, k=2.0, band='upper': _band(middle, std, k, band),
+        lambda window=20, k=2.0, band='upper': _Stateless(lambda middle, std: _band(middle, std, k, band)),
+        lambda window=20, k=2.0, band='upper': [_key('sma', {'window': window}), _key('std', {'window': window})]),
+    'macd': _Indicator(
+        lambda fast, slow, fast_span=12, slow_span=26: fast - slow,
+        lambda fast_span=12, slow_span=26: _Stateless(lambda fast, slow: fast - slow),
+        lambda fast_span=12, slow_span=26: [_key('ema', {'span': fast_span}), _key('ema', {'span': slow_span})]),
+}
+
+
+def register_indicator(name, batch, stream, inputs):
+    """
+    Adds an indicator to every graph.
+
+    Args:
+        batch (callable): ``batch(*input_arrays, **params)`` -> np.ndarray.
+        stream (callable): ``stream(**params)`` -> an estimator with
+            ``push(*input_values)``, ``replace_last(*input_values)`` and
+            ``reset()``.
+        inputs (callable): ``inputs(**params)`` -> list of (name, params)
+            keys of the bar fields or indicators it reads; fields are
+            ``(field, ())``.
+    """
+    INDICATORS[name] = _Indicator(batch, stream, inputs)
+
+
+# --- Streaming -----------------------------------------------------------------
+
+
+class _Node:
+    __slots__ = ('key', 'inputs', 'estimator', 'value', 'previous')
+
+    def __init__(self, key, inputs, estimator):
+        self.key = key
+        self.inputs = inputs  # field names or _Nodes
+        self.estimator = estimator
+        self.value = math.nan  # at the newest bar
+        self.previous = math.nan  # at the bar before it
+
+
+class IndicatorStream:
+    """
+    Streaming indicator nodes of one (symbol, timeframe).
+
+    Every node is updated once per bar, however many strategies read it:
+    strategies sharing a stream all feed it their bars, and a bar whose open
+    time was already fed is not pushed again (a forming bar whose prices
+    moved is revised instead). Bars without a 'time' field are always new,
+    which suits a stream owned by a single strategy.
+
+    Nodes added after bars were fed are warmed up from the last `history`
+    bars.
+
+    Args:
+        history (int): Bars kept to warm up nodes added later.
+    """
+
+    def __init__(self, history=1000):
+        self._nodes = OrderedDict()  # key -> _Node, dependencies first
+        self._fields = set()
+        self._bars = deque(maxlen=history)  # field dicts of the newest bars
+        self.last_time = None
+
+    def node(self, name, **params):
+        """
+        Returns the node of an indicator, creating it (and its inputs) once.
+
+        The node's `value` is the indicator at the newest bar and `previous`
+        the value at the bar before.
+        """
+        if name in FIELDS:
+            return name
+        key = _key(name, params)
+        node = self._nodes.get(key)
+        if node is not None:
+            return node
+        indicator = INDICATORS[name]
+        inputs = [self.node(input_name, **dict(input_params)) for input_name, input_params in indicator.inputs(**params)]
+        node = self._nodes[key] = _Node(key, inputs, indicator.stream(**params))
+        self._fields.update(i for i in inputs if isinstance(i, str))
+        if self._bars:
+            self._replay()
+        return node
+
+    def _values(self, node, bar):
+        return [bar[i] if isinstance(i, str) else i.value for i in node.inputs]
+
+    def _fields_of(self, bar, names):
+        close = float(bar['close'])
+        fields = {'close': close}
+        for name in self._fields:
+            if name != 'close':
+                fields[name] = float(bar[name]) if name in names else (close if name in ('high', 'low') else math.nan)
+        return fields
+
+    def _push(self, fields):
+        for node in self._nodes.values():
+            node.previous = node.value
+            node.value = node.estimator.push(*self._values(node, fields))
+        self._bars.append(fields)
+
+    def _revise(self, fields):
+        if self._bars and fields == self._bars[-1]:
+            return  # already computed for these prices
+        for node in self._nodes.values():
+            node.value = node.estimator.replace_last(*self._values(node, fields))
+        if self._bars:
+            self._bars[-1] = fields
+        else:
+            self._bars.append(fields)
+
+    def _replay(self):
+        bars = list(self._bars)
+        for node in self._nodes.values():
+            node.estimator.reset()
+            node.value = node.previous = math.nan
+        self._bars.clear()
+        for fields in bars:
+            self._push(fields)
+
+    def on_bar(self, bar):
+        """Feeds a new bar; a bar already fed (same open time) is revised instead."""
+        names = _field_names(bar)
+        time = _bar_time(bar, names)
+        if time is not None and self.last_time is not None and time <= self.last_time:
+            if time == self.last_time:
+                self._revise(self._fields_of(bar, names))
+            return
+        self._push(self._fields_of(bar, names))
+        self.last_time = time
+
+    def update(self, bar):
+        """Revises the newest bar (the still-forming candle), or feeds a newer one."""
+        names = _field_names(bar)
+        time = _bar_time(bar, names)
+        if time is not None and self.last_time is not None and time != self.last_time:
+            if time > self.last_time:
+                self._push(self._fields_of(bar, names))
+                self.last_time = time
+            return
+        self._revise(self._fields_of(bar, names))
+
+    def reset(self):
+        """Clears the state of every node, e.g. after missed candles."""
+        for node in self._nodes.values():
+            node.estimator.reset()
+            node.value = node.previous = math.nan
+        self._bars.clear()
+        self.last_time = None
+
+
+# --- Batch ---------------------------------------------------------------------
+
+
+class IndicatorBatch:
+    """Vectorized indicator values of one dataset, each computed once."""
+
+    def __init__(self, data):
+        self._data = data
+        self._names = _field_names(data)
+        self._values = {}
+
+    def get(self, name, **params):
+        """Returns the indicator (or bar field) over every bar as a float64 array."""
+        return self._get(_key(name, params))
+
+    def _get(self, key):
+        values = self._values.get(key)
+        if values is not None:
+            return values
+        name, params = key
+        if name in FIELDS:
+            column = 'close' if name in ('high', 'low') and name not in self._names else name
+            values = np.asarray(self._data[column], dtype=np.float64)
+        else:
+            indicator = INDICATORS[name]
+            params = dict(params)
+            inputs = [self._get(_key(input_name, dict(input_params)))
+                      for input_name, input_params in indicator.inputs(**params)]
+            values = indicator.batch(*inputs, **params)
+        self._values[key] = values
+        return values
+
+
+def _signature(data):
+    """Length, first and last close: a cheap check that a dataset was not changed."""
+    close = np.asarray(data['close'])
+    if len(close) == 0:
+        return 0, None, None
+    return len(close), float(close[0]), float(close[-1])
+
+
+class IndicatorGraph:
+    """
+    Indicators shared by every strategy of the process.
+
+    Streaming nodes are keyed by (symbol, timeframe, indicator, params): all
+    strategies trading a symbol and timeframe get the same `IndicatorStream`,
+    so an SMA used by several of them is updated once per bar. Batch values
+    are kept per dataset object, so strategy variants backtested on the same
+    bars, like an optimizer sweep, compute each indicator once.
+
+    Args:
+        history (int): Bars each stream keeps to warm up late nodes.
+        max_datasets (int): Datasets whose batch values are kept.
+    """
+
+    def __init__(self, history=1000, max_datasets=2):
+        self.history = history
+        self.max_datasets = max_datasets
+        self._streams = {}
+        self._batches = OrderedDict()  # id of the dataset -> IndicatorBatch, most recent last
+
+    def stream(self, symbol, timeframe):
+        key = (symbol, timeframe_name(timeframe))
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = IndicatorStream(self.history)
+        return stream
+
+    def batch(self, data):
+        """
+        Returns the batch values of a dataset, reusing those of earlier calls
+        on the same object. Cached datasets must not be modified in place.
+        """
+        signature = _signature(data)
+        key = id(data)
+        batch = self._batches.pop(key, None)
+        if batch is None or batch._data is not data or batch.signature != signature:
+            batch = IndicatorBatch(data)
+            batch.signature = signature
+        self._batches[key] = batch
+        while len(self._batches) > self.max_datasets:
+            self._batches.popitem(last=False)
+        return batch
+
+    def clear(self):
+        """Drops every stream and cached batch value."""
+        self._streams.clear()
+        self._batches.clear()
+
+
+# Graph shared by the strategies of this process
+indicator_graph = IndicatorGraph()
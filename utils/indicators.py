@@ -0,0 +1,297 @@
+import math
+
+
+class RollingMean:
+    """
+    Simple moving average over a fixed-size ring buffer.
+
+    Each new value costs O(1): the value leaving the window is subtracted from
+    a running sum and the new one is added. The sums use the same compensated
+    (Kahan) add/remove scheme as pandas' rolling mean, so pushing a series value
+    by value gives bit-identical results to ``Series.rolling(window).mean()``.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Clears the buffer and all running sums."""
+        self._buffer = [math.nan] * self.window
+        self._head = 0  # slot the next value is written to
+        self._count = 0  # values pushed so far
+        self._nobs = 0  # non-NaN values inside the window
+        self._sum = 0.0
+        self._add_compensation = 0.0
+        self._remove_compensation = 0.0
+        self._neg_ct = 0
+        self._same_ct = 0
+        self._prev_value = math.nan
+        self._undo = (0, math.nan)
+        self.value = math.nan
+
+    def push(self, value):
+        """
+        Appends a value, dropping the oldest one once the window is full.
+
+        Returns:
+            float: The mean of the window, or NaN during warm-up.
+        """
+        if self._count >= self.window:
+            self._remove(self._buffer[self._head])
+        self._undo = (self._same_ct, self._prev_value)
+        self._add(value)
+        self._buffer[self._head] = value
+        self._head = (self._head + 1) % self.window
+        self._count += 1
+        self.value = self._mean()
+        return self.value
+
+    def replace_last(self, value):
+        """
+        Replaces the most recently pushed value, e.g. when a forming candle
+        moves.
+
+        Returns:
+            float: The updated mean of the window.
+        """
+        if self._count == 0:
+            return self.push(value)
+        slot = (self._head - 1) % self.window
+        self._remove(self._buffer[slot])
+        self._same_ct, self._prev_value = self._undo
+        self._add(value)
+        self._buffer[slot] = value
+        self.value = self._mean()
+        return self.value
+
+    def _add(self, value):
+        if value == value:
+            self._nobs += 1
+            y = value - self._add_compensation
+            t = self._sum + y
+            self._add_compensation = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_ct += 1
+            if value == self._prev_value:
+                self._same_ct += 1
+            else:
+                self._same_ct = 1
+            self._prev_value = value
+
+    def _remove(self, value):
+        if value == value:
+            self._nobs -= 1
+            y = -value - self._remove_compensation
+            t = self._sum + y
+            self._remove_compensation = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_ct -= 1
+
+    def _mean(self):
+        if self._nobs < self.window:
+            return math.nan
+        result = self._sum / self._nobs
+        if self._same_ct >= self._nobs:
+            result = self._prev_value
+        elif self._neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self._neg_ct == self._nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class RollingStats:
+    """
+    Rolling mean and sample standard deviation over a fixed-size window.
+
+    Uses Welford's online update, extended with the matching removal step for
+    the value leaving the window, so each new value costs O(1) and stays
+    numerically stable where a running sum of squares would not.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._buffer = [math.nan] * self.window
+        self._head = 0
+        self._count = 0
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.mean = math.nan
+        self.std = math.nan
+
+    def push(self, value):
+        """
+        Appends a value, dropping the oldest one once the window is full.
+
+        Returns:
+            tuple: (mean, std) of the window, NaN during warm-up.
+        """
+        if self._count >= self.window:
+            self._remove(self._buffer[self._head])
+        self._add(value)
+        self._buffer[self._head] = value
+        self._head = (self._head + 1) % self.window
+        self._count += 1
+        return self._result()
+
+    def replace_last(self, value):
+        """Replaces the most recently pushed value."""
+        if self._count == 0:
+            return self.push(value)
+        slot = (self._head - 1) % self.window
+        self._remove(self._buffer[slot])
+        self._add(value)
+        self._buffer[slot] = value
+        return self._result()
+
+    def _add(self, value):
+        self._n += 1
+        delta = value - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value):
+        if self._n <= 1:
+            self._n, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        mean = (self._n * self._mean - value) / (self._n - 1)
+        self._m2 -= (value - self._mean) * (value - mean)
+        self._mean = mean
+        self._n -= 1
+
+    def _result(self):
+        if self._n < self.window:
+            self.mean = self.std = math.nan
+        else:
+            self.mean = self._mean
+            self.std = math.sqrt(max(self._m2, 0.0) / (self._n - 1)) if self._n > 1 else math.nan
+        return self.mean, self.std
+
+
+class EWM:
+    """
+    Exponentially weighted moving average, ``y = y + alpha * (x - y)``.
+
+    Matches ``Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods)``:
+    the average starts at the first value and is reported once
+    `min_periods` values have been seen.
+    """
+
+    def __init__(self, alpha, min_periods=1):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.reset()
+
+    def reset(self):
+        self._average = math.nan
+        self._previous = math.nan  # average before the last value, for replace_last
+        self._count = 0
+        self.value = math.nan
+
+    def push(self, value):
+        """Adds a value and returns the average, or NaN during warm-up."""
+        self._previous = self._average
+        self._count += 1
+        self._average = self._step(self._previous, value)
+        return self._result()
+
+    def replace_last(self, value):
+        """Replaces the most recently pushed value."""
+        if self._count == 0:
+            return self.push(value)
+        self._average = self._step(self._previous, value)
+        return self._result()
+
+    def _step(self, average, value):
+        if average != average:
+            return value
+        return average + self.alpha * (value - average)
+
+    def _result(self):
+        self.value = self._average if self._count >= self.min_periods else math.nan
+        return self.value
+
+
+class RSI:
+    """Relative Strength Index with Wilder's smoothing, in [0, 100]."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._gain = EWM(1.0 / period, min_periods=period)
+        self._loss = EWM(1.0 / period, min_periods=period)
+        self.reset()
+
+    def reset(self):
+        self._gain.reset()
+        self._loss.reset()
+        self._close = math.nan
+        self._previous_close = math.nan
+        self.value = math.nan
+
+    def push(self, close):
+        """Adds a close and returns the RSI, or NaN during warm-up."""
+        self._previous_close = self._close
+        self._close = close
+        if self._previous_close != self._previous_close:
+            return self.value
+        change = close - self._previous_close
+        return self._result(self._gain.push(max(change, 0.0)), self._loss.push(max(-change, 0.0)))
+
+    def replace_last(self, close):
+        """Replaces the most recently pushed close."""
+        self._close = close
+        if self._previous_close != self._previous_close:
+            return self.value
+        change = close - self._previous_close
+        return self._result(self._gain.replace_last(max(change, 0.0)),
+                            self._loss.replace_last(max(-change, 0.0)))
+
+    def _result(self, gain, loss):
+        if gain != gain:
+            self.value = math.nan
+        elif loss == 0.0:
+            self.value = 100.0 if gain > 0.0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        return self.value
+
+
+class ATR:
+    """Average True Range with Wilder's smoothing."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._average = EWM(1.0 / period, min_periods=period)
+        self.reset()
+
+    def reset(self):
+        self._average.reset()
+        self._close = math.nan
+        self._previous_close = math.nan
+        self.value = math.nan
+
+    def push(self, high, low, close):
+        """Adds a bar and returns the ATR, or NaN during warm-up."""
+        self._previous_close = self._close
+        self._close = close
+        self.value = self._average.push(self._true_range(high, low))
+        return self.value
+
+    def replace_last(self, high, low, close):
+        """Replaces the most recently pushed bar."""
+        self._close = close
+        self.value = self._average.replace_last(self._true_range(high, low))
+        return self.value
+
+    def _true_range(self, high, low):
+        previous_close = self._previous_close
+        if previous_close != previous_close:
+            return high - low
+        return max(high - low, abs(high - previous_close), abs(low - previous_close))
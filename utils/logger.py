@@ -1,5 +1,16 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 
 def setup_logger():
@@ -13,7 +24,7 @@ def setup_logger():
 
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format=LOG_FORMAT,
         handlers=[
             logging.FileHandler(log_file),
             logging.StreamHandler() # Also prints to the console
@@ -21,3 +32,279 @@ def setup_logger():
     )
 
     return logging.getLogger("trading_bot")
+
+
+class BackgroundWriter:
+    """
+    Writes items to a file (and optionally a stream) from a background thread.
+
+    `put` only enqueues, so the caller never formats or touches the disk. The
+    writer thread wakes every `flush_interval` seconds, drains everything
+    queued so far, formats it with `format`, and writes it with one write and
+    flush per `batch_size` items.
+
+    Args:
+        path (str): File appended to, or None.
+        format (callable): Turns a queued item into a line of text.
+        encode (callable): Alternative to `format` for binary files: turns a
+            whole batch of items into bytes.
+        stream: Extra text stream the batches are copied to (e.g. stderr).
+        batch_size (int): Maximum items per write.
+        flush_interval (float): Seconds between batches.
+    """
+
+    def __init__(self, path, format=str, encode=None, stream=None, batch_size=4096, flush_interval=0.2):
+        self.path = path
+        self.format = format
+        self.encode = encode
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._closing = threading.Event()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'ab') if encode else open(path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def _run(self):
+        # Sleep between batches instead of waking on every item, so a burst
+        # of records costs one write rather than one per record
+        while not self._closing.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            if len(batch) < self.batch_size:
+                return
+
+    def _write(self, batch):
+        if self.encode is not None:
+            if batch and self._file is not None:
+                self._file.write(self.encode(batch))
+                self._file.flush()
+            return
+        lines = []
+        for item in batch:
+            try:
+                lines.append(self.format(item))
+            except Exception:
+                lines.append(f'<unformattable log item {item!r}>')
+        if not lines:
+            return
+        text = '\n'.join(lines) + '\n'
+        if self._file is not None:
+            self._file.write(text)
+            self._file.flush()
+        if self.stream is not None:
+            self.stream.write(text)
+            self.stream.flush()
+
+    def close(self):
+        """Writes out everything queued and stops the thread."""
+        if self._thread.is_alive():
+            self._closing.set()
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class AsyncHandler(logging.Handler):
+    """Logging handler that hands records to a `BackgroundWriter`."""
+
+    def __init__(self, writer, level=logging.NOTSET):
+        super().__init__(level)
+        self.writer = writer
+
+    def emit(self, record):
+        self.writer.put(record)
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+# Event kinds and the fixed-size record they are stored as in binary event logs
+EVENT_KINDS = {'trade': 1, 'signal': 2, 'order': 3}
+EVENT_SIDES = {'BUY': 1, 'SELL': -1}
+EVENT_DTYPE = np.dtype([
+    ('logged_at', 'f8'),         # wall-clock time the event was recorded
+    ('kind', 'u1'),
+    ('side', 'i1'),              # 1 BUY, -1 SELL, 0 none
+    ('symbol', 'S16'),
+    ('time', 'datetime64[ns]'),  # bar/exit/broker time of the event
+    ('entry_time', 'datetime64[ns]'),
+    ('price', 'f8'),             # signal, exit or fill price
+    ('entry_price', 'f8'),       # entry price, or the requested price of an order
+    ('volume', 'f8'),
+    ('profit', 'f8'),
+    ('balance', 'f8'),
+    ('retcode', 'i4'),
+    ('ticket', 'i8'),
+])
+
+
+def _encode_events(batch):
+    """Packs a batch of event dicts into `EVENT_DTYPE` records, column by column."""
+    records = np.zeros(len(batch), dtype=EVENT_DTYPE)
+    records['logged_at'] = [event['logged_at'] for event in batch]
+    records['kind'] = [EVENT_KINDS[event['event']] for event in batch]
+    records['side'] = [EVENT_SIDES.get(event.get('side'), 0) for event in batch]
+    records['symbol'] = [event.get('symbol') or '' for event in batch]
+    for name in ('time', 'entry_time'):
+        records[name] = [event.get(name) for event in batch]
+    for name in ('price', 'entry_price', 'volume', 'profit', 'balance'):
+        records[name] = [event.get(name, np.nan) for event in batch]
+    for name in ('retcode', 'ticket'):
+        records[name] = [event.get(name) or 0 for event in batch]
+    return records.tobytes()
+
+
+def read_events(path):
+    """
+    Loads an event log written by `EventLog`.
+
+    Returns:
+        pd.DataFrame: One row per event, with 'event' and 'side' as names.
+    """
+    if path.endswith('.jsonl'):
+        return pd.read_json(path, lines=True, convert_dates=['time', 'entry_time'], keep_default_dates=False)
+    records = np.fromfile(path, dtype=EVENT_DTYPE)
+    df = pd.DataFrame(records)
+    df['event'] = df.pop('kind').map({code: name for name, code in EVENT_KINDS.items()})
+    df['side'] = df['side'].map({code: name for name, code in EVENT_SIDES.items()})
+    df['symbol'] = df['symbol'].str.decode('ascii')
+    return df
+
+
+class EventLog:
+    """
+    Structured log of trading events (trades, signals, orders).
+
+    Disabled until `open` is called; `record` then costs one dict and one
+    queue put, and encoding happens on the writer thread. Paths ending in
+    '.jsonl' get one JSON object per line; any other path gets compact
+    fixed-size binary records (`EVENT_DTYPE`), which are several times
+    cheaper to write and are read back with `read_events`. Only the event
+    kinds passed to `open` are kept.
+    """
+
+    def __init__(self):
+        self._writer = None
+        self.kinds = frozenset()
+
+    def open(self, path, kinds=('trade', 'signal', 'order')):
+        self.close()
+        self.kinds = frozenset(kinds)
+        if path.endswith('.jsonl'):
+            self._writer = BackgroundWriter(path, format=lambda event: json.dumps(event, default=str))
+        else:
+            self._writer = BackgroundWriter(path, encode=_encode_events)
+
+    def enabled(self, kind):
+        return self._writer is not None and kind in self.kinds
+
+    def record(self, kind, **fields):
+        """Queues an event; a no-op when the kind is not being recorded."""
+        if self._writer is None or kind not in self.kinds:
+            return
+        fields['event'] = kind
+        fields['logged_at'] = time.time()
+        self._writer.put(fields)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# Event log shared by the backtester and the live paths
+events = EventLog()
+
+
+def _forget_events_in_child():
+    # The writer thread does not survive a fork (e.g. into Pool workers), so
+    # events recorded in the child would pile up in a queue nothing drains
+    events._writer = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_events_in_child)
+
+
+def configure_logging(mode='sync', level='INFO', console=True, log_file='logs/trading.log',
+                      event_log=None, events_recorded=('trade', 'signal', 'order')):
+    """
+    (Re)configures the bot's logging for a run.
+
+    Args:
+        mode (str): 'sync' writes each record as it is logged; 'async' queues
+            records to a background thread that writes them in batches.
+        level (str or int): Verbosity of the 'trading_bot' logger for this run.
+        console (bool): Also print records to stderr.
+        log_file (str): Text log file.
+        event_log (str): Event log file ('.jsonl' for JSON lines, binary
+            records otherwise), or None to disable it.
+        events_recorded (tuple): Event kinds written to the event log.
+
+    Returns:
+        logging.Logger: The 'trading_bot' logger.
+    """
+    if mode not in ('sync', 'async'):
+        raise ValueError(f'Unknown logging mode: {mode}')
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    if mode == 'async':
+        # LOG_FORMAT prints none of these, so skip collecting them for every
+        # record (see "Optimization" in the logging HOWTO)
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        writer = BackgroundWriter(log_file, format=formatter.format, stream=sys.stderr if console else None)
+        handlers = [AsyncHandler(writer)]
+    else:
+        handlers = [logging.FileHandler(log_file)] if log_file else []
+        if console:
+            handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    logger = logging.getLogger('trading_bot')
+    logger.setLevel(level)
+    if event_log:
+        events.open(event_log, events_recorded)
+    else:
+        events.close()
+    return logger
+
+
+def shutdown_logging():
+    """Flushes the background writers; registered to run at exit."""
+    events.close()
+    for handler in list(logging.getLogger().handlers):
+        if isinstance(handler, AsyncHandler):
+            handler.close()
+
+
+atexit.register(shutdown_logging)
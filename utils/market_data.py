@@ -0,0 +1,80 @@
+from utils.broker import broker
+
+
+class MarketSession:
+    """
+    Caches what the order paths read from the broker.
+
+    Static symbol metadata (point, tick value, margin_initial, ...) is kept
+    for `info_ttl` seconds. Ticks and account info are snapshots: the first
+    read in a decision cycle fetches them and every later read in the same
+    cycle reuses that copy, so lot size, SL/TP and the order price are all
+    computed from one quote. Call `new_cycle` at the start of each cycle;
+    snapshots also expire after `snapshot_ttl` seconds as a safety net.
+    Times come from `broker.time`, so the replay backend's clock is honoured.
+
+    Args:
+        info_ttl (float): Lifetime of cached symbol metadata, in seconds.
+        snapshot_ttl (float): Maximum age of a tick or account snapshot.
+    """
+
+    def __init__(self, info_ttl=300.0, snapshot_ttl=1.0):
+        self.info_ttl = info_ttl
+        self.snapshot_ttl = snapshot_ttl
+        self._info = {}  # symbol -> (fetched at, symbol info)
+        self._ticks = {}  # symbol -> (fetched at, tick)
+        self._account = None  # (fetched at, account info)
+
+    def symbol_info(self, symbol):
+        """Cached `symbol_info`, refetched once it is older than `info_ttl`."""
+        now = broker.time()
+        cached = self._info.get(symbol)
+        if cached is not None and now - cached[0] < self.info_ttl:
+            return cached[1]
+        info = broker.symbol_info(symbol)
+        if info is not None:
+            self._info[symbol] = (now, info)
+        return info
+
+    def tick(self, symbol):
+        """The tick snapshot of the current cycle."""
+        now = broker.time()
+        cached = self._ticks.get(symbol)
+        if cached is not None and now - cached[0] < self.snapshot_ttl:
+            return cached[1]
+        tick = broker.symbol_info_tick(symbol)
+        if tick is not None:
+            self._ticks[symbol] = (now, tick)
+        return tick
+
+    def account_info(self):
+        """The account snapshot of the current cycle."""
+        now = broker.time()
+        if self._account is not None and now - self._account[0] < self.snapshot_ttl:
+            return self._account[1]
+        account = broker.account_info()
+        if account is not None:
+            self._account = (now, account)
+        return account
+
+    def new_cycle(self, symbol=None):
+        """
+        Drops the tick snapshots (of one symbol, or all) and the account
+        snapshot so the next read fetches fresh ones.
+        """
+        if symbol is None:
+            self._ticks.clear()
+        else:
+            self._ticks.pop(symbol, None)
+        self._account = None
+
+    def invalidate(self, symbol=None):
+        """Forgets cached symbol metadata, e.g. after a contract change."""
+        if symbol is None:
+            self._info.clear()
+        else:
+            self._info.pop(symbol, None)
+
+
+# Session shared by the live loop, the scheduler and the backtester
+market_session = MarketSession()
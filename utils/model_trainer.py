@@ -0,0 +1,164 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Classifier settings used when a strategy does not pass its own
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 5,
+    'min_samples_leaf': 20,
+    'random_state': 0,
+    'n_jobs': 1,
+}
+
+
+def fit_classifier(X, y, model_params=None):
+    """Fits the direction classifier on a feature matrix and 0/1 labels."""
+    model = RandomForestClassifier(**(model_params or DEFAULT_MODEL_PARAMS))
+    model.fit(X, y)
+    return model
+
+
+class ModelStore:
+    """
+    Directory of fitted models saved with joblib.
+
+    A model is keyed by the parameters it was trained with and by the data
+    window it saw (the window's bar times and closes are hashed), so the same
+    fold is never fitted twice, across backtests and restarts alike.
+    """
+
+    def __init__(self, root='data/models'):
+        self.root = root
+
+    def key(self, params, times, closes):
+        """
+        Builds the key of a model trained on a window of bars.
+
+        Args:
+            params (dict): Everything that changes the fitted model.
+            times (np.ndarray): Open times of the window's bars.
+            closes (np.ndarray): Closes of the window's bars.
+
+        Returns:
+            str: A file-name-safe key.
+        """
+        digest = hashlib.sha1(repr(sorted(params.items())).encode())
+        digest.update(np.ascontiguousarray(times).tobytes())
+        digest.update(np.ascontiguousarray(closes, dtype=np.float64).tobytes())
+        return f'{int(times[0])}_{int(times[-1])}_{digest.hexdigest()[:16]}'
+
+    def path(self, key):
+        return os.path.join(self.root, f'{key}.joblib')
+
+    def load(self, key):
+        """Returns the stored model, or None if there is none (or it is unreadable)."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            logger.warning(f'Could not load model {path}: {e}')
+            return None
+
+    def save(self, key, model):
+        """Writes a model atomically, so readers never see a partial file."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def load_or_fit(store, key, X, y, model_params=None):
+    """Returns the stored model for `key`, fitting and storing it first if needed."""
+    model = store.load(key) if store is not None else None
+    if model is None:
+        model = fit_classifier(X, y, model_params)
+        if store is not None:
+            store.save(key, model)
+    return model
+
+
+class BackgroundTrainer:
+    """
+    Fits models off the signal path, one job at a time.
+
+    `submit` hands a training window to a single worker and returns at once;
+    `poll` returns the finished model without ever waiting for one that is
+    still being fitted, so inference keeps using the previous model meanwhile.
+
+    Args:
+        store (ModelStore): Where fitted models are persisted, or None.
+        executor (str): 'thread' or 'process'. A process keeps a heavy fit
+            from competing with the live loop for the GIL.
+    """
+
+    def __init__(self, store=None, executor='thread'):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f'Unknown executor: {executor}')
+        self.store = store
+        self.executor = executor
+        self._pool = None
+        self._future = None
+        self._key = None
+
+    @property
+    def busy(self):
+        return self._future is not None and not self._future.done()
+
+    def submit(self, key, X, y, model_params=None):
+        """
+        Starts fitting a model unless a job is already running.
+
+        Returns:
+            bool: True if the job was started.
+        """
+        if self.busy:
+            return False
+        if self._pool is None:
+            pool_class = ThreadPoolExecutor if self.executor == 'thread' else ProcessPoolExecutor
+            self._pool = pool_class(max_workers=1)
+        self._key = key
+        self._future = self._pool.submit(load_or_fit, self.store, key, X, y, model_params)
+        return True
+
+    def poll(self):
+        """
+        Returns:
+            tuple: (key, model) of a job that finished since the last poll, or
+            None. A failed job is logged and dropped.
+        """
+        if self._future is None or not self._future.done():
+            return None
+        future, self._future = self._future, None
+        try:
+            return self._key, future.result()
+        except Exception:
+            logger.exception(f'Training model {self._key} failed.')
+            return None
+
+    def wait(self):
+        """Blocks until the running job, if any, has finished. Meant for tests and shutdown."""
+        if self._future is not None:
+            self._future.exception()
+
+    def __getstate__(self):
+        # Pickled (e.g. in a checkpoint) idle: the worker and its job stay behind
+        state = self.__dict__.copy()
+        state.update(_pool=None, _future=None, _key=None)
+        return state
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,224 @@
+import itertools
+import logging
+import os
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from strategies.factor import create_strategy
+from utils.backtester import INITIAL_BALANCE, SimulatedTradeManager, simulate_signals
+
+# Price data of the current sweep, attached in each worker by _init_worker
+_shared_rates = None
+_shared_memory = None
+_point = None
+
+
+def parameter_grid(grid):
+    """
+    Expands a grid of parameter values into every combination.
+
+    Args:
+        grid (dict): Parameter name -> iterable of values.
+
+    Returns:
+        list: One dict of parameters per combination.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_search(space, n_iter, seed=0):
+    """
+    Draws random parameter sets from a search space.
+
+    Args:
+        space (dict): Parameter name -> list of choices, or a (low, high)
+            tuple. Tuples of ints sample integers in [low, high], otherwise
+            floats uniformly.
+        n_iter (int): Number of parameter sets.
+        seed (int): Random seed.
+
+    Returns:
+        list: One dict of parameters per draw.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                columns[name] = rng.integers(low, high + 1, size=n_iter).tolist()
+            else:
+                columns[name] = rng.uniform(low, high, size=n_iter).tolist()
+        else:
+            values = list(values)
+            columns[name] = [values[i] for i in rng.integers(0, len(values), size=n_iter)]
+    return [{name: columns[name][i] for name in space} for i in range(n_iter)]
+
+
+def _init_worker(shm_name, shape, dtype, point):
+    """Attaches the shared price array in a pool worker."""
+    global _shared_rates, _shared_memory, _point
+    _shared_memory = shared_memory.SharedMemory(name=shm_name)
+    _shared_rates = np.ndarray(shape, dtype=dtype, buffer=_shared_memory.buf)
+    _point = point
+    # Per-trade log lines would dominate the run time of a sweep
+    logging.getLogger('trading_bot').setLevel(logging.WARNING)
+
+
+def run_single_backtest(strategy_name, params, rates, point):
+    """
+    Runs one vectorized backtest without touching the broker.
+
+    Args:
+        strategy_name (str): Name understood by `create_strategy`.
+        params (dict): Strategy parameters.
+        rates (np.ndarray): MT5 rates structured array.
+        point (float): The symbol's point size.
+
+    Returns:
+        dict: The parameters, the metrics and the number of trades.
+    """
+    strategy = create_strategy(strategy_name, **params)
+    trade_manager = SimulatedTradeManager(INITIAL_BALANCE, point=point, keep_trades=False)
+    signals = strategy.generate_signals(rates)
+    simulate_signals(trade_manager, signals, rates['close'], rates['time'],
+                     start=getattr(strategy, 'long_period', 0))
+    return {**params, **trade_manager.metrics.result()}
+
+
+def _evaluate(task):
+    strategy_name, params = task
+    return run_single_backtest(strategy_name, params, _shared_rates, _point)
+
+
+def _params_key(params, names):
+    return tuple((name, params[name]) for name in names)
+
+
+def _rank(results, rank_by, ascending):
+    df = pd.DataFrame(results)
+    if df.empty:
+        return df
+    return df.sort_values(rank_by, ascending=ascending).reset_index(drop=True)
+
+
+def _bayesian_search(space, n_iter, evaluate, rank_by, ascending, batch_size, seed):
+    """
+    Gaussian-process search: after a random start, each batch is the set of
+    candidates with the highest expected improvement of `rank_by`.
+    """
+    from scipy.stats import norm
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import Matern
+
+    names = list(space)
+    sign = 1.0 if ascending else -1.0  # minimise sign * metric
+
+    def encode(param_sets):
+        return np.array([[float(p[name]) for name in names] for p in param_sets])
+
+    results = evaluate(random_search(space, min(max(2 * batch_size, 10), n_iter), seed))
+    seen = {tuple(r[name] for name in names) for r in results}
+    round_number = 0
+    while len(results) < n_iter:
+        round_number += 1
+        X = encode(results)
+        y = sign * np.nan_to_num(np.array([r[rank_by] for r in results], dtype=float))
+        scale = X.std(axis=0) + 1e-9
+        gp = GaussianProcessRegressor(kernel=Matern(nu=2.5), normalize_y=True, random_state=seed)
+        gp.fit(X / scale, y)
+
+        candidates = [c for c in random_search(space, 50 * batch_size, seed + round_number)
+                      if tuple(c[name] for name in names) not in seen]
+        if not candidates:
+            break
+        mean, std = gp.predict(encode(candidates) / scale, return_std=True)
+        improvement = y.min() - mean
+        z = improvement / np.maximum(std, 1e-12)
+        expected_improvement = improvement * norm.cdf(z) + std * norm.pdf(z)
+
+        batch = []
+        for i in np.argsort(-expected_improvement):
+            key = tuple(candidates[i][name] for name in names)
+            if key not in seen:
+                seen.add(key)
+                batch.append(candidates[i])
+            if len(batch) == min(batch_size, n_iter - len(results)):
+                break
+        results.extend(evaluate(batch))
+    return results
+
+
+def optimize(strategy_name, rates, point, grid=None, space=None, method='grid', n_iter=100,
+             processes=None, rank_by='total_return', ascending=False, seed=0, checkpoint=None):
+    """
+    Backtests many parameter sets of a strategy in parallel and ranks them.
+
+    The price array is copied once into shared memory; workers map it instead
+    of receiving a pickled copy with every task.
+
+    Args:
+        strategy_name (str): Name understood by `create_strategy`.
+        rates (np.ndarray): MT5 rates structured array.
+        point (float): The symbol's point size.
+        grid (dict): Parameter grid, for method 'grid'.
+        space (dict): Search space (see `random_search`), for 'random' and
+            'bayesian'.
+        method (str): 'grid', 'random' or 'bayesian'.
+        n_iter (int): Number of parameter sets for 'random' and 'bayesian'.
+        processes (int): Pool size, defaults to the CPU count.
+        rank_by (str): Metric from `MetricsAccumulator.result` to rank by.
+        ascending (bool): Rank ascending (e.g. for 'max_drawdown').
+        seed (int): Random seed.
+        checkpoint (Checkpoint): Where the finished backtests are saved while
+            the sweep runs. A sweep interrupted and restarted on the same
+            data only runs the parameter sets it had not finished; the
+            checkpoint is removed once the sweep completes.
+
+    Returns:
+        pd.DataFrame: One row per parameter set, best first.
+    """
+    rates = np.ascontiguousarray(rates)
+    processes = processes or os.cpu_count()
+    key = ('optimize', strategy_name, point, len(rates),
+           *(rates[[0, -1]][['time', 'close']].tolist() if len(rates) else ()))
+    finished = (checkpoint.load(key) if checkpoint is not None else None) or {}
+    shm = shared_memory.SharedMemory(create=True, size=max(rates.nbytes, 1))
+    try:
+        np.ndarray(rates.shape, dtype=rates.dtype, buffer=shm.buf)[:] = rates
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(shm.name, rates.shape, rates.dtype, point)) as pool:
+
+            def evaluate(param_sets):
+                if not param_sets:
+                    return []
+                names = list(param_sets[0])
+                tasks = [(strategy_name, params) for params in param_sets
+                         if _params_key(params, names) not in finished]
+                chunksize = max(1, len(tasks) // (processes * 4))
+                for result in pool.imap_unordered(_evaluate, tasks, chunksize=chunksize):
+                    finished[_params_key(result, names)] = result
+                    if checkpoint is not None and checkpoint.due():
+                        checkpoint.save(key, finished)
+                if checkpoint is not None and tasks:
+                    checkpoint.save(key, finished)
+                return [finished[_params_key(params, names)] for params in param_sets]
+
+            if method == 'grid':
+                results = evaluate(parameter_grid(grid))
+            elif method == 'random':
+                results = evaluate(random_search(space, n_iter, seed))
+            elif method == 'bayesian':
+                results = _bayesian_search(space, n_iter, evaluate, rank_by, ascending,
+                                           batch_size=processes, seed=seed)
+            else:
+                raise ValueError(f'Unknown optimization method: {method}')
+    finally:
+        shm.close()
+        shm.unlink()
+    if checkpoint is not None:
+        checkpoint.clear()
+    return _rank(results, rank_by, ascending)
@@ -0,0 +1,316 @@
+import itertools
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.settings import ORDER_ROUTER, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS
+from utils.broker import broker
+from utils.data_fetcher import calculate_lot_size
+from utils.logger import setup_logger, events
+from utils.market_data import market_session
+from utils.position_book import PositionBook
+from utils.telemetry import telemetry
+
+logger = setup_logger()
+
+# Retcodes meaning the order was rejected unfilled, so it can be resent at a fresh price
+RETRY_RETCODES = ('TRADE_RETCODE_REQUOTE', 'TRADE_RETCODE_PRICE_CHANGED', 'TRADE_RETCODE_PRICE_OFF')
+
+OrderResult = namedtuple('OrderResult', ['ok', 'retcode', 'price', 'ticket', 'attempts', 'latency'])
+OrderResult.__doc__ = """
+Outcome of a routed order: whether it was filled, the last retcode, the fill
+price and ticket, the number of order_send attempts and the seconds from the
+signal to the fill (or to giving up).
+"""
+
+
+class OrderTemplate:
+    """
+    Prebuilt request of one (symbol, magic number).
+
+    The static request fields and the symbol's trading limits are looked up
+    and checked once, when the template is created; `build` then only copies
+    the dict and fills in the side, volume and prices.
+
+    Args:
+        symbol (str): The trading symbol.
+        magic_number (int): The bot's magic number.
+        deviation (int): Accepted slippage, in points.
+        session (MarketSession): Source of the symbol metadata.
+    """
+
+    def __init__(self, symbol, magic_number, deviation=20, session=None):
+        info = (session or market_session).symbol_info(symbol)
+        if info is None:
+            raise ValueError(f'Unknown symbol: {symbol}')
+        self.symbol = symbol
+        self.magic_number = magic_number
+        self.point = info.point
+        self.digits = getattr(info, 'digits', None)
+        self.volume_min = getattr(info, 'volume_min', 0.01)
+        self.volume_max = getattr(info, 'volume_max', None)
+        self.volume_step = getattr(info, 'volume_step', 0.01)
+        self.margin_initial = getattr(info, 'margin_initial', 0.0)
+        self.request = {
+            'action': broker.TRADE_ACTION_DEAL,
+            'symbol': symbol,
+            'deviation': deviation,
+            'magic': magic_number,
+            'type_time': broker.ORDER_TIME_GTC,
+            'type_filling': broker.ORDER_FILLING_IOC,
+        }
+
+    def volume(self, lot_size):
+        """Rounds a lot size to the symbol's volume step and limits."""
+        steps = round(lot_size / self.volume_step)
+        volume = max(self.volume_min, steps * self.volume_step)
+        if self.volume_max:
+            volume = min(volume, self.volume_max)
+        return round(volume, 8)
+
+    def _price(self, price):
+        return round(price, self.digits) if self.digits is not None else price
+
+    def build(self, order_type, volume, price, sl=None, tp=None, position=None, comment=''):
+        request = dict(self.request)
+        request['type'] = order_type
+        request['volume'] = volume
+        request['price'] = price
+        request['comment'] = comment
+        if sl is not None:
+            request['sl'] = self._price(sl)
+            request['tp'] = self._price(tp)
+        if position is not None:
+            request['position'] = position
+        return request
+
+
+class OrderRouter:
+    """
+    Sends orders from a dedicated worker so strategies never wait on fills.
+
+    `submit_signal`, `submit_open` and `submit_close` queue the order and
+    return a `concurrent.futures.Future` of its `OrderResult` at once. The
+    worker prices each order from a fresh tick on a prebuilt
+    `OrderTemplate` and resends it at a new price when it is requoted or off
+    quotes. Every logical order carries a unique comment, so after a failed
+    send the worker can tell from the open positions whether the order went
+    through, and a retry never opens or closes twice.
+
+    Which position a signal acts on is read from a `PositionBook` that the
+    worker keeps up to date with its own fills, so a signal costs no
+    `positions_get` call; the book is reconciled with the broker when it is
+    due and after an order the broker did not expect.
+
+    Signal-to-send and signal-to-fill latencies go to the 'signal_to_send'
+    and 'signal_to_fill' telemetry histograms.
+
+    Args:
+        session (MarketSession): Market-data cache, defaults to the shared one.
+        max_retries (int): Resends after a requote or off-quote retcode.
+        retry_delay (float): Seconds between resends (on the broker clock).
+        deviation (int): Accepted slippage, in points.
+        executor (Executor): Runs the orders; a single dedicated thread by
+            default. Pass the caller's executor to keep a backend that is
+            not thread-safe (the replay broker) on one thread.
+        book (PositionBook): Open positions, a new book by default.
+    """
+
+    def __init__(self, session=None, max_retries=None, retry_delay=None, deviation=None, executor=None,
+                 book=None):
+        self.session = session or market_session
+        self.book = PositionBook() if book is None else book
+        self.max_retries = ORDER_ROUTER['max_retries'] if max_retries is None else max_retries
+        self.retry_delay = ORDER_ROUTER['retry_delay'] if retry_delay is None else retry_delay
+        self.deviation = ORDER_ROUTER['deviation'] if deviation is None else deviation
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='order-router')
+        self._templates = {}
+        self._order_ids = itertools.count(1)
+
+    def template(self, symbol, magic_number):
+        key = (symbol, magic_number)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = OrderTemplate(symbol, magic_number, self.deviation, self.session)
+        return template
+
+    # --- Submission ---------------------------------------------------------
+
+    def submit_signal(self, symbol, signal, lot_size, magic_number, signal_time=None):
+        """
+        Queues the order a signal calls for: a counter-signal closes the open
+        position, and a signal with no open position opens one. New positions
+        are sized by risk from the account equity; `lot_size` is accepted for
+        the signature callers already use.
+
+        Args:
+            signal_time (float): `time.perf_counter()` when the signal was
+                generated; the submission time by default.
+
+        Returns:
+            Future: The `OrderResult`, or None when no order was needed.
+        """
+        signal_time = time.perf_counter() if signal_time is None else signal_time
+        return self._executor.submit(self._execute_signal, symbol, signal, lot_size, magic_number, signal_time)
+
+    def submit_open(self, symbol, order_type, magic_number, lot_size=None, signal_time=None):
+        """Queues a market order opening a position; returns a Future of its `OrderResult`."""
+        signal_time = time.perf_counter() if signal_time is None else signal_time
+        return self._executor.submit(self._open, symbol, order_type, magic_number, lot_size, signal_time)
+
+    def submit_close(self, position_id, signal_time=None):
+        """Queues a market order closing a position; returns a Future of its `OrderResult`."""
+        signal_time = time.perf_counter() if signal_time is None else signal_time
+        return self._executor.submit(self._close, position_id, signal_time)
+
+    def shutdown(self, wait=True):
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    # --- Worker -------------------------------------------------------------
+
+    def _execute_signal(self, symbol, signal, lot_size, magic_number, signal_time):
+        if signal not in ('BUY', 'SELL'):
+            return None
+        events.record('signal', symbol=symbol, side=signal, time=np.datetime64(int(broker.time()), 's'))
+        if self.book.due():
+            self.book.reconcile()
+        position = self.book.position(symbol, magic_number)
+        if position is not None:
+            if (position.type == broker.POSITION_TYPE_BUY and signal == 'SELL') or \
+               (position.type == broker.POSITION_TYPE_SELL and signal == 'BUY'):
+                logger.info('%s signal received. Closing position %s on %s.', signal, position.ticket, symbol)
+                result = self._close(position.ticket, signal_time)
+                if result.ok or self.book.get(position.ticket) is not None:
+                    return result
+                # The position had already been closed at the broker (by its SL/TP): act on a flat book
+            else:
+                return None
+        order_type = broker.ORDER_TYPE_BUY if signal == 'BUY' else broker.ORDER_TYPE_SELL
+        logger.info('%s signal received. Opening a new position on %s.', signal, symbol)
+        return self._open(symbol, order_type, magic_number, None, signal_time)
+
+    def _open(self, symbol, order_type, magic_number, lot_size, signal_time):
+        session = self.session
+        template = self.template(symbol, magic_number)
+        account = session.account_info()
+        if account is None:
+            logger.error('Failed to get account info')
+            return OrderResult(False, None, None, None, 0, time.perf_counter() - signal_time)
+        if lot_size is None:
+            lot_size = calculate_lot_size(symbol, account.equity, session=session)
+        volume = template.volume(lot_size)
+        if account.margin_free < volume * template.margin_initial:
+            logger.error('Insufficient margin to open position')
+            return OrderResult(False, None, None, None, 0, time.perf_counter() - signal_time)
+
+        comment = f'python script open #{next(self._order_ids)}'
+        is_buy = order_type == broker.ORDER_TYPE_BUY
+        direction = 1 if is_buy else -1
+
+        def request():
+            tick = session.tick(symbol)
+            price = tick.ask if is_buy else tick.bid
+            return template.build(order_type, volume, price,
+                                  sl=price - direction * STOP_LOSS_PIPS * template.point,
+                                  tp=price + direction * TAKE_PROFIT_PIPS * template.point,
+                                  comment=comment)
+
+        def already_done():
+            positions = broker.positions_get(symbol=symbol) or ()
+            return next((p.ticket for p in positions if p.comment == comment), None)
+
+        return self._send(request, already_done, self.book.record_open, 'open', symbol, signal_time)
+
+    def _close(self, position_id, signal_time):
+        position = self.book.get(position_id)
+        if position is None:
+            # Not opened by this router: look it up once
+            positions = broker.positions_get(ticket=position_id)
+            if not positions:
+                logger.error('Position %s to close was not found', position_id)
+                return OrderResult(False, None, None, None, 0, time.perf_counter() - signal_time)
+            position = positions[0]
+        template = self.template(position.symbol, position.magic)
+        is_buy = position.type == broker.POSITION_TYPE_SELL
+        order_type = broker.ORDER_TYPE_BUY if is_buy else broker.ORDER_TYPE_SELL
+        comment = f'python script close #{next(self._order_ids)}'
+
+        def request():
+            tick = self.session.tick(position.symbol)
+            return template.build(order_type, position.volume, tick.ask if is_buy else tick.bid,
+                                  position=position_id, comment=comment)
+
+        def already_done():
+            return None if broker.positions_get(ticket=position_id) else position_id
+
+        result = self._send(request, already_done, lambda request, result: self.book.record_close(position_id),
+                            'close', position.symbol, signal_time)
+        if not result.ok:
+            # The broker may know better, e.g. the position hit its stop loss
+            self.book.reconcile()
+        return result
+
+    def _send(self, build_request, already_done, filled, action, symbol, signal_time):
+        """
+        Sends an order, resending it at a fresh price while it is requoted.
+
+        Args:
+            build_request (callable): Prices the request from the current tick.
+            already_done (callable): Returns the ticket if an earlier attempt
+                went through despite its result, else None.
+            filled (callable): Called with the request and the result of the
+                fill, to update the position book.
+        """
+        retry_retcodes = {getattr(broker, name) for name in RETRY_RETCODES if hasattr(broker, name)}
+        retcode = None
+        for attempt in range(1, self.max_retries + 2):
+            if attempt > 1:
+                # Make sure the failed attempt did not execute before resending
+                ticket = already_done()
+                if ticket is not None:
+                    self.book.reconcile()
+                    return self._done(action, symbol, broker.TRADE_RETCODE_DONE, None, ticket, attempt - 1,
+                                      signal_time)
+                telemetry.count('order_retries', symbol=symbol, retcode=retcode)
+                if self.retry_delay:
+                    broker.sleep(self.retry_delay)
+                self.session.new_cycle(symbol)
+
+            request = build_request()
+            if attempt == 1:
+                telemetry.observe('signal_to_send', time.perf_counter() - signal_time, symbol=symbol)
+            try:
+                with telemetry.timer('order_send'):
+                    result = broker.order_send(request)
+            except Exception as e:
+                logger.error('order_send failed: %s', e)
+                result = None
+            retcode = result.retcode if result is not None else None
+            telemetry.count('orders', action=action, retcode=retcode)
+            if result is not None:
+                events.record('order', symbol=symbol,
+                              side='BUY' if request['type'] == broker.ORDER_TYPE_BUY else 'SELL',
+                              time=np.datetime64(int(broker.time()), 's'), volume=request['volume'],
+                              entry_price=request['price'], price=result.price, retcode=retcode,
+                              ticket=request.get('position') or result.order)
+            if retcode == broker.TRADE_RETCODE_DONE:
+                filled(request, result)
+                return self._done(action, symbol, retcode, result.price, request.get('position') or result.order,
+                                  attempt, signal_time)
+            if result is not None and retcode not in retry_retcodes:
+                break
+
+        logger.error('Failed to %s position on %s. Error code: %s', action, symbol, retcode)
+        return OrderResult(False, retcode, None, None, attempt, time.perf_counter() - signal_time)
+
+    def _done(self, action, symbol, retcode, price, ticket, attempts, signal_time):
+        latency = time.perf_counter() - signal_time
+        telemetry.observe('signal_to_fill', latency, symbol=symbol)
+        logger.info('%s order on %s filled at %s (ticket #%s, %d attempt(s), %.1f ms after the signal).',
+                    action.capitalize(), symbol, price, ticket, attempts, latency * 1000)
+        return OrderResult(True, retcode, price, ticket, attempts, latency)
+
@@ -1,35 +1,360 @@
+import math
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from utils.data_store import timeframe_seconds
+from utils.trade_ledger import TradeLedger
+
+# Trading days per year used to annualize Sharpe and Sortino
+TRADING_DAYS_PER_YEAR = 252
+
+
+def bars_per_year(timeframe):
+    """Number of bars of a timeframe in a trading year."""
+    return TRADING_DAYS_PER_YEAR * 86400 / timeframe_seconds(timeframe)
+
+
+def _seconds(delta):
+    # Integer bar times (MT5 rates) are epoch seconds, so their difference is too
+    if isinstance(delta, (int, float, np.integer, np.floating)) and not isinstance(delta, np.timedelta64):
+        return float(delta)
+    return pd.Timedelta(delta).total_seconds()
+
+
+class _Moments:
+    """Running count, mean and variance (Welford), mergeable with runs of zeros."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, count, mean, m2):
+        """Merges the moments of another run of values (Chan et al.)."""
+        if count <= 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def add_zeros(self, count):
+        """Adds `count` zeros in O(1)."""
+        self.merge(count, 0.0, 0.0)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class EquityRecorder:
+    """
+    Keeps a bounded sample of an equity curve for plotting.
+
+    Every `stride`-th point is kept; when the buffer fills up, every other
+    point is dropped and the stride doubles, so memory stays below
+    ``2 * max_points`` however long the run is.
+    """
+
+    def __init__(self, max_points=10000):
+        self.max_points = max_points
+        self.stride = 1
+        self._seen = 0
+        self._times = []
+        self._values = []
+        self._last = None  # newest point, if it was not sampled
+
+    def add(self, time, value):
+        if self._seen % self.stride == 0:
+            self._times.append(time)
+            self._values.append(value)
+            self._last = None
+            if len(self._values) >= 2 * self.max_points:
+                self._times = self._times[::2]
+                self._values = self._values[::2]
+                self.stride *= 2
+        else:
+            self._last = (time, value)
+        self._seen += 1
+
+    def curve(self):
+        """Returns the sampled (times, values), always ending with the newest point."""
+        times, values = list(self._times), list(self._values)
+        if self._last is not None:
+            times.append(self._last[0])
+            values.append(self._last[1])
+        return times, np.asarray(values, dtype=np.float64)
+
+
+class MetricsAccumulator:
+    """
+    Online backtest metrics in O(1) memory.
+
+    Feed it every closed trade with `on_trade` and every bar's marked-to-market
+    equity with `on_bar` (or `on_idle_bars` for a run of flat bars) and read
+    the metrics at any time with `result`, without keeping the trades.
+
+    Args:
+        initial_balance (float): Starting balance.
+        periods_per_year (float): Bars per year, used to annualize Sharpe and
+            Sortino. When None, the per-bar ratios are reported.
+        max_curve_points (int): Bound of the equity sample kept for plotting.
+    """
+
+    def __init__(self, initial_balance, periods_per_year=None, max_curve_points=10000):
+        self.initial_balance = initial_balance
+        self.periods_per_year = periods_per_year
+        self.equity = initial_balance
+        self.peak = initial_balance
+        self.max_drawdown = 0.0
+        self.num_trades = 0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.bars = 0
+        self.bars_in_position = 0
+        self._bar_equity = None  # equity marked at the previous bar
+        self._returns = _Moments()
+        self._downside = 0.0  # sum of squared negative bar returns
+        self._durations = _Moments()
+        self.max_duration = 0.0
+        self.curve = EquityRecorder(max_curve_points)
+
+    def _update_equity(self, equity, time=None):
+        self.equity = equity
+        if equity > self.peak:
+            self.peak = equity
+        elif self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak - equity) / self.peak * 100)
+        if time is not None:
+            self.curve.add(time, equity)
+
+    def on_trade(self, profit, entry_time, exit_time, balance):
+        """Records a closed trade."""
+        self.num_trades += 1
+        if profit > 0:
+            self.wins += 1
+            self.gross_profit += profit
+        else:
+            self.gross_loss -= profit
+        if entry_time is not None and exit_time is not None:
+            duration = _seconds(exit_time - entry_time)
+            self._durations.add(duration)
+            self.max_duration = max(self.max_duration, duration)
+        self._update_equity(balance, exit_time if self.bars == 0 else None)
+
+    def on_trades(self, profits, durations, balances=None):
+        """
+        Records a batch of closed trades in one vectorized step.
+
+        Args:
+            profits (np.ndarray): Profit of each trade.
+            durations (np.ndarray): Duration of each trade, in seconds.
+            balances (np.ndarray): Balance after each trade. When None, the
+                equity and drawdown are left to `on_bars`.
+        """
+        if len(profits) == 0:
+            return
+        wins = profits > 0
+        self.num_trades += len(profits)
+        self.wins += int(wins.sum())
+        self.gross_profit += float(profits[wins].sum())
+        self.gross_loss -= float(profits[~wins].sum())
+        self._durations.merge(len(durations), float(durations.mean()), float(durations.var() * len(durations)))
+        self.max_duration = max(self.max_duration, float(durations.max()))
+        if balances is None:
+            return
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], balances]))[1:]
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, float(((peaks - balances) / peaks).max() * 100))
+        self.peak = float(peaks[-1])
+        self.equity = float(balances[-1])
+
+    def on_bar(self, equity, in_position, time=None):
+        """Records one bar's marked-to-market equity."""
+        if self._bar_equity:
+            ret = equity / self._bar_equity - 1
+            self._returns.add(ret)
+            if ret < 0:
+                self._downside += ret * ret
+        self._bar_equity = equity
+        self.bars += 1
+        if in_position:
+            self.bars_in_position += 1
+        self._update_equity(equity, time)
+
+    def on_bars(self, equity, in_position, times=None):
+        """
+        Records a run of bars in one vectorized step; equivalent to calling
+        `on_bar` for each of them.
+
+        Args:
+            equity (np.ndarray): Marked-to-market equity of each bar.
+            in_position (np.ndarray): Whether a position was open at each bar.
+            times (array-like): Bar times, to sample the equity curve.
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) == 0:
+            return
+        if self._bar_equity:
+            returns = equity / np.concatenate([[self._bar_equity], equity[:-1]]) - 1
+        else:
+            returns = equity[1:] / equity[:-1] - 1
+        if len(returns):
+            mean = float(returns.mean())
+            self._returns.merge(len(returns), mean, float(((returns - mean) ** 2).sum()))
+            self._downside += float((np.minimum(returns, 0.0) ** 2).sum())
+        self._bar_equity = float(equity[-1])
+        self.bars += len(equity)
+        self.bars_in_position += int(np.count_nonzero(in_position))
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], equity]))[1:]
+        positive = peaks > 0
+        if positive.any():
+            drawdowns = (peaks[positive] - equity[positive]) / peaks[positive]
+            self.max_drawdown = max(self.max_drawdown, float(drawdowns.max() * 100))
+        self.peak = float(peaks[-1])
+        self.equity = float(equity[-1])
+        if times is not None:
+            for time, value in zip(times, equity):
+                self.curve.add(time, value)
+
+    def on_idle_bars(self, count):
+        """Records `count` flat bars (no position, equity unchanged) in O(1)."""
+        if count <= 0:
+            return
+        self._returns.add_zeros(count if self._bar_equity else count - 1)
+        if self._bar_equity is None:
+            self._bar_equity = self.equity
+        self.bars += count
+
+    def result(self):
+        """
+        Returns:
+            dict: total_return, win_rate and max_drawdown (percent),
+            sharpe, sortino, profit_factor, exposure (percent of bars in a
+            position), num_trades, avg/max trade duration (seconds) and the
+            final equity.
+        """
+        scale = math.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+        returns = self._returns
+        std = returns.std
+        sharpe = returns.mean / std * scale if std and std == std else 0.0
+        downside = math.sqrt(self._downside / returns.count) if returns.count else 0.0
+        sortino = returns.mean / downside * scale if downside else 0.0
+        if self.gross_loss:
+            profit_factor = self.gross_profit / self.gross_loss
+        else:
+            profit_factor = math.inf if self.gross_profit else 0.0
+        return {
+            'total_return': (self.equity - self.initial_balance) / self.initial_balance * 100,
+            'win_rate': self.wins / self.num_trades * 100 if self.num_trades else 0,
+            'max_drawdown': self.max_drawdown,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'profit_factor': profit_factor,
+            'exposure': self.bars_in_position / self.bars * 100 if self.bars else 0.0,
+            'num_trades': self.num_trades,
+            'avg_trade_duration': self._durations.mean if self._durations.count else 0.0,
+            'max_trade_duration': self.max_duration,
+            'final_equity': self.equity,
+        }
 
 
 def calculate_metrics(trades, initial_balance):
-    trades_df = pd.DataFrame(trades)
-    if trades_df.empty:
-        return {'total_return': 0, 'win_rate': 0, 'max_drawdown': 0}
-    
-    # total return
-    final_balance = trades_df['balance'].iloc[-1]
-    total_return = (final_balance - initial_balance) / initial_balance * 100
-
-    # win rate
-    win_rate = (trades_df['profit'] > 0).mean() * 100
-
-    # maximum drawdown
-    balance_series = trades_df['balance']
-    rolling_max = balance_series.cummax()
-    drawdowns = (rolling_max - balance_series) / rolling_max * 100
-    max_drawdown = drawdowns.max()
-
-    return {
-        'total_return': total_return,
-        'win_rate': win_rate,
-        'max_drawdown': max_drawdown
-    }
-
-def plot_equity_curve(trades, save_path='logs/equity_curve.png'):
-    trades_df = pd.DataFrame(trades)
+    """
+    Computes the trade-based metrics of a finished run.
+
+    Args:
+        trades (TradeLedger or list): Closed trades, as a ledger (read through
+            zero-copy column views) or as trade dicts.
+        initial_balance (float): Starting balance.
+
+    Returns:
+        dict: See `MetricsAccumulator.result`; bar-based metrics are 0.
+    """
+    ledger = TradeLedger.from_trades(trades)
+    metrics = MetricsAccumulator(initial_balance)
+    durations = (ledger['exit_time'] - ledger['entry_time']) / np.timedelta64(1, 's')
+    metrics.on_trades(ledger['profit'], durations, ledger['balance'])
+    return metrics.result()
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``threshold - 2``
+    equal buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket. The shape of
+    the curve, including spikes, survives far better than with striding.
+
+    Args:
+        x (np.ndarray): Increasing x values (numbers).
+        y (np.ndarray): y values.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Indices of the kept points.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def plot_equity_curve(trades, save_path='logs/equity_curve.png', max_points=2000):
+    """
+    Plots an equity curve, downsampled with LTTB to at most `max_points`.
+
+    Args:
+        trades: A `TradeLedger` (or trade dicts), or a `MetricsAccumulator`
+            whose sampled bar-by-bar curve is plotted instead.
+        save_path (str): Where the image is written.
+        max_points (int): Maximum number of points rendered.
+    """
+    if isinstance(trades, MetricsAccumulator):
+        times, values = trades.curve.curve()
+        times = pd.Index(times)
+    else:
+        ledger = TradeLedger.from_trades(trades)
+        times, values = ledger['exit_time'], ledger['balance']
+    if len(values) == 0:
+        return
+
+    x = times.asi8 if isinstance(times, pd.DatetimeIndex) else np.asarray(times)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype(np.int64)
+    kept = lttb(x, values, max_points)
+    times = times[kept]
+
+    # Imported here so live trading never pays for loading matplotlib
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
-    plt.plot(trades_df['exit_time'], trades_df['balance'], label='Equity Curve')
+    plt.plot(times, values[kept], label='Equity Curve')
     plt.xlabel('Time')
     plt.ylabel('Balance')
     plt.title('Backtest Equity Curve')
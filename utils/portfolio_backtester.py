@@ -0,0 +1,264 @@
+import bisect
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from config.settings import LOT_SIZE, STOP_LOSS_PIPS, TAKE_PROFIT_PIPS
+from utils.backtester import INITIAL_BALANCE, SIMULATED_COMMISSION
+from utils.performance import MetricsAccumulator
+from utils.trade_ledger import TradeLedger
+
+# Largest number of bars compared per vectorized SL/TP search step
+SEARCH_CHUNK = 4096
+
+
+def _to_datetime64(times):
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[ns]')
+    return times.astype(np.int64).astype('datetime64[s]').astype('datetime64[ns]')
+
+
+def align_bars(bars):
+    """
+    Aligns the bars of several symbols on the union of their bar times.
+
+    Args:
+        bars (dict): Symbol -> bars (MT5 rates or a DataFrame) with 'time'
+            (epoch seconds or datetimes) and 'close' columns.
+
+    Returns:
+        tuple: (symbols, times, closes) where `times` is the sorted
+        datetime64[ns] index and `closes` a (len(times), len(symbols))
+        float64 matrix, NaN where a symbol has no bar.
+    """
+    symbols = list(bars)
+    symbol_times = [_to_datetime64(bars[symbol]['time']) for symbol in symbols]
+    times = np.unique(np.concatenate(symbol_times)) if symbols else np.array([], dtype='datetime64[ns]')
+    closes = np.full((len(times), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        closes[np.searchsorted(times, symbol_times[j]), j] = np.asarray(bars[symbol]['close'], dtype=np.float64)
+    return symbols, times, closes
+
+
+def _next_index(indices, after, default):
+    """First element of the sorted list `indices` greater than `after`, or `default`."""
+    k = bisect.bisect_right(indices, after)
+    return indices[k] if k < len(indices) else default
+
+
+def _first_exit(prices, start, stop, direction, sl_price, tp_price):
+    """
+    First bar in ``[start, stop)`` whose close touches the SL or TP.
+
+    The window compared per step starts small and doubles up to
+    `SEARCH_CHUNK`, since most trades end within a few bars.
+
+    Returns:
+        int: The bar index, or `stop` if neither level is touched.
+    """
+    size = 32
+    lo = start
+    while lo < stop:
+        window = prices[lo:min(lo + size, stop)]
+        if direction == 1:
+            hit = (window <= sl_price) | (window >= tp_price)
+        else:
+            hit = (window >= sl_price) | (window <= tp_price)
+        i = int(np.argmax(hit))
+        if hit[i]:
+            return lo + i
+        lo += size
+        size = min(2 * size, SEARCH_CHUNK)
+    return stop
+
+
+class PortfolioBacktester:
+    """
+    Backtests one strategy on several symbols sharing one account.
+
+    Each symbol has one position slot and follows the rules of
+    `SimulatedTradeManager` (SL/TP checked on the bar closes first, then a
+    counter-signal closes and reverses the position). On top of that, all
+    symbols share the balance, at most `max_positions` positions are open at
+    once, and no position is opened while the balance is below `min_balance`.
+    At a given bar, exits are processed before entries, and entries in the
+    order of `symbols`.
+
+    The simulation is event driven: it only visits signal bars and exits,
+    found with vectorized searches over the aligned price matrix, so its cost
+    grows with the number of trades rather than bars times symbols. Equity is
+    then marked to market for every bar in one 2D pass.
+
+    Args:
+        symbols (list): Symbols, in the column order of the price matrix.
+        points (dict or list): Point size of each symbol.
+        initial_balance (float): Starting balance of the account.
+        max_positions (int): Maximum number of open positions, or None for
+            one per symbol.
+        min_balance (float): Balance below which no new position is opened.
+        spread (float): Spread paid on BUY entries, in points.
+        periods_per_year (float): Bars per year, to annualize Sharpe/Sortino.
+    """
+
+    def __init__(self, symbols, points, initial_balance=INITIAL_BALANCE, max_positions=None,
+                 min_balance=0.0, spread=2.0, periods_per_year=None):
+        self.symbols = list(symbols)
+        if isinstance(points, dict):
+            points = [points[symbol] for symbol in self.symbols]
+        self.points = np.asarray(points, dtype=np.float64)
+        self.initial_balance = initial_balance
+        self.max_positions = len(self.symbols) if max_positions is None else max_positions
+        self.min_balance = min_balance
+        self.spread = spread
+        self.periods_per_year = periods_per_year
+        self._reset()
+
+    def _reset(self):
+        self.balance = self.initial_balance
+        self.trades = {symbol: TradeLedger() for symbol in self.symbols}
+        self.metrics = MetricsAccumulator(self.initial_balance, self.periods_per_year)
+        self.equity = np.array([])
+        self.symbol_pnl = np.empty((0, len(self.symbols)))
+        self.rejected = 0
+
+    def run(self, signals, closes, times, start=0):
+        """
+        Simulates the signals of every symbol.
+
+        Args:
+            signals (np.ndarray): int8 matrix from
+                `BaseStrategy.generate_signal_matrix` (1 BUY, -1 SELL).
+            closes (np.ndarray): Aligned close matrix from `align_bars`.
+            times (np.ndarray): Bar times from `align_bars`.
+            start (int): Index of the first bar to trade.
+
+        Returns:
+            dict: The portfolio metrics (see `MetricsAccumulator.result`).
+        """
+        self._reset()
+        num_bars, num_symbols = closes.shape
+        # Columns are searched bar by bar, so store each one contiguously;
+        # forward-filled gaps repeat a close that was already checked
+        prices = np.asfortranarray(pd.DataFrame(closes).ffill().to_numpy())
+        # Plain lists: bisect on them is much cheaper than np.searchsorted on a scalar
+        signal_bars = [np.flatnonzero(signals[:, j]).tolist() for j in range(num_symbols)]
+        side_bars = {side: [np.flatnonzero(signals[:, j] == side).tolist() for j in range(num_symbols)]
+                     for side in (1, -1)}
+
+        # (bar, phase, symbol): phase 0 closes a position, phase 1 tries to open one
+        queue = []
+        for j in range(num_symbols):
+            t = _next_index(signal_bars[j], start - 1, num_bars)
+            if t < num_bars:
+                queue.append((t, 1, j))
+        heapq.heapify(queue)
+
+        open_positions = {}  # symbol -> (direction, entry bar, entry price, exit price, reverses)
+        closed = []  # (symbol, direction, entry bar, exit bar, entry price, exit price, profit)
+        while queue:
+            t, phase, j = heapq.heappop(queue)
+            if phase == 0:
+                direction, entry_bar, entry_price, exit_price, reverses = open_positions.pop(j)
+                profit = direction * (exit_price - entry_price) / self.points[j] * LOT_SIZE - SIMULATED_COMMISSION
+                self.balance += profit
+                closed.append((j, direction, entry_bar, t, entry_price, exit_price, profit))
+                if reverses:
+                    heapq.heappush(queue, (t, 1, j))
+                    continue
+            elif len(open_positions) < self.max_positions and self.balance >= self.min_balance:
+                self._open(queue, open_positions, j, t, int(signals[t, j]), prices[:, j], side_bars, num_bars)
+                continue
+            else:
+                self.rejected += 1
+            t = _next_index(signal_bars[j], t, num_bars)
+            if t < num_bars:
+                heapq.heappush(queue, (t, 1, j))
+
+        self._book(closed, times)
+        self._mark(prices, times, start, closed, open_positions)
+        return self.metrics.result()
+
+    def _book(self, closed, times):
+        """Fills the per-symbol trade ledgers from the closed trades, in closing order."""
+        if not closed:
+            return
+        columns = np.array(closed, dtype=np.float64)
+        symbol = columns[:, 0].astype(np.int64)
+        entry_bar, exit_bar = columns[:, 2].astype(np.int64), columns[:, 3].astype(np.int64)
+        balances = self.initial_balance + np.cumsum(columns[:, 6])
+        times = np.asarray(times)
+        for j, name in enumerate(self.symbols):
+            rows = symbol == j
+            self.trades[name].extend(columns[rows, 1], times[entry_bar[rows]], columns[rows, 4],
+                                     times[exit_bar[rows]], columns[rows, 5], columns[rows, 6], balances[rows])
+
+    def _open(self, queue, open_positions, j, t, direction, prices, side_bars, num_bars):
+        point = self.points[j]
+        entry_price = prices[t] + self.spread * point if direction == 1 else prices[t]
+        sl_price = entry_price - direction * STOP_LOSS_PIPS * point
+        tp_price = entry_price + direction * TAKE_PROFIT_PIPS * point
+
+        # The next opposite signal closes and reverses the position, unless
+        # SL/TP is touched first or on the same bar
+        counter = _next_index(side_bars[-direction][j], t, num_bars)
+        stop = min(counter + 1, num_bars)
+        exit_bar = _first_exit(prices, t + 1, stop, direction, sl_price, tp_price)
+        if exit_bar < stop:
+            price = prices[exit_bar]
+            hit_sl = price <= sl_price if direction == 1 else price >= sl_price
+            open_positions[j] = (direction, t, entry_price, sl_price if hit_sl else tp_price, False)
+        else:
+            exit_bar = counter
+            open_positions[j] = (direction, t, entry_price, prices[counter] if counter < num_bars else np.nan, True)
+        if exit_bar < num_bars:
+            heapq.heappush(queue, (exit_bar, 0, j))
+
+    def _mark(self, prices, times, start, closed, open_positions):
+        """Marks every bar to market and feeds the metrics."""
+        num_bars, num_symbols = prices.shape
+        held = np.zeros((num_bars, num_symbols), dtype=np.int8)
+        entry = np.zeros((num_bars, num_symbols))
+        realized = np.zeros((num_bars, num_symbols))
+        for j, direction, entry_bar, exit_bar, entry_price, _, profit in closed:
+            held[entry_bar:exit_bar, j] = direction
+            entry[entry_bar:exit_bar, j] = entry_price
+            realized[exit_bar, j] += profit
+        for j, (direction, entry_bar, entry_price, _, _) in open_positions.items():
+            held[entry_bar:, j] = direction
+            entry[entry_bar:, j] = entry_price
+
+        with np.errstate(invalid='ignore'):
+            unrealized = np.where(held != 0, held * (prices - entry) / self.points * LOT_SIZE, 0.0)
+        self.symbol_pnl = np.cumsum(realized, axis=0) + unrealized
+        self.equity = self.initial_balance + self.symbol_pnl.sum(axis=1)
+
+        if closed:
+            columns = np.array(closed, dtype=np.float64)
+            bar_times = np.asarray(times)
+            durations = (bar_times[columns[:, 3].astype(np.int64)] - bar_times[columns[:, 2].astype(np.int64)]) \
+                / np.timedelta64(1, 's')
+            self.metrics.on_trades(columns[:, 6], durations)
+        self.metrics.on_bars(self.equity[start:], (held[start:] != 0).any(axis=1), times[start:])
+
+    def summary(self):
+        """
+        Returns:
+            pd.DataFrame: Number of trades, win rate (percent) and profit of
+            each symbol.
+        """
+        rows = []
+        for symbol in self.symbols:
+            profits = self.trades[symbol]['profit']
+            rows.append({'symbol': symbol, 'num_trades': len(profits),
+                         'win_rate': (profits > 0).mean() * 100 if len(profits) else 0.0,
+                         'profit': profits.sum()})
+        return pd.DataFrame(rows)
+
+    def correlation(self):
+        """
+        Returns:
+            pd.DataFrame: Correlation of the symbols' bar-to-bar P&L.
+        """
+        return pd.DataFrame(np.diff(self.symbol_pnl, axis=0), columns=self.symbols).corr()
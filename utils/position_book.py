@@ -0,0 +1,136 @@
+import threading
+
+from config.settings import POSITION_BOOK
+from utils.broker import broker, TradePosition
+from utils.logger import setup_logger
+from utils.telemetry import telemetry
+
+logger = setup_logger()
+
+
+class PositionBook:
+    """
+    Local copy of the open positions, so decisions need no broker round-trip.
+
+    Positions are indexed by ticket and by (symbol, magic number). The order
+    router records its own fills with `record_open` and `record_close`;
+    positions that change outside the bot (stop loss or take profit hits,
+    manual trades) are picked up by `reconcile`, which diffs the book
+    against one `positions_get` snapshot of every symbol. Call it when
+    `due`, i.e. every `reconcile_interval` seconds of broker time, and
+    whenever an order finds the broker disagreeing with the book.
+
+    Local positions are not marked to market: `price_current` is the open
+    price and `profit` 0 until the next reconciliation.
+
+    Args:
+        reconcile_interval (float): Seconds between reconciliations.
+    """
+
+    def __init__(self, reconcile_interval=None):
+        self.reconcile_interval = POSITION_BOOK['reconcile_interval'] if reconcile_interval is None \
+            else reconcile_interval
+        self.last_reconciled = None  # broker time of the last snapshot
+        self._positions = {}  # ticket -> TradePosition
+        self._by_key = {}  # (symbol, magic) -> tickets, oldest first
+        self._lock = threading.Lock()
+
+    # --- Reading ------------------------------------------------------------
+
+    def position(self, symbol, magic_number):
+        """Returns the oldest open position of a symbol and magic number, or None."""
+        with self._lock:
+            tickets = self._by_key.get((symbol, magic_number))
+            return self._positions[tickets[0]] if tickets else None
+
+    def get(self, ticket):
+        with self._lock:
+            return self._positions.get(ticket)
+
+    def positions(self, symbol=None, magic_number=None):
+        """Returns the open positions, optionally of one symbol and/or magic number."""
+        with self._lock:
+            return [p for p in self._positions.values()
+                    if (symbol is None or p.symbol == symbol) and (magic_number is None or p.magic == magic_number)]
+
+    def __len__(self):
+        return len(self._positions)
+
+    # --- Updates ------------------------------------------------------------
+
+    def _add(self, position):
+        self._remove(position.ticket)
+        self._positions[position.ticket] = position
+        self._by_key.setdefault((position.symbol, position.magic), []).append(position.ticket)
+
+    def _remove(self, ticket):
+        position = self._positions.pop(ticket, None)
+        if position is None:
+            return None
+        key = (position.symbol, position.magic)
+        tickets = self._by_key[key]
+        tickets.remove(ticket)
+        if not tickets:
+            del self._by_key[key]
+        return position
+
+    def record_open(self, request, result):
+        """Records the position opened by a filled market order."""
+        position = TradePosition(
+            ticket=result.order, time=broker.time(), type=request['type'], magic=request['magic'],
+            volume=request['volume'], price_open=result.price, sl=request.get('sl', 0.0),
+            tp=request.get('tp', 0.0), price_current=result.price, profit=0.0,
+            symbol=request['symbol'], comment=request.get('comment', ''))
+        with self._lock:
+            self._add(position)
+        return position
+
+    def record_close(self, ticket):
+        """Forgets a position closed by the bot."""
+        with self._lock:
+            return self._remove(ticket)
+
+    def reconcile(self):
+        """
+        Brings the book in line with the broker's open positions.
+
+        Returns:
+            tuple: Tickets of the positions found open at the broker but not
+            in the book, and of those gone from the broker. None if the
+            snapshot failed, in which case the book is left as it was.
+        """
+        with telemetry.timer('positions_get'):
+            snapshot = broker.positions_get()
+        if snapshot is None:
+            logger.error('Failed to reconcile the position book: no position snapshot')
+            return None
+        snapshot = {position.ticket: position for position in snapshot}
+        first = self.last_reconciled is None
+        with self._lock:
+            added = [ticket for ticket in snapshot if ticket not in self._positions]
+            removed = [ticket for ticket in self._positions if ticket not in snapshot]
+            for ticket in removed:
+                self._remove(ticket)
+            for ticket, position in snapshot.items():
+                if ticket in self._positions:
+                    self._positions[ticket] = position  # fresh prices, stops and volume
+                else:
+                    self._add(position)
+            self.last_reconciled = broker.time()
+        if first:
+            logger.info('Position book loaded with %d open position(s).', len(snapshot))
+        elif added or removed:
+            logger.info('Position book reconciled: %d position(s) opened and %d closed outside the bot.',
+                        len(added), len(removed))
+            telemetry.count('position_book_drift', len(added) + len(removed))
+        return added, removed
+
+    def due(self):
+        """Whether a reconciliation is due (always before the first one)."""
+        return self.last_reconciled is None or broker.time() - self.last_reconciled >= self.reconcile_interval
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+            self._by_key.clear()
+            self.last_reconciled = None
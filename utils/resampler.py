@@ -0,0 +1,245 @@
+import numpy as np
+
+from utils.data_store import RATES_DTYPE, timeframe_name, timeframe_seconds
+
+
+def _aggregate(rates, seconds):
+    """
+    Groups chronological bars into bars of `seconds`, aligned on the epoch.
+
+    The open is the first open, the high/low the extremes, the close the last
+    close, the volumes the sums and the spread the lowest of each group.
+    """
+    if len(rates) == 0:
+        return np.zeros(0, dtype=RATES_DTYPE)
+    buckets = rates['time'] // seconds * seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rates)] - 1
+    bars = np.zeros(len(starts), dtype=RATES_DTYPE)
+    bars['time'] = buckets[starts]
+    bars['open'] = rates['open'][starts]
+    bars['high'] = np.maximum.reduceat(rates['high'], starts)
+    bars['low'] = np.minimum.reduceat(rates['low'], starts)
+    bars['close'] = rates['close'][ends]
+    bars['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    bars['spread'] = np.minimum.reduceat(rates['spread'], starts)
+    bars['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return bars
+
+
+def resample(rates, timeframe):
+    """
+    Resamples MT5 rates to a coarser timeframe in one vectorized pass.
+
+    Args:
+        rates (np.ndarray): `RATES_DTYPE` bars in chronological order.
+        timeframe (str or int): Target timeframe name or MT5 constant.
+
+    Returns:
+        np.ndarray: `RATES_DTYPE` bars of the target timeframe. The last one
+        is incomplete if the input ends inside it.
+    """
+    return _aggregate(np.asarray(rates).astype(RATES_DTYPE, copy=False), timeframe_seconds(timeframe))
+
+
+def ticks_to_bars(ticks, timeframe='M1', point=None):
+    """
+    Builds bid bars from ticks.
+
+    Args:
+        ticks (np.ndarray): `TICKS_DTYPE` records in chronological order.
+        timeframe (str or int): Bar timeframe.
+        point (float): Point size, to fill the spread column (0 when None).
+
+    Returns:
+        np.ndarray: `RATES_DTYPE` bars; tick_volume counts the ticks.
+    """
+    bars = np.zeros(len(ticks), dtype=RATES_DTYPE)
+    bars['time'] = ticks['time_msc'] // 1000
+    for field in ('open', 'high', 'low', 'close'):
+        bars[field] = ticks['bid']
+    bars['tick_volume'] = 1
+    if point:
+        bars['spread'] = np.rint((ticks['ask'] - ticks['bid']) / point)
+    return _aggregate(bars, timeframe_seconds(timeframe))
+
+
+class _Series:
+    """Bars of one (symbol, timeframe): closed history, open bar and subscribers."""
+
+    def __init__(self, seconds, max_bars):
+        self.seconds = seconds
+        self.max_bars = max_bars
+        self.closed = np.zeros(0, dtype=RATES_DTYPE)
+        self.partial = None  # aggregate of the closed base bars of the open bar
+        self.forming = None  # the open bar, including the forming base bar
+        self.callbacks = []
+
+    def add(self, new_closed, forming_base):
+        """
+        Folds newly closed base bars and the forming base bar in.
+
+        Returns:
+            np.ndarray: The bars that closed in this update, then the open bar.
+        """
+        forming_bucket = forming_base['time'][0] // self.seconds * self.seconds
+        pending = new_closed if self.partial is None else np.concatenate([self.partial, new_closed])
+        bars = _aggregate(pending, self.seconds)
+        if len(bars) and bars['time'][-1] == forming_bucket:
+            self.partial, bars = bars[-1:], bars[:-1]
+        else:
+            self.partial = None
+        if len(bars):
+            self.closed = np.concatenate([self.closed, bars])[-self.max_bars:]
+
+        current = forming_base if self.partial is None else np.concatenate([self.partial, forming_base])
+        self.forming = _aggregate(current, self.seconds)
+        return np.concatenate([bars, self.forming])
+
+
+class Resampler:
+    """
+    Builds bars of coarser timeframes incrementally from one base series.
+
+    Each symbol is fetched in a single timeframe (`base_timeframe`, M1 by
+    default) or as ticks; every other timeframe is derived from it. New base
+    bars are folded into the open bar of each timeframe, closed bars are
+    appended once, and only the open bar is rebuilt when the forming base bar
+    changes, so an update costs the same however long the history is.
+
+    Bars are returned in the MT5 rates format with the open bar last, so they
+    can be passed straight to `BaseStrategy.stream`.
+
+    Args:
+        base_timeframe (str or int): Timeframe of the base series.
+        max_bars (int): Closed bars kept per symbol and timeframe, including
+            the base series (which must span the longest subscribed bar).
+    """
+
+    def __init__(self, base_timeframe='M1', max_bars=5000):
+        self.base_timeframe = timeframe_name(base_timeframe)
+        self.base_seconds = timeframe_seconds(base_timeframe)
+        self.max_bars = max_bars
+        self._series = {}  # (symbol, timeframe name) -> _Series
+        self._base = {}  # symbol -> newest closed base bars
+        self._forming_base = {}  # symbol -> the forming base bar, as a 1-record array
+
+    def subscribe(self, symbol, timeframe, callback=None):
+        """
+        Starts building a timeframe of a symbol.
+
+        A timeframe subscribed after the symbol's first update is built from
+        the base bars kept so far.
+
+        Args:
+            callback (callable): Called as ``callback(symbol, timeframe, bars)``
+                after every update, with the bars that closed in it followed
+                by the open bar.
+        """
+        name = timeframe_name(timeframe)
+        seconds = timeframe_seconds(name)
+        if seconds < self.base_seconds or seconds % self.base_seconds:
+            raise ValueError(f'{name} cannot be built from {self.base_timeframe} bars')
+        series = self._series.get((symbol, name))
+        if series is None:
+            series = self._series[(symbol, name)] = _Series(seconds, self.max_bars)
+            if symbol in self._forming_base:
+                series.add(self._base[symbol], self._forming_base[symbol])
+        if callback is not None:
+            series.callbacks.append(callback)
+        return series
+
+    def subscribed(self, symbol, timeframe):
+        return (symbol, timeframe_name(timeframe)) in self._series
+
+    def last_base_time(self, symbol):
+        """Open time of the newest base bar folded in (the forming one), or None."""
+        forming = self._forming_base.get(symbol)
+        return None if forming is None else int(forming['time'][0])
+
+    def update(self, symbol, rates):
+        """
+        Folds base bars into every subscribed timeframe of a symbol.
+
+        Args:
+            rates (np.ndarray): Base bars in chronological order, the last one
+                still forming, e.g. from `copy_rates_from_pos`. Bars that were
+                already folded in are skipped, so overlapping fetches are fine.
+
+        Returns:
+            dict: Timeframe name -> the bars that closed in this update,
+            followed by the open bar.
+        """
+        if rates is None or len(rates) == 0:
+            return {}
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        forming_base = rates[-1:]
+        base = self._base.get(symbol)
+        if base is None:
+            closed = rates[:-1]
+            base = closed
+        else:
+            previous = self._forming_base[symbol]['time'][0]
+            first = base['time'][0] if len(base) else previous
+            last = base['time'][-1] if len(base) else previous - 1
+            if forming_base['time'][0] <= last or forming_base['time'][0] < previous:
+                return {}  # a stale fetch
+            closed = rates[:-1][rates['time'][:-1] > last]
+            # Older bars only extend the kept base history, for later subscriptions
+            older = rates[:-1][rates['time'][:-1] < first]
+            base = np.concatenate([older, base, closed])
+        self._base[symbol] = base[-self.max_bars:]
+        self._forming_base[symbol] = forming_base
+
+        updated = {}
+        for (s, name), series in self._series.items():
+            if s != symbol:
+                continue
+            bars = series.add(closed, forming_base)
+            updated[name] = bars
+            for callback in series.callbacks:
+                callback(symbol, name, bars)
+        return updated
+
+    def update_ticks(self, symbol, ticks, point=None):
+        """
+        Folds new ticks into every subscribed timeframe of a symbol.
+
+        The ticks are first built into base bars; the base bar they start in
+        is continued rather than replaced.
+        """
+        if len(ticks) == 0:
+            return {}
+        bars = ticks_to_bars(ticks, self.base_timeframe, point)
+        forming = self._forming_base.get(symbol)
+        if forming is not None and forming['time'][0] == bars['time'][0]:
+            bars = np.concatenate([_aggregate(np.concatenate([forming, bars[:1]]), self.base_seconds), bars[1:]])
+        elif forming is not None and forming['time'][0] < bars['time'][0]:
+            # The previous forming bar is closed now
+            bars = np.concatenate([forming, bars])
+        return self.update(symbol, bars)
+
+    def bars(self, symbol, timeframe, count=None):
+        """
+        Returns the newest bars of a subscribed timeframe, the open bar last.
+
+        Args:
+            count (int): Number of bars, all kept ones by default.
+        """
+        series = self._series[(symbol, timeframe_name(timeframe))]
+        bars = series.closed if series.forming is None else np.concatenate([series.closed, series.forming])
+        return bars[-count:] if count else bars
+
+    def warm_up(self, symbol, timeframe, rates):
+        """
+        Prepends older closed bars of a timeframe, e.g. from the local candle
+        store, so a long history does not have to be rebuilt from base bars.
+        Bars not older than the ones already built are ignored.
+        """
+        series = self.subscribe(symbol, timeframe)
+        rates = np.asarray(rates).astype(RATES_DTYPE, copy=False)
+        first = series.closed['time'][0] if len(series.closed) else \
+            series.forming['time'][0] if series.forming is not None else None
+        if first is not None:
+            rates = rates[rates['time'] < first]
+        series.closed = np.concatenate([rates, series.closed])[-self.max_bars:]
@@ -0,0 +1,148 @@
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from utils.trade_ledger import TradeLedger
+
+METHODS = ('shuffle', 'bootstrap', 'perturb')
+
+# Profits of the analysed ledger, set in each worker by _init_worker
+_profits = None
+
+
+def _init_worker(profits):
+    global _profits
+    _profits = profits
+
+
+def _paths(method, profits, count, rng, block_size, perturbation):
+    """Draws `count` resampled trade sequences as a (count, trades) float32 matrix."""
+    n = len(profits)
+    if method == 'shuffle':
+        return rng.permuted(np.broadcast_to(profits, (count, n)), axis=1)
+    if method == 'bootstrap':
+        # Moving blocks keep runs of dependent trades (streaks, regimes) together
+        blocks = -(-n // block_size)
+        starts = rng.integers(0, n - block_size + 1, size=(count, blocks), dtype=np.int32)
+        index = (starts[:, :, None] + np.arange(block_size, dtype=np.int32)).reshape(count, -1)[:, :n]
+        return profits[index]
+    if method == 'perturb':
+        noise = rng.standard_normal((count, n), dtype=np.float32)
+        noise *= perturbation
+        noise += 1.0
+        noise *= profits
+        return noise
+    raise ValueError(f'Unknown resampling method: {method}')
+
+
+def _simulate(method, profits, num_paths, seed, initial_balance, block_size, perturbation, ruin_level):
+    """
+    Resamples `num_paths` equity curves at once.
+
+    Returns:
+        tuple: Final return, max drawdown (percent) and whether the ruin
+        level was touched, one value per path.
+    """
+    rng = np.random.default_rng(seed)
+    # float32 halves the memory traffic; its rounding stays far below a cent per trade
+    equity = _paths(method, profits, num_paths, rng, block_size, perturbation)
+    equity[:, 0] += initial_balance
+    np.cumsum(equity, axis=1, out=equity)
+    peaks = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peaks, initial_balance, out=peaks)
+    ruined = equity.min(axis=1) <= ruin_level
+    returns = (equity[:, -1].astype(np.float64) - initial_balance) / initial_balance * 100
+    # Drawdown from the running peak, as MetricsAccumulator reports it
+    np.divide(equity, peaks, out=equity)
+    drawdowns = (1.0 - equity.min(axis=1).clip(max=1.0).astype(np.float64)) * 100
+    return returns, drawdowns, ruined
+
+
+def _run_task(task):
+    return _simulate(task[0], _profits, *task[1:])
+
+
+def monte_carlo(trades, initial_balance, num_paths=10000, methods=METHODS, block_size=None,
+                perturbation=0.1, ruin_threshold=0.5, confidence=0.95, processes=None,
+                chunk_size=2000000, seed=0):
+    """
+    Resamples the closed trades of a backtest into many alternative equity
+    curves and reports how spread out their outcomes are.
+
+    Each method draws `num_paths` trade sequences of the ledger's length:
+
+    - 'shuffle' reorders the trades. The final return never changes, but the
+      drawdown shows how much of it was due to the order of the trades.
+    - 'bootstrap' draws blocks of `block_size` consecutive trades with
+      replacement, keeping streaks together.
+    - 'perturb' keeps the order and scales each profit by ``1 + e``, with
+      ``e ~ N(0, perturbation)``, as for slippage or fill noise.
+
+    Trades are sized in lots, not in percent of the balance, so a path's
+    equity is the initial balance plus the running sum of its profits. Paths
+    are resampled in chunks, as 2D arrays of at most `chunk_size` values,
+    spread across a process pool; the result only depends on `seed`, not on
+    the number of processes.
+
+    Args:
+        trades (TradeLedger or list): Closed trades of the backtest.
+        initial_balance (float): Starting balance.
+        num_paths (int): Paths drawn per method.
+        methods (tuple): Resampling methods, see above.
+        block_size (int): Trades per bootstrap block, the cube root of the
+            number of trades by default.
+        perturbation (float): Standard deviation of the relative profit noise.
+        ruin_threshold (float): Fraction of the initial balance whose loss
+            counts as ruin.
+        confidence (float): Width of the reported intervals.
+        processes (int): Pool size, defaults to the CPU count.
+        chunk_size (int): Values (paths x trades) resampled at once.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: One row per method with the lower bound, median and
+        upper bound of the total return and max drawdown (percent), the
+        probability of a loss and the risk of ruin.
+    """
+    profits = np.ascontiguousarray(TradeLedger.from_trades(trades)['profit'], dtype=np.float32)
+    if len(profits) == 0:
+        return pd.DataFrame()
+    block_size = min(block_size or max(1, round(len(profits) ** (1 / 3))), len(profits))
+    ruin_level = initial_balance * (1 - ruin_threshold)
+    chunk_paths = max(1, chunk_size // len(profits))
+    processes = processes or os.cpu_count()
+
+    # One task per chunk, each with its own seed, so the draws do not depend on the pool size
+    sizes = [min(chunk_paths, num_paths - lo) for lo in range(0, num_paths, chunk_paths)]
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(methods) * len(sizes)))
+    tasks = [(method, size, next(seeds), initial_balance, block_size, perturbation, ruin_level)
+             for method in methods for size in sizes]
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(profits)
+        results = list(map(_run_task, tasks))
+    else:
+        with Pool(min(processes, len(tasks)), initializer=_init_worker, initargs=(profits,)) as pool:
+            results = pool.map(_run_task, tasks)
+
+    tail = (1 - confidence) / 2 * 100
+    quantiles = [tail, 50, 100 - tail]
+    rows = []
+    for method in methods:
+        parts = [result for task, result in zip(tasks, results) if task[0] == method]
+        returns, drawdowns, ruined = (np.concatenate(column) for column in zip(*parts))
+        low, median, high = np.percentile(returns, quantiles)
+        dd_low, dd_median, dd_high = np.percentile(drawdowns, quantiles)
+        rows.append({
+            'method': method,
+            'return_low': low,
+            'return_median': median,
+            'return_high': high,
+            'drawdown_low': dd_low,
+            'drawdown_median': dd_median,
+            'drawdown_high': dd_high,
+            'loss_probability': float(np.mean(returns < 0)),
+            'risk_of_ruin': float(np.mean(ruined)),
+        })
+    return pd.DataFrame(rows).set_index('method')
@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from config.settings import LOT_SIZE, MAGIC_NUMBER
+from utils.broker import broker, ReplayFinished
+from utils.data_fetcher import get_historical_data
+from utils.data_store import TIMEFRAMES, timeframe_seconds
+from utils.market_data import market_session
+from utils.logger import setup_logger
+from utils.order_router import OrderRouter
+from utils.telemetry import telemetry
+
+logger = setup_logger()
+
+# Candles fetched per cycle once a pipeline's streaming state is warm
+STREAM_CANDLES = 3
+
+
+class Pipeline:
+    """
+    One (symbol, timeframe, strategy) combination traded by the LiveScheduler.
+
+    The strategy must implement the streaming API (`on_bar` / `update`).
+    """
+    def __init__(self, symbol, timeframe, strategy, lot_size=LOT_SIZE, magic_number=MAGIC_NUMBER):
+        self.symbol = symbol
+        self.timeframe = TIMEFRAMES.get(timeframe, timeframe)
+        self.strategy = strategy
+        self.lot_size = lot_size
+        self.magic_number = magic_number
+        self.last_bar_time = None
+        self.last_latency = None  # seconds from the bar-close wake-up to the order being sent
+
+    def __repr__(self):
+        return f'Pipeline({self.symbol}, {self.timeframe}, {type(self.strategy).__name__})'
+
+
+class _WallClock:
+    def time(self):
+        return time.time()
+
+    async def sleep_until(self, wake_time):
+        await asyncio.sleep(max(0.0, wake_time - time.time()))
+
+    def finish(self):
+        pass
+
+
+class _ReplayClock:
+    """
+    Virtual clock for replays. Once every running pipeline is waiting, the
+    broker's clock jumps straight to the earliest wake-up time.
+    """
+    def __init__(self, active):
+        self.active = active
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def time(self):
+        return broker.time()
+
+    async def sleep_until(self, wake_time):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (wake_time, next(self._sequence), future))
+        self._release()
+        await future
+
+    def finish(self):
+        self.active -= 1
+        self._release()
+
+    def _release(self):
+        if not self._waiting or len(self._waiting) < self.active:
+            return
+        wake_time = self._waiting[0][0]
+        try:
+            if wake_time > broker.time():
+                broker.sleep(wake_time - broker.time())
+        except ReplayFinished as e:
+            for _, _, future in self._waiting:
+                future.set_exception(e)
+            self._waiting.clear()
+            return
+        while self._waiting and self._waiting[0][0] <= wake_time:
+            heapq.heappop(self._waiting)[2].set_result(None)
+
+
+class LiveScheduler:
+    """
+    Runs many trading pipelines concurrently on one asyncio event loop.
+
+    Each pipeline sleeps until its next bar boundary (trigger='bar') or polls
+    the symbol's tick until the tick time crosses it (trigger='tick'), then
+    fetches the new candles, streams them into its strategy and acts on the
+    signal. Blocking broker calls run on a bounded thread pool so one slow
+    symbol does not hold up the others.
+
+    Args:
+        pipelines (list): Pipeline objects to run.
+        max_workers (int): Size of the thread pool for broker calls.
+        trigger (str): 'bar' or 'tick'.
+        poll_interval (float): Seconds between tick polls and between retries
+            when a new candle has not appeared yet.
+        bar_retries (int): Fetch attempts per bar boundary.
+        time_offset (int): Broker server time minus local time, in seconds,
+            so 'bar' wake-ups line up with the server's candles.
+        replay (bool): Drive the replay broker's clock instead of sleeping.
+    """
+    def __init__(self, pipelines, max_workers=8, trigger='bar', poll_interval=0.25,
+                 bar_retries=20, time_offset=0, replay=False):
+        if trigger not in ('bar', 'tick'):
+            raise ValueError(f'Unknown trigger: {trigger}')
+        self.pipelines = pipelines
+        self.max_workers = max_workers
+        self.trigger = trigger
+        self.poll_interval = poll_interval
+        self.bar_retries = bar_retries
+        self.time_offset = time_offset
+        self.replay = replay
+        self.clock = None
+        self.router = None
+        self._executor = None
+
+    def start(self):
+        """Runs all pipelines until interrupted (or the replay ends)."""
+        asyncio.run(self.run())
+
+    async def run(self):
+        self.clock = _ReplayClock(len(self.pipelines)) if self.replay else _WallClock()
+        # The replay broker is not thread-safe; a single worker keeps it deterministic
+        workers = 1 if self.replay else self.max_workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='broker') as executor:
+            self._executor = executor
+            # Orders go through their own thread so a pending fill never holds
+            # up the data fetches of other pipelines (except in replay, see above)
+            self.router = OrderRouter(executor=executor if self.replay else None)
+            try:
+                await asyncio.gather(*(self._run_pipeline(p) for p in self.pipelines))
+            finally:
+                self.router.shutdown()
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def _run_pipeline(self, pipeline):
+        bar_seconds = timeframe_seconds(pipeline.timeframe)
+        try:
+            await self._cycle(pipeline, time.perf_counter())
+            while True:
+                server_now = self.clock.time() + self.time_offset
+                next_bar = (server_now // bar_seconds + 1) * bar_seconds
+                if self.trigger == 'tick':
+                    await self._wait_for_tick(pipeline, next_bar)
+                else:
+                    await self.clock.sleep_until(next_bar - self.time_offset)
+
+                woke = time.perf_counter()
+                for _ in range(self.bar_retries):
+                    if await self._cycle(pipeline, woke):
+                        break
+                    telemetry.count('bar_retries', symbol=pipeline.symbol)
+                    await self.clock.sleep_until(self.clock.time() + self.poll_interval)
+                else:
+                    telemetry.count('missed_bars', symbol=pipeline.symbol)
+        except ReplayFinished:
+            pass
+        except Exception:
+            logger.exception(f'{pipeline} stopped on an error.')
+        finally:
+            self.clock.finish()
+
+    async def _wait_for_tick(self, pipeline, next_bar):
+        while True:
+            tick = await self._call(broker.symbol_info_tick, pipeline.symbol)
+            if tick is not None and tick.time >= next_bar:
+                return
+            await self.clock.sleep_until(self.clock.time() + self.poll_interval)
+
+    async def _cycle(self, pipeline, woke):
+        """
+        Fetches the new candles of a pipeline and acts on its signal.
+
+        Returns:
+            bool: False if no new candle has appeared yet.
+        """
+        strategy = pipeline.strategy
+        market_session.new_cycle(pipeline.symbol)
+        num_candles = strategy.warm_up_bars if pipeline.last_bar_time is None else STREAM_CANDLES
+        rates = await self._call(get_historical_data, pipeline.symbol, pipeline.timeframe,
+                                 num_candles, use_store=True)
+        if rates is None or len(rates) == 0:
+            return False
+        if pipeline.last_bar_time is not None:
+            if rates[-1]['time'] <= pipeline.last_bar_time:
+                return False
+            if rates[0]['time'] > pipeline.last_bar_time:
+                logger.warning(f'Gap in streamed candles for {pipeline}, re-warming the strategy.')
+                telemetry.count('candle_gaps', symbol=pipeline.symbol)
+                strategy.reset()
+                pipeline.last_bar_time = None
+                return await self._cycle(pipeline, woke)
+
+        with telemetry.timer('generate_signal', symbol=pipeline.symbol):
+            signal, pipeline.last_bar_time = strategy.stream(rates, pipeline.last_bar_time)
+        if signal in ('BUY', 'SELL'):
+            result = await asyncio.wrap_future(self.router.submit_signal(
+                pipeline.symbol, signal, pipeline.lot_size, pipeline.magic_number, time.perf_counter()))
+            if result is not None and result.ok:
+                pipeline.last_latency = time.perf_counter() - woke
+                telemetry.observe('bar_to_order', pipeline.last_latency, symbol=pipeline.symbol)
+                logger.info(f'{pipeline}: {signal} sent {pipeline.last_latency * 1000:.1f} ms after the bar opened.')
+        return True
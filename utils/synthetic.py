@@ -0,0 +1,76 @@
+import numpy as np
+
+from utils.data_store import RATES_DTYPE, TICKS_DTYPE, timeframe_seconds
+
+# 2024-01-01 00:00:00 UTC, the default start of the synthetic series
+DEFAULT_START = 1704067200
+
+
+def synthetic_rates(num_bars, seed=0, timeframe='M15', start=DEFAULT_START, price=1.1,
+                    volatility=2e-4):
+    """
+    Generates deterministic OHLCV bars in the MT5 rates format.
+
+    Closes follow a geometric random walk whose volatility switches between
+    a calm and a volatile regime, so strategies see trends, ranges and
+    bursts. The same arguments always give the same bars.
+
+    Args:
+        num_bars (int): Number of bars.
+        seed (int): Random seed.
+        timeframe (str or int): Bar timeframe, spacing the bar times.
+        start (int): Open time of the first bar, in epoch seconds.
+        price (float): First open price.
+        volatility (float): Per-bar return volatility of the calm regime.
+
+    Returns:
+        np.ndarray: `RATES_DTYPE` records, with the spread in points.
+    """
+    rng = np.random.default_rng(seed)
+    rates = np.zeros(num_bars, dtype=RATES_DTYPE)
+    rates['time'] = start + np.arange(num_bars, dtype=np.int64) * timeframe_seconds(timeframe)
+
+    # Regimes last about 500 bars; the volatile one is three times as wide
+    switches = rng.random(num_bars) < 1 / 500
+    regime_volatility = np.where(np.cumsum(switches) % 2 == 1, 3 * volatility, volatility)
+    log_returns = rng.standard_normal(num_bars) * regime_volatility
+    close = price * np.exp(np.cumsum(log_returns))
+    rates['close'] = close
+    rates['open'][0] = price
+    rates['open'][1:] = close[:-1]
+    wick = np.abs(rng.standard_normal((2, num_bars))) * regime_volatility * price
+    rates['high'] = np.maximum(rates['open'], close) + wick[0]
+    rates['low'] = np.minimum(rates['open'], close) - wick[1]
+    rates['tick_volume'] = rng.poisson(100 * regime_volatility / volatility)
+    rates['spread'] = np.maximum(1, np.rint(rng.normal(2, 0.5, num_bars))).astype(np.int32)
+    return rates
+
+
+def synthetic_ticks(num_ticks, seed=0, start=DEFAULT_START, price=1.1, volatility=2e-5,
+                    mean_interval_ms=250, spread_points=2, point=1e-5):
+    """
+    Generates deterministic bid/ask ticks in the `TICKS_DTYPE` format.
+
+    Args:
+        num_ticks (int): Number of ticks.
+        seed (int): Random seed.
+        start (int): Time of the first tick, in epoch seconds.
+        price (float): First bid.
+        volatility (float): Per-tick return volatility.
+        mean_interval_ms (float): Mean time between ticks; intervals are
+            exponential and at least one millisecond.
+        spread_points (float): Mean spread, in points.
+        point (float): Point size.
+
+    Returns:
+        np.ndarray: `TICKS_DTYPE` records.
+    """
+    rng = np.random.default_rng(seed)
+    ticks = np.zeros(num_ticks, dtype=TICKS_DTYPE)
+    intervals = np.maximum(1, rng.exponential(mean_interval_ms, num_ticks).astype(np.int64))
+    intervals[0] = 0
+    ticks['time_msc'] = start * 1000 + np.cumsum(intervals)
+    ticks['bid'] = price * np.exp(np.cumsum(rng.standard_normal(num_ticks) * volatility))
+    spread = np.maximum(1, rng.poisson(spread_points, num_ticks))
+    ticks['ask'] = ticks['bid'] + spread * point
+    return ticks
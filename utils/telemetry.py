@@ -0,0 +1,380 @@
+import collections
+import contextlib
+import cProfile
+import io
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Bucket bounds (seconds) of the exported Prometheus histograms
+EXPORT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear latency histogram.
+
+    Every power of two above `lowest` is split into `sub_buckets` linear
+    buckets, so any recorded value is known to within ``1 / sub_buckets`` of
+    its magnitude, with a fixed number of counters and O(1) recording.
+    Values below `lowest` share the first bucket and values above `highest`
+    the last one.
+
+    Args:
+        lowest (float): Smallest distinguishable value, in seconds.
+        highest (float): Largest tracked value, in seconds.
+        sub_buckets (int): Linear buckets per power of two (128 gives about
+            two significant digits).
+    """
+
+    def __init__(self, lowest=1e-6, highest=3600.0, sub_buckets=128):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self._max_index = self._index(highest)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (self._max_index + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value):
+        scaled = value / self.lowest
+        if scaled < 1.0:
+            return 0
+        mantissa, exponent = math.frexp(scaled)  # scaled = mantissa * 2**exponent, mantissa in [0.5, 1)
+        return (exponent - 1) * self.sub_buckets + int((mantissa * 2.0 - 1.0) * self.sub_buckets)
+
+    def _upper_bound(self, index):
+        exponent, sub = divmod(index, self.sub_buckets)
+        return self.lowest * 2.0 ** exponent * (1.0 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value):
+        """Records one latency, in seconds."""
+        index = min(self._index(value), self._max_index)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """
+        Returns:
+            float: Upper bound of the bucket holding the `q`-th percentile
+            (capped at the largest recorded value), or 0 when empty.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds):
+        """Number of recorded values at or below each bound (bucket precision)."""
+        result, seen, index = [], 0, 0
+        for bound in bounds:
+            while index <= self._max_index and self._upper_bound(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Telemetry:
+    """
+    Registry of the bot's latency histograms, counters and gauges.
+
+    Stages are timed with ``with telemetry.timer('order_send'):``; every
+    metric can carry labels (e.g. symbol or retcode). The registry can be
+    written as a Prometheus text-format file (`write`) or served over HTTP
+    (`serve`) for a Prometheus scraper. While `enabled` is False, timers and
+    counters are no-ops.
+
+    Args:
+        prefix (str): Prepended to every exported metric name.
+    """
+
+    def __init__(self, prefix='trading_bot'):
+        self.prefix = prefix
+        self.enabled = True
+        self._histograms = {}
+        self._counters = collections.defaultdict(float)
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def histogram(self, stage, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def timer(self, stage, **labels):
+        """Context manager recording the duration of its block in `stage`'s histogram."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage, **labels))
+
+    def observe(self, stage, seconds, **labels):
+        if self.enabled:
+            self.histogram(stage, **labels).record(seconds)
+
+    def count(self, name, amount=1, **labels):
+        if self.enabled:
+            key = (name, tuple(sorted(labels.items())))
+            with self._lock:
+                self._counters[key] += amount
+
+    def gauge(self, name, value, **labels):
+        if self.enabled:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def summary(self):
+        """
+        Returns:
+            list: One dict per histogram with its stage, labels, count, mean
+            and p50/p90/p99/max latencies in milliseconds, slowest p99 first.
+        """
+        rows = []
+        for (stage, labels), histogram in list(self._histograms.items()):
+            if histogram.count == 0:
+                continue
+            rows.append({
+                'stage': stage,
+                'labels': dict(labels),
+                'count': histogram.count,
+                'mean_ms': histogram.sum / histogram.count * 1000,
+                'p50_ms': histogram.percentile(50) * 1000,
+                'p90_ms': histogram.percentile(90) * 1000,
+                'p99_ms': histogram.percentile(99) * 1000,
+                'max_ms': histogram.max * 1000,
+            })
+        return sorted(rows, key=lambda row: row['p99_ms'], reverse=True)
+
+    def log_summary(self):
+        for row in self.summary():
+            labels = _label_text(tuple(row['labels'].items()))
+            logger.info('%s%s: n=%d mean=%.2fms p50=%.2fms p90=%.2fms p99=%.2fms max=%.2fms',
+                        row['stage'], labels, row['count'], row['mean_ms'], row['p50_ms'],
+                        row['p90_ms'], row['p99_ms'], row['max_ms'])
+
+    def to_prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        histograms = collections.defaultdict(list)
+        for (stage, labels), histogram in list(self._histograms.items()):
+            histograms[stage].append((labels, histogram))
+        for stage, series in sorted(histograms.items()):
+            name = f'{self.prefix}_{stage}_seconds'
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in series:
+                for bound, count in zip(EXPORT_BUCKETS, histogram.cumulative_counts(EXPORT_BUCKETS)):
+                    lines.append(f'{name}_bucket{_label_text(labels + (("le", bound),))} {count}')
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f'{name}_sum{_label_text(labels)} {histogram.sum}')
+                lines.append(f'{name}_count{_label_text(labels)} {histogram.count}')
+
+        for kind, metrics, suffix in (('counter', self._counters, '_total'), ('gauge', self._gauges, '')):
+            names = collections.defaultdict(list)
+            for (name, labels), value in list(metrics.items()):
+                names[name].append((labels, value))
+            for name, series in sorted(names.items()):
+                full_name = f'{self.prefix}_{name}{suffix}'
+                lines.append(f'# TYPE {full_name} {kind}')
+                for labels, value in series:
+                    lines.append(f'{full_name}{_label_text(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Writes the metrics to a Prometheus text file, atomically (for node_exporter's textfile collector)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serves the metrics at http://host:port/metrics from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.stop_serving()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info('Serving metrics on http://%s:%d/metrics', host, self._server.server_address[1])
+        return self._server.server_address[1]
+
+    def stop_serving(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Registry shared by the live loop, the data fetcher and the backtests
+telemetry = Telemetry()
+
+
+class StackSampler:
+    """
+    Sampling profiler: records the stack of one thread every `interval`
+    seconds from a background thread. Unlike cProfile it adds no per-call
+    overhead, so it can stay on in production runs. `write` saves the
+    samples as collapsed stacks (one ``frame;frame;... count`` line per
+    stack), the input format of flame graph tools.
+
+    Args:
+        interval (float): Seconds between samples.
+        thread_id (int): Thread to sample, defaults to the calling thread.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+@contextlib.contextmanager
+def profiled(kind=None, path='logs/profile', top=25):
+    """
+    Profiles the enclosed block when `kind` is set.
+
+    'cprofile' saves the cProfile stats to ``path + '.prof'`` and logs the
+    top functions by cumulative time; 'sampling' runs a `StackSampler` and
+    saves collapsed stacks to ``path + '.folded'``. None profiles nothing.
+
+    Args:
+        kind (str): None, 'cprofile' or 'sampling'.
+        path (str): Output path without extension.
+        top (int): Number of functions logged for cProfile.
+    """
+    if kind not in (None, 'cprofile', 'sampling'):
+        raise ValueError(f'Unknown profiler: {kind}')
+    if kind is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f'{path}.prof')
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+            logger.info('Profile of the run (saved to %s.prof):\n%s', path, text.getvalue())
+    else:
+        sampler = StackSampler().start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.write(f'{path}.folded')
+            logger.info('Sampled %d stacks, saved to %s.folded', sum(sampler.samples.values()), path)
@@ -0,0 +1,145 @@
+import numpy as np
+
+# Ticks compared per vectorized search step; bounds the temporary arrays
+SEARCH_CHUNK = 1 << 20
+
+
+def _tick_time(time_msc):
+    return np.datetime64(int(time_msc), 'ms')
+
+
+def first_touch(ticks, start, stop, position, sl_price, tp_price, chunk=SEARCH_CHUNK):
+    """
+    Finds the first tick in ``[start, stop)`` that touches a position's SL or TP.
+
+    BUY positions are closed at the bid and SELL positions at the ask. The
+    search runs over fixed-size slices of the (memory-mapped) tick arrays, so
+    memory stays bounded however far away the touch is.
+
+    Args:
+        ticks (np.ndarray): `TICKS_DTYPE` records.
+        start (int): First tick index to check.
+        stop (int): Tick index to stop before.
+        position (str): 'BUY' or 'SELL'.
+        sl_price (float): Stop loss level.
+        tp_price (float): Take profit level.
+        chunk (int): Number of ticks compared per step.
+
+    Returns:
+        tuple: (tick index, exit price) of the first touch, or (None, None).
+        The exit price is the touching tick's price, so gaps through a level
+        are filled at the worse price.
+    """
+    side = ticks['bid'] if position == 'BUY' else ticks['ask']
+    for lo in range(start, stop, chunk):
+        prices = side[lo:min(lo + chunk, stop)]
+        if position == 'BUY':
+            hit = (prices <= sl_price) | (prices >= tp_price)
+        else:
+            hit = (prices >= sl_price) | (prices <= tp_price)
+        i = int(np.argmax(hit))
+        if hit[i]:
+            return lo + i, float(prices[i])
+    return None, None
+
+
+def run_tick_backtest(trade_manager, signals, rates, ticks, start=0):
+    """
+    Executes bar signals against bid/ask ticks.
+
+    The signal for bar ``i`` (computed from the bars before it) is filled at
+    the first tick of bar ``i``: BUY at the ask, SELL at the bid, so the real
+    spread replaces the fixed one of the bar backtest. Each open position is
+    then closed at the first tick touching its SL or TP, or at the first tick
+    of the bar carrying the opposite signal, whichever comes first. Work is
+    done per trade with vectorized searches; there is no per-tick Python loop.
+
+    Equity is marked at the close of every bar, i.e. at its last tick (BUY
+    positions at the bid, SELL positions at the ask), so exposure, Sharpe
+    and Sortino are measured as in the bar backtest.
+
+    The ticks may come in consecutive chunks, e.g. the partitions of
+    `HistoryDataset.iter_range`: only one chunk is held at a time and open
+    positions carry over from one chunk to the next, so memory stays bounded
+    however many ticks the backtest covers.
+
+    Args:
+        trade_manager (SimulatedTradeManager): Books the trades.
+        signals (np.ndarray): Output of `BaseStrategy.generate_signals`.
+        rates (np.ndarray): The bars the signals were computed from.
+        ticks (np.ndarray or iterable): `TICKS_DTYPE` records covering the
+            bars, or an iterable of chunks of them in time order.
+        start (int): Index of the first bar to trade.
+    """
+    chunks = [ticks] if isinstance(ticks, np.ndarray) else ticks
+    signal_bars = np.flatnonzero(signals[start:] != 'HOLD') + start
+    signal_msc = np.asarray(rates['time'], dtype=np.int64)[signal_bars] * 1000
+
+    # Each bar from `start` on closes at its last tick before the next bar
+    # opens; the last bar at the end of the data
+    bar_times = np.asarray(rates['time'], dtype=np.int64)[start:]
+    next_open_msc = np.full(len(bar_times), np.iinfo(np.int64).max, dtype=np.int64)
+    next_open_msc[:-1] = bar_times[1:] * 1000
+    marked = 0
+    last_tick = None  # the last tick of the previous chunk
+
+    def mark_until(chunk, time_msc):
+        """Marks the bars closing before `time_msc`, where the next trade opens or closes."""
+        nonlocal marked
+        end = int(np.searchsorted(next_open_msc, time_msc, side='right'))
+        if end <= marked:
+            return
+        side = 'bid' if trade_manager.position == 'BUY' else 'ask'
+        closing = np.searchsorted(chunk['time_msc'], next_open_msc[marked:end], side='left') - 1 \
+            if chunk is not None else np.full(end - marked, -1)
+        prices = chunk[side][np.maximum(closing, 0)].astype(np.float64) if chunk is not None \
+            else np.empty(end - marked)
+        prices[closing < 0] = last_tick[side] if last_tick is not None else np.nan
+        trade_manager.mark_bars(prices, bar_times[marked:end].astype('datetime64[s]'))
+        marked = end
+
+    k = 0  # next signal to act on
+    j = 0  # the signal closing the open position
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        tick_times = chunk['time_msc']
+        search_from = 0
+        while True:
+            if trade_manager.position is None:
+                if k >= len(signal_bars):
+                    break
+                entry = int(np.searchsorted(tick_times, signal_msc[k], side='left'))
+                if entry == len(chunk):
+                    break
+                signal = signals[signal_bars[k]]
+                price = chunk['ask'][entry] if signal == 'BUY' else chunk['bid'][entry]
+                mark_until(chunk, tick_times[entry])
+                trade_manager.open_position(signal, float(price), _tick_time(tick_times[entry]), spread=0.0)
+                search_from = entry + 1
+                # The next opposite signal closes the position unless SL/TP comes first
+                j = k + 1
+                while j < len(signal_bars) and signals[signal_bars[j]] == signal:
+                    j += 1
+
+            signal = trade_manager.position
+            stop = int(np.searchsorted(tick_times, signal_msc[j], side='left')) if j < len(signal_bars) \
+                else len(chunk)
+            hit, exit_price = first_touch(chunk, search_from, stop, signal,
+                                          trade_manager.sl_price, trade_manager.tp_price)
+            if hit is not None:
+                mark_until(chunk, tick_times[hit])
+                trade_manager.close_position(exit_price, _tick_time(tick_times[hit]))
+                # Act next on the first signal whose bar opens after the exit
+                k = int(np.searchsorted(signal_msc, tick_times[hit], side='right'))
+            elif stop < len(chunk):
+                exit_price = chunk['bid'][stop] if signal == 'BUY' else chunk['ask'][stop]
+                mark_until(chunk, tick_times[stop])
+                trade_manager.close_position(float(exit_price), _tick_time(tick_times[stop]))
+                k = j
+            else:
+                # Still open at the end of the chunk
+                break
+        mark_until(chunk, tick_times[-1])
+        last_tick = chunk[-1].copy()
+    mark_until(None, np.iinfo(np.int64).max)
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# Sides are stored as small integers
+BUY = 1
+SELL = -1
+SIDE_NAMES = {BUY: 'BUY', SELL: 'SELL'}
+SIDE_CODES = {'BUY': BUY, 'SELL': SELL}
+
+# One closed trade: 49 bytes, against several hundred for a dict of Python objects
+TRADE_DTYPE = np.dtype([
+    ('entry_time', 'datetime64[ns]'),
+    ('exit_time', 'datetime64[ns]'),
+    ('side', 'i1'),
+    ('entry_price', 'f8'),
+    ('exit_price', 'f8'),
+    ('profit', 'f8'),
+    ('balance', 'f8'),
+])
+
+
+def to_datetime64(value):
+    """Converts a bar time (Timestamp, datetime64 or epoch seconds) to datetime64[ns]."""
+    if value is None:
+        return np.datetime64('NaT', 'ns')
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[ns]')
+    if isinstance(value, (int, np.integer)):
+        return np.datetime64(int(value), 's').astype('datetime64[ns]')
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), 'ns')
+
+
+class TradeLedger:
+    """
+    Growable, preallocated table of closed trades backed by a NumPy
+    structured array (`TRADE_DTYPE`).
+
+    Appending is amortized O(1): the buffer doubles when it is full. Columns
+    are zero-copy views (``ledger['profit']``); indexing with an integer or
+    iterating yields the trade dicts `SimulatedTradeManager` used to keep.
+
+    Args:
+        capacity (int): Initial number of preallocated rows.
+    """
+
+    def __init__(self, capacity=1024):
+        self._records = np.empty(max(capacity, 1), dtype=TRADE_DTYPE)
+        self._size = 0
+
+    @classmethod
+    def from_trades(cls, trades):
+        """Builds a ledger from trade dicts (or returns `trades` if it already is one)."""
+        if isinstance(trades, TradeLedger):
+            return trades
+        ledger = cls(len(trades))
+        for trade in trades:
+            ledger.append(trade['signal'], trade['entry_time'], trade['entry_price'],
+                          trade['exit_time'], trade['exit_price'], trade['profit'], trade['balance'])
+        return ledger
+
+    def append(self, signal, entry_time, entry_price, exit_time, exit_price, profit, balance):
+        """Records a closed trade."""
+        if self._size == len(self._records):
+            grown = np.empty(2 * len(self._records), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._records
+            self._records = grown
+        self._records[self._size] = (to_datetime64(entry_time), to_datetime64(exit_time),
+                                     SIDE_CODES[signal], entry_price, exit_price, profit, balance)
+        self._size += 1
+
+    def extend(self, sides, entry_times, entry_prices, exit_times, exit_prices, profits, balances):
+        """Records a batch of closed trades given as columns; `sides` are side codes."""
+        count = len(profits)
+        if self._size + count > len(self._records):
+            grown = np.empty(max(2 * len(self._records), self._size + count), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._records[:self._size]
+            self._records = grown
+        rows = self._records[self._size:self._size + count]
+        rows['side'] = sides
+        rows['entry_time'] = entry_times
+        rows['exit_time'] = exit_times
+        rows['entry_price'] = entry_prices
+        rows['exit_price'] = exit_prices
+        rows['profit'] = profits
+        rows['balance'] = balances
+        self._size += count
+
+    def clear(self):
+        self._size = 0
+
+    def view(self):
+        """The recorded trades as a zero-copy structured array."""
+        return self._records[:self._size]
+
+    @property
+    def nbytes(self):
+        return self._records.nbytes
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        """A trade dict for an integer index; fields or records of the view for any other key."""
+        if not isinstance(key, (int, np.integer)):
+            return self.view()[key]
+        record = self.view()[key]
+        return {
+            'signal': SIDE_NAMES[int(record['side'])],
+            'entry_time': record['entry_time'],
+            'entry_price': float(record['entry_price']),
+            'exit_time': record['exit_time'],
+            'exit_price': float(record['exit_price']),
+            'profit': float(record['profit']),
+            'balance': float(record['balance']),
+        }
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def to_dataframe(self):
+        """Copies the trades into a DataFrame, with 'side' as 'BUY'/'SELL'."""
+        df = pd.DataFrame(self.view())
+        df['side'] = df['side'].map(SIDE_NAMES)
+        return df
+
+    def to_arrow(self):
+        """
+        Returns the trades as a pyarrow Table, built column by column from
+        the ledger (no DataFrame in between). Requires pyarrow.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError('Exporting the trade ledger to Arrow/Parquet requires pyarrow.') from e
+        records = self.view()
+        return pa.table({name: pa.array(np.ascontiguousarray(records[name])) for name in TRADE_DTYPE.names})
+
+    def to_parquet(self, path):
+        """Writes the trades to a Parquet file. Requires pyarrow."""
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)